@@ -0,0 +1,81 @@
+"""Число запросов и время страниц админки постов и комментариев.
+
+Использует базу из benchmarks/seed.py (создаёт и заполняет её,
+если файла ещё нет) и для каждой страницы печатает число SQL-запросов,
+самый долгий из них и общее время ответа.
+
+    python benchmarks/admin_queries.py --posts 1000000
+"""
+import argparse
+import time
+
+from seed import add_arguments, prepare
+
+
+def pages():
+    """Пары (модель, параметры запроса) проверяемых страниц."""
+    from django.utils import timezone
+    from posts.models import Comment, Group, Post
+
+    group = Group.objects.values_list('pk', flat=True).first()
+    return (
+        (Post, {}),
+        (Post, {'q': 'кошки'}),
+        (Post, {'pub_date__year': timezone.now().year}),
+        (Post, {'group__id__exact': group}),
+        (Comment, {}),
+        (Comment, {'q': 'город'}),
+    )
+
+
+def measure(repeat):
+    from django.contrib import admin
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+
+    User = get_user_model()
+    user = User.objects.filter(is_superuser=True).first()
+    if user is None:
+        user = User.objects.create_superuser(
+            'benchmark-admin', 'admin@example.com', 'password'
+        )
+    factory = RequestFactory()
+    print('страница\tзапросов\tсамый долгий, мс\tвсего, мс')
+    for model, params in pages():
+        opts = model._meta
+        url = reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist')
+        view = admin.site._registry[model].changelist_view
+        elapsed = 0
+        for _ in range(repeat):
+            request = factory.get(url, params)
+            request.user = user
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                view(request).render()
+            elapsed += time.perf_counter() - started
+        slowest = max(
+            (float(query['time']) for query in queries), default=0
+        ) * 1000
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        print(
+            f'{url}?{query}\t{len(queries)}\t{slowest:.1f}\t'
+            f'{elapsed / repeat * 1000:.1f}'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    # Поиск в админке идёт по полнотекстовому индексу.
+    args.search_index = True
+    prepare(args)
+    measure(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
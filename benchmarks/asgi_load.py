@@ -0,0 +1,284 @@
+"""WSGI против ASGI под нагрузкой медленных клиентов.
+
+Поднимает в дочернем процессе по очереди два развёртывания с
+одинаковым числом потоков для представлений (--threads):
+
+* wsgi — yatube.wsgi.application на wsgiref-сервере с пулом потоков:
+  поток читает запрос и пишет ответ сам, как синхронный воркер;
+* asgi — yatube.asgi.application (core.asgi) на простом asyncio
+  HTTP-сервере: соединения обслуживает цикл событий, поток занят
+  только представлением. В продакшене вместо этого сервера uvicorn.
+
+--clients клиентов одновременно запрашивают страницы лент
+(index, group_posts, profile, post_detail, follow_index); из них
+--slow-clients отправляют запрос --chunks частями с паузой --delay
+секунд между ними, как клиенты на плохой сети. Пока WSGI-поток
+ждёт медленного клиента, быстрые стоят в очереди за ним. Для
+каждого развёртывания печатает запросы в секунду, p50/p95 задержки
+быстрых и медленных клиентов и число ошибок.
+
+    python benchmarks/asgi_load.py --posts 100000 --clients 32 \\
+        --slow-clients 8
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import unquote
+from wsgiref.simple_server import WSGIServer
+
+from feed_load import VIEWS, QuietHandler, make_urls
+from seed import add_arguments, prepare, setup
+
+
+class PooledWSGIServer(WSGIServer):
+    """wsgiref-сервер, который обслуживает соединения пулом потоков."""
+
+    def __init__(self, address, handler, threads):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_in_pool, request, client_address)
+
+    def process_in_pool(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def serve_wsgi(threads, ports):
+    from yatube.wsgi import application
+
+    server = PooledWSGIServer(('127.0.0.1', 0), QuietHandler, threads)
+    server.set_app(application)
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+
+async def serve_asgi(application, ports):
+    """Одно соединение — один запрос, без keep-alive и chunked."""
+    async def handle(reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+            request_line, *lines = head.decode('latin-1').split('\r\n')
+            method, target, version = request_line.split(' ')
+            headers = [
+                (name.strip().lower().encode('latin-1'),
+                 value.strip().encode('latin-1'))
+                for name, value in (
+                    line.split(':', 1) for line in lines if line
+                )
+            ]
+            length = int(dict(headers).get(b'content-length', 0))
+            messages = [{
+                'type': 'http.request',
+                'body': await reader.readexactly(length),
+            }]
+            path, _, query = target.partition('?')
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': version.split('/')[1],
+                'method': method,
+                'scheme': 'http',
+                'path': unquote(path),
+                'raw_path': path.encode('latin-1'),
+                'query_string': query.encode('latin-1'),
+                'root_path': '',
+                'headers': headers,
+                'client': writer.get_extra_info('peername')[:2],
+                'server': writer.get_extra_info('sockname')[:2],
+            }
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status = HTTPStatus(message['status'])
+                    writer.write(
+                        f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+                        'Connection: close\r\n'.encode('latin-1')
+                        + b''.join(
+                            name + b': ' + value + b'\r\n'
+                            for name, value in message['headers']
+                        )
+                        + b'\r\n'
+                    )
+                else:
+                    writer.write(message.get('body', b''))
+                await writer.drain()
+
+            await application(scope, receive, send)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(
+        handle, '127.0.0.1', 0, backlog=1024
+    )
+    ports.put(server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+
+def serve(mode, database, threads, ports):
+    """Точка входа дочернего процесса с сервером."""
+    setup(database, DEBUG=False, ASGI_THREADS=threads)
+    if mode == 'wsgi':
+        serve_wsgi(threads, ports)
+    else:
+        from yatube.asgi import application
+
+        asyncio.run(serve_asgi(application, ports))
+
+
+async def fetch(port, url, cookie, chunks, delay):
+    """Статус и задержка ответа; запрос уходит chunks частями."""
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    request = (
+        f'GET {url} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+        f'Cookie: {cookie}\r\nConnection: close\r\n\r\n'
+    ).encode()
+    step = -(-len(request) // chunks)
+    for start in range(0, len(request), step):
+        if start:
+            await asyncio.sleep(delay)
+        writer.write(request[start:start + step])
+        await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status = int(response.split(b' ', 2)[1]) if response else 0
+    return status, (time.perf_counter() - started) * 1000
+
+
+async def load(port, jobs, clients, slow_clients=0, chunks=1, delay=0):
+    """Выполняет jobs ([(адрес, cookie)]) в clients соединений.
+
+    Возвращает [(медленный ли клиент, статус, мс)] и время в секундах.
+    """
+    queue = list(reversed(jobs))
+    samples = []
+
+    async def client(slow):
+        while queue:
+            url, cookie = queue.pop()
+            try:
+                status, elapsed = await fetch(
+                    port, url, cookie,
+                    *((chunks, delay) if slow else (1, 0)),
+                )
+            except OSError:
+                status, elapsed = 0, 0
+            samples.append((slow, status, elapsed))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(number < slow_clients) for number in range(clients)
+    ))
+    return samples, time.perf_counter() - started
+
+
+def percentiles(samples, slow):
+    latencies = [
+        elapsed for is_slow, status, elapsed in samples
+        if is_slow == slow and status
+    ]
+    if len(latencies) < 2:
+        return '-\t-'
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return f'{cuts[49]:.0f}\t{cuts[94]:.0f}'
+
+
+def make_jobs(requests, pages, viewer_cookie):
+    urls, _ = make_urls(requests, pages, random.Random(0))
+    jobs = [
+        (url, viewer_cookie if name == 'follow_index' else '')
+        for name in VIEWS for url in urls[name]
+    ]
+    random.Random(1).shuffle(jobs)
+    return jobs
+
+
+def session_cookie():
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from posts.models import Follow
+
+    viewer = get_user_model().objects.get(
+        pk=Follow.objects.order_by('pk').values_list('user', flat=True)[0]
+    )
+    client = Client()
+    client.force_login(viewer)
+    return '{}={}'.format(
+        settings.SESSION_COOKIE_NAME,
+        client.cookies[settings.SESSION_COOKIE_NAME].value,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser, posts=100000)
+    parser.add_argument('--requests', type=int, default=100,
+                        help='Запросов на каждую страницу.')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--slow-clients', type=int, default=8)
+    parser.add_argument('--chunks', type=int, default=3)
+    parser.add_argument('--delay', type=float, default=0.5)
+    args = parser.parse_args()
+
+    prepare(args, DEBUG=False)
+    cookie = session_cookie()
+    jobs = make_jobs(args.requests, args.pages, cookie)
+    from django.db import connections
+    connections.close_all()
+
+    context = multiprocessing.get_context('fork')
+    print(
+        'режим\tзапросов/с\tбыстрые p50, мс\tp95, мс\t'
+        'медленные p50, мс\tp95, мс\tошибок'
+    )
+    for mode in ('wsgi', 'asgi'):
+        ports = context.Queue()
+        server = context.Process(
+            target=serve, daemon=True,
+            args=(mode, args.database, args.threads, ports),
+        )
+        server.start()
+        try:
+            port = ports.get(timeout=60)
+            # Прогрев кешей страниц без медленных клиентов.
+            asyncio.run(load(port, jobs[:args.warmup], args.threads))
+            samples, seconds = asyncio.run(load(
+                port, jobs, args.clients, args.slow_clients,
+                args.chunks, args.delay,
+            ))
+        finally:
+            server.terminate()
+            server.join()
+        errors = sum(status != HTTPStatus.OK for _, status, _ in samples)
+        print(
+            f'{mode}\t{len(samples) / seconds:.1f}\t'
+            f'{percentiles(samples, False)}\t'
+            f'{percentiles(samples, True)}\t{errors}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Ветка комментариев: один запрос и линейная сборка дерева.
+
+Создаёт в базе в памяти пост с веткой из --comments ответов
+случайной формы (глубина до --depth), затем для нескольких размеров
+ветки печатает число SQL-запросов posts.threads.thread, время чтения,
+время build_tree на комментарий (должно не расти с размером) и время
+отрисовки страницы ветки (первая порция) и JSON со всей веткой.
+
+    python benchmarks/comment_thread.py --comments 10000
+"""
+import argparse
+import random
+import time
+
+from seed import setup
+
+
+def make_thread(count, max_depth, rng):
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+    from posts.models import Comment, Post
+    from posts.threads import comment_path
+
+    user = get_user_model().objects.create_user(username='reader')
+    post = Post.objects.create(author=user, text='Пост с веткой')
+    now = timezone.now()
+    comments = []
+    for pk in range(1, count + 1):
+        parent = None
+        if comments:
+            parent = comments[int(len(comments) * rng.random() ** 3)]
+            if parent.depth >= max_depth:
+                parent = None
+        comments.append(Comment(
+            pk=pk,
+            post=post,
+            author=user,
+            parent=parent,
+            depth=parent.depth + 1 if parent else 0,
+            path=comment_path(parent.path if parent else '', pk),
+            text=f'Комментарий {pk}',
+            created=now,
+        ))
+    root = Comment(
+        pk=count + 1, post=post, author=user, depth=0, text='Корень',
+        path=comment_path('', count + 1), created=now,
+    )
+    # Вся ветка — ответы одного корня.
+    for comment in comments:
+        comment.depth += 1
+        comment.path = root.path + comment.path
+        if comment.parent is None:
+            comment.parent = root
+    Comment.objects.bulk_create([root, *comments], batch_size=500)
+    return post, root
+
+
+def measure(post, root, sizes):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+    from posts.threads import build_tree, thread
+
+    print('ответов\tзапросов\tчтение, мс\tдерево, мкс/комм.')
+    for size in sizes:
+        comments = thread(
+            post.comments.select_related('author'), root
+        )[:size + 1]
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            rows = list(comments)
+            read = time.perf_counter() - started
+        started = time.perf_counter()
+        build_tree(rows)
+        tree = time.perf_counter() - started
+        print(
+            f'{len(rows) - 1}\t{len(queries)}\t{read * 1000:.1f}\t'
+            f'{tree / len(rows) * 1e6:.2f}'
+        )
+    url = reverse('posts:comment_thread', args=[post.pk, root.pk])
+    client = Client()
+    for name, params in (('страница', {}), ('JSON', {'format': 'json'})):
+        started = time.perf_counter()
+        response = client.get(url, params)
+        elapsed = time.perf_counter() - started
+        print(
+            f'{name} ветки: {elapsed * 1000:.0f} мс, '
+            f'{len(response.content) // 1024} КБ'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--comments', type=int, default=10000)
+    parser.add_argument('--depth', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup(':memory:', DEBUG=False)
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+    post, root = make_thread(
+        args.comments, args.depth, random.Random(args.seed)
+    )
+    sizes = sorted({
+        size for size in (args.comments // 100, args.comments // 10,
+                          args.comments) if size
+    })
+    measure(post, root, sizes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""Нагрузочный бенчмарк страниц лент.
+
+Заполняет базу командой manage.py seed (если файла ещё нет)
+и запрашивает index, group_posts, profile, post_detail и follow_index
+двумя способами:
+
+* inprocess — тестовым клиентом Django в этом же процессе, без сети;
+* wsgi — по HTTP через yatube.wsgi.application, поднятое на
+  многопоточном wsgiref-сервере, из --concurrency потоков.
+
+Для каждой страницы печатает p50/p95/p99 задержки, запросы в секунду
+и SQL-запросы на ответ (из core.budgets: request.query_stats или
+заголовок Server-Timing) и сохраняет результат в
+benchmarks/results/<время>-<коммит>.json. С --compare печатает
+изменения относительно сохранённого прогона и завершается с ошибкой,
+если p95 вырос больше --max-regression процентов или выросло число
+запросов.
+
+    python benchmarks/feed_load.py --posts 100000 --requests 500
+    python benchmarks/feed_load.py --mode wsgi --concurrency 8 \\
+        --compare benchmarks/results/<прогон>.json
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from seed import BASE_DIR, add_arguments, prepare
+
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmarks', 'results')
+VIEWS = ('index', 'group_posts', 'profile', 'post_detail', 'follow_index')
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def commit():
+    """Короткий хеш текущего коммита; + — есть незакоммиченные правки."""
+    def git(*args):
+        return subprocess.run(
+            ('git', *args), cwd=BASE_DIR, capture_output=True, text=True,
+        ).stdout.strip()
+    sha = git('rev-parse', '--short', 'HEAD') or 'unknown'
+    return sha + ('+' if git('status', '--porcelain', '--', 'yatube') else '')
+
+
+def make_urls(requests, pages, rng):
+    """Перемешанные адреса для каждой страницы и зритель ленты."""
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+    from posts.models import Follow, Group, Post
+
+    User = get_user_model()
+    slugs = list(Group.objects.values_list('slug', flat=True)[:1000])
+    usernames = list(
+        User.objects.order_by('pk').values_list('username', flat=True)[:1000]
+    )
+    post_ids = list(
+        Post.objects.order_by('pk').values_list('pk', flat=True)[:1000]
+    )
+    viewer = User.objects.get(
+        pk=Follow.objects.order_by('pk').values_list('user', flat=True)[0]
+    )
+
+    def page(url):
+        return f'{url}?page={rng.randint(1, pages)}'
+
+    choices = {
+        'index': lambda: page(reverse('posts:index')),
+        'group_posts': lambda: page(
+            reverse('posts:group_posts', args=[rng.choice(slugs)])
+        ),
+        'profile': lambda: page(
+            reverse('posts:profile', args=[rng.choice(usernames)])
+        ),
+        'post_detail': lambda: reverse(
+            'posts:post_detail', args=[rng.choice(post_ids)]
+        ),
+        'follow_index': lambda: page(reverse('posts:follow_index')),
+    }
+    urls = {
+        name: [choices[name]() for _ in range(requests)] for name in VIEWS
+    }
+    return urls, viewer
+
+
+def run_inprocess(viewer, login):
+    """Ответы тестового клиента: [(статус, мс, SQL-запросов)]."""
+    from django.test import Client
+
+    guest, user = Client(), Client()
+    user.force_login(viewer)
+
+    def fetch(client, url):
+        started = time.perf_counter()
+        response = client.get(url)
+        elapsed = (time.perf_counter() - started) * 1000
+        return response.status_code, elapsed, (
+            response.wsgi_request.query_stats.count
+        )
+
+    def run(name, urls, concurrency):
+        client = user if login or name == 'follow_index' else guest
+        return [fetch(client, url) for url in urls]
+    return run
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def run_wsgi(viewer, login):
+    """Ответы yatube.wsgi.application по HTTP."""
+    from django.conf import settings
+    from django.test import Client
+
+    from yatube.wsgi import application
+
+    server = ThreadingWSGIServer(('127.0.0.1', 0), QuietHandler)
+    server.set_app(application)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    client = Client()
+    client.force_login(viewer)
+    cookie = '{}={}'.format(
+        settings.SESSION_COOKIE_NAME,
+        client.cookies[settings.SESSION_COOKIE_NAME].value,
+    )
+
+    def fetch(url, headers):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        started = time.perf_counter()
+        connection.request('GET', url, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        elapsed = (time.perf_counter() - started) * 1000
+        connection.close()
+        match = QUERIES.search(response.getheader('Server-Timing', ''))
+        return response.status, elapsed, int(match[1]) if match else 0
+
+    def run(name, urls, concurrency):
+        headers = {}
+        if login or name == 'follow_index':
+            headers['Cookie'] = cookie
+        with ThreadPoolExecutor(concurrency) as pool:
+            return list(pool.map(lambda url: fetch(url, headers), urls))
+    return run
+
+
+def summarize(samples, seconds):
+    latencies = [elapsed for _, elapsed, _ in samples]
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'requests': len(samples),
+        'errors': sum(status != 200 for status, _, _ in samples),
+        'p50_ms': round(cuts[49], 2),
+        'p95_ms': round(cuts[94], 2),
+        'p99_ms': round(cuts[98], 2),
+        'rps': round(len(samples) / seconds, 1),
+        'queries': round(
+            statistics.mean(queries for _, _, queries in samples), 2
+        ),
+    }
+
+
+def measure(run, urls, warmup, concurrency):
+    results = {}
+    for name in VIEWS:
+        run(name, urls[name][:warmup], concurrency)
+        started = time.perf_counter()
+        samples = run(name, urls[name], concurrency)
+        results[name] = summarize(samples, time.perf_counter() - started)
+    return results
+
+
+def report(results, baseline=None):
+    """Печатает таблицу; возвращает изменения p95 и запросов к базе."""
+    print(
+        'режим\tстраница\tp50, мс\tp95, мс\tp99, мс\tзапросов/с\t'
+        'SQL/ответ\tошибок'
+    )
+    changes = []
+    for mode, views in results.items():
+        for name, row in views.items():
+            line = (
+                f'{mode}\t{name}\t{row["p50_ms"]}\t{row["p95_ms"]}\t'
+                f'{row["p99_ms"]}\t{row["rps"]}\t{row["queries"]}\t'
+                f'{row["errors"]}'
+            )
+            old = (baseline or {}).get(mode, {}).get(name)
+            if old:
+                p95 = (row['p95_ms'] / old['p95_ms'] - 1) * 100
+                queries = row['queries'] - old['queries']
+                line += f'\tp95 {p95:+.0f}%, SQL {queries:+g}'
+                changes.append((mode, name, p95, queries))
+            print(line)
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser, posts=100000)
+    parser.add_argument(
+        '--mode', choices=('inprocess', 'wsgi', 'both'), default='both',
+    )
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument(
+        '--login', action='store_true',
+        help='Все страницы запрашивает вошедший пользователь.',
+    )
+    parser.add_argument(
+        '--cache', default='locmem',
+        help='Кеш из CACHE_PRESETS; dummy — замер без кеша страниц.',
+    )
+    parser.add_argument('--output', help='Файл результатов.')
+    parser.add_argument('--compare', help='Прошлый файл результатов.')
+    parser.add_argument('--max-regression', type=float, default=20)
+    args = parser.parse_args()
+
+    os.environ['YATUBE_CACHE'] = args.cache
+    prepare(args, DEBUG=False, SERVER_TIMING=True)
+    # Превышения бюджетов и медленные запросы видны в отчёте.
+    logging.getLogger('core.budgets').setLevel(logging.ERROR)
+
+    urls, viewer = make_urls(
+        args.requests, args.pages, random.Random(0)
+    )
+    runners = {'inprocess': run_inprocess, 'wsgi': run_wsgi}
+    modes = runners if args.mode == 'both' else (args.mode,)
+    results = {
+        mode: measure(
+            runners[mode](viewer, args.login), urls,
+            args.warmup, args.concurrency,
+        )
+        for mode in modes
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+    changes = report(results, baseline)
+
+    sha = commit()
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'{datetime.now():%Y%m%d-%H%M%S}-{sha}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(
+            {
+                'commit': sha,
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'args': vars(args),
+                'results': results,
+            },
+            file, ensure_ascii=False, indent=2,
+        )
+    print(f'Результаты сохранены в {output}')
+
+    regressions = [
+        change for change in changes
+        # Среднее число запросов плавает при конкурентном кеше.
+        if change[2] > args.max_regression or change[3] >= 1
+    ]
+    for mode, name, p95, queries in regressions:
+        print(f'Регрессия {mode} {name}: p95 {p95:+.0f}%, SQL {queries:+g}')
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Планы и время горячих запросов ленты до и после составных индексов.
+
+Скрипт создаёт отдельную базу SQLite, заполняет её синтетическими
+данными (manage.py seed) и для каждого запроса из posts.views
+печатает EXPLAIN и время выполнения сначала без индексов миграции
+0007_feed_indexes, затем с ними.
+
+    python benchmarks/query_plans.py --posts 1000000
+"""
+import argparse
+import time
+
+from seed import add_arguments, prepare
+
+
+def hot_queries():
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from posts.models import Comment, Group, Post
+
+    User = get_user_model()
+    user = User.objects.order_by('?').first()
+    group = Group.objects.first()
+    post = Comment.objects.values_list('post', flat=True).first()
+    page = settings.VOLUME_POSTS
+    return {
+        'index': Post.objects.select_related('author', 'group')[:page],
+        'group_posts': group.posts.select_related('author')[:page],
+        'profile': user.posts.select_related('group')[:page],
+        'follow_index': Post.objects.filter(
+            author__following__user=user
+        ).select_related('author', 'group')[:page],
+        'post_detail comments': Comment.objects.filter(
+            post_id=post
+        ).order_by('created'),
+        'profile following': user.following.filter(user=user),
+    }
+
+
+def measure(title, repeat):
+    print(f'\n===== {title} =====')
+    for name, queryset in hot_queries().items():
+        started = time.perf_counter()
+        for _ in range(repeat):
+            list(queryset.all())
+        elapsed = (time.perf_counter() - started) / repeat * 1000
+        print(f'\n--- {name}: {elapsed:.2f} ms')
+        print(queryset.explain())
+
+
+def feed_indexes():
+    """Индексы, которые добавляет миграция 0007_feed_indexes.
+
+    Остальные индексы моделей (счётчики, поиск, ветки комментариев)
+    не трогаем: сравниваются планы именно с индексами ленты и без них.
+    """
+    from importlib import import_module
+
+    from django.apps import apps
+
+    migration = import_module('posts.migrations.0007_feed_indexes')
+    for operation in migration.Migration.operations:
+        model = apps.get_model('posts', operation.model_name)
+        yield model, operation.index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    prepare(args)
+
+    from django.db import connection
+
+    with connection.schema_editor() as editor:
+        for model, index in feed_indexes():
+            editor.remove_index(model, index)
+    measure('без составных индексов', args.repeat)
+    with connection.schema_editor() as editor:
+        for model, index in feed_indexes():
+            editor.add_index(model, index)
+    measure('с составными индексами', args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Общая база для бенчмарков.
+
+Данные создаёт команда manage.py seed (posts.seeding) в отдельном
+файле SQLite. Скрипты подключают общие аргументы через add_arguments
+и получают готовую базу из prepare: если файла ещё нет, он
+создаётся и заполняется, иначе используется как есть.
+"""
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+
+def add_arguments(parser, posts=1000000):
+    parser.add_argument('--database', default='query_plans.sqlite3')
+    parser.add_argument('--posts', type=int, default=posts)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--groups', type=int, default=100)
+    parser.add_argument('--follows-per-user', type=int, default=20)
+    parser.add_argument('--comments', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument(
+        '--search-index', action='store_true',
+        help='Заполнить поисковый индекс (долго на больших базах).',
+    )
+
+
+def setup(database, **overrides):
+    """Настраивает Django на отдельную базу; overrides — настройки."""
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = database
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    django.setup()
+
+
+def prepare(args, **overrides):
+    """Готовит базу из аргументов add_arguments; заполняет новую."""
+    fresh = not os.path.exists(args.database)
+    setup(args.database, **overrides)
+
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    if fresh:
+        print(f'Заполняем {args.database}: {args.posts} постов...')
+        call_command(
+            'seed',
+            users=args.users,
+            groups=args.groups,
+            posts=args.posts,
+            comments=args.comments,
+            follows_per_user=args.follows_per_user,
+            seed=args.seed,
+            processes=args.processes,
+            search_index=args.search_index,
+        )
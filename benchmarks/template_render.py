@@ -0,0 +1,67 @@
+"""Время отрисовки шаблонов страниц лент.
+
+Запрашивает index, group_posts, profile, post_detail и follow_index
+на базе из manage.py seed и по request.template_stats
+(core.template_timing) печатает для каждого шаблона число отрисовок
+на страницу, время одной отрисовки вместе с вложенными и без них и
+бюджет из TEMPLATE_BUDGETS. По умолчанию кеш выключен (--cache dummy),
+иначе страницы и карточки постов приходят из кеша без отрисовки.
+
+    python benchmarks/template_render.py --posts 100000 --repeat 20
+"""
+import argparse
+import os
+import random
+
+from seed import add_arguments, prepare
+
+
+def measure(repeat):
+    from django.conf import settings
+    from django.test import Client
+
+    from feed_load import VIEWS, make_urls
+
+    urls, viewer = make_urls(repeat, 5, random.Random(0))
+    client = Client()
+    client.force_login(viewer)
+    for view in VIEWS:
+        totals = {}
+        for url in urls[view]:
+            response = client.get(url)
+            for name, calls, total, own in (
+                response.wsgi_request.template_stats.slowest()
+            ):
+                row = totals.setdefault(name, [0, 0.0, 0.0])
+                row[0] += calls
+                row[1] += total
+                row[2] += own
+        print(f'\n{view}')
+        print('шаблон\tна страницу\tмс/отрисовку\tбез вложенных\tбюджет')
+        for name, (calls, total, own) in sorted(
+            totals.items(), key=lambda item: -item[1][2]
+        ):
+            budget = settings.TEMPLATE_BUDGETS.get(
+                name, settings.TEMPLATE_BUDGET_DEFAULT_MS
+            )
+            mark = '' if total / calls <= budget else '\tПРЕВЫШЕН'
+            print(
+                f'{name}\t{calls / repeat:g}\t{total / calls:.2f}\t'
+                f'{own / calls:.2f}\t{budget}{mark}'
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser, posts=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--cache', default='dummy')
+    args = parser.parse_args()
+
+    os.environ['YATUBE_CACHE'] = args.cache
+    prepare(args, DEBUG=False)
+    measure(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Пиковая память процесса на одну загрузку картинки поста.
+
+Для каждого файла запускается отдельный процесс, который проверяет
+загрузку и строит миниатюру с вариантами так, как это делалось
+раньше (полное декодирование без ограничений) и как сейчас (проверка
+по заголовку, ограничения posts.uploads, JPEG-draft в
+posts.thumbnails). Печатается
+прирост пикового RSS (VmHWM) относительно процесса после
+django.setup(); нужен Linux.
+
+    python benchmarks/upload_memory.py
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+# имя файла, формат, режим, размер
+CASES = (
+    ('photo.jpg', 'JPEG', 'RGB', (6000, 4000)),
+    ('screenshot.png', 'PNG', 'RGB', (3000, 2000)),
+    ('bomb.png', 'PNG', 'L', (12000, 12000)),
+)
+
+
+def memory(field):
+    """Поле VmRSS или VmHWM из /proc/self/status в мегабайтах."""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f'{field} не найден в /proc/self/status')
+
+
+def reset_peak():
+    """Сбрасывает VmHWM до текущего RSS (Linux 4.0+)."""
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+
+
+def make_files(directory):
+    from PIL import Image
+
+    for name, fmt, mode, size in CASES:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            continue
+        # Фрактал сжимается примерно как фотография, а однотонная
+        # картинка — как «бомба» с огромным растром в маленьком файле.
+        if mode == 'L':
+            image = Image.new(mode, size)
+        else:
+            image = Image.effect_mandelbrot(
+                size, (-2, -1, 1, 1), 100
+            ).convert(mode)
+        image.save(path, fmt)
+        image.close()
+
+
+def upload(path):
+    from django.core.files.uploadedfile import UploadedFile
+
+    class DiskUpload(UploadedFile):
+        """Как TemporaryUploadedFile: файл больше лимита памяти."""
+
+        def temporary_file_path(self):
+            return path
+
+    return DiskUpload(
+        open(path, 'rb'), os.path.basename(path), size=os.path.getsize(path)
+    )
+
+
+def before(path):
+    from django import forms
+    from PIL import Image, JpegImagePlugin
+    from posts.thumbnails import render_images
+
+    # Без ограничений размеров и без уменьшенного декодирования JPEG.
+    Image.MAX_IMAGE_PIXELS = None
+    JpegImagePlugin.JpegImageFile.draft = lambda *args: None
+    forms.ImageField().clean(upload(path))
+    render_images(os.path.basename(path))
+    return 'ok'
+
+
+def after(path):
+    from django.core.exceptions import ValidationError
+    from posts.thumbnails import render_images
+    from posts.uploads import inspect_image, strip_metadata
+
+    image = upload(path)
+    try:
+        strip_metadata(image, inspect_image(image))
+    except ValidationError as error:
+        return f'отклонено: {error.messages[0]}'
+    render_images(os.path.basename(path))
+    return 'ok'
+
+
+def child(mode, path):
+    import django
+    from django.conf import settings
+
+    settings.MEDIA_ROOT = os.path.dirname(path)
+    django.setup()
+    reset_peak()
+    baseline = memory('VmRSS')
+    result = {'before': before, 'after': after}[mode](path)
+    print(f'{memory("VmHWM") - baseline:.0f}\t{result}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dir', default=os.path.join(
+        tempfile.gettempdir(), 'yatube-upload-memory'
+    ))
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    options = parser.parse_args()
+    if options.child:
+        child(*options.child)
+        return
+    os.makedirs(options.dir, exist_ok=True)
+    make_files(options.dir)
+    print('файл\tразмер\tдо, МБ\tпосле, МБ\tрезультат')
+    for name, _, _, size in CASES:
+        path = os.path.join(options.dir, name)
+        rows = [
+            subprocess.run(
+                [sys.executable, __file__, '--child', mode, path],
+                check=True, capture_output=True, text=True,
+            ).stdout.strip().split('\t')
+            for mode in ('before', 'after')
+        ]
+        print(
+            f'{name}\t{size[0]}x{size[1]}\t{rows[0][0]}\t{rows[1][0]}\t'
+            f'{rows[1][1]}'
+        )
+
+
+if __name__ == '__main__':
+    main()
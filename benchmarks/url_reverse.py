@@ -0,0 +1,85 @@
+"""Построение адресов карточек постов: {% url %} против core.url_cache.
+
+Отрисовывает список из 10 постов с автором и группой --repeat раз
+двумя способами: через {% url %} (reverse() на каждую ссылку) и через
+get_absolute_url()/get_edit_url() моделей, и печатает время на страницу.
+Посты не сохраняются, база не нужна.
+
+    python benchmarks/url_reverse.py --repeat 10000
+"""
+import argparse
+import time
+
+from seed import setup
+
+CARD = '''{% for post in posts %}
+<a href="{URL_PROFILE}">{{ post.author.username }}</a>
+<a href="{URL_DETAIL}">подробная информация</a>
+<a href="{URL_GROUP}">все записи группы</a>
+<a href="{URL_EDIT}">Редактировать</a>
+{% endfor %}'''
+
+TAGS = {
+    'URL_PROFILE': "{% url 'posts:profile' post.author.username %}",
+    'URL_DETAIL': "{% url 'posts:post_detail' post.pk %}",
+    'URL_GROUP': "{% url 'posts:group_posts' post.group.slug %}",
+    'URL_EDIT': "{% url 'posts:post_edit' post.pk %}",
+}
+METHODS = {
+    'URL_PROFILE': '{{ post.author.get_absolute_url }}',
+    'URL_DETAIL': '{{ post.get_absolute_url }}',
+    'URL_GROUP': '{{ post.group.get_absolute_url }}',
+    'URL_EDIT': '{{ post.get_edit_url }}',
+}
+VARIANTS = {'{% url %}': TAGS, 'методы моделей': METHODS}
+
+
+def make_posts(count):
+    from django.contrib.auth import get_user_model
+    from posts.models import Group, Post
+
+    User = get_user_model()
+    return [
+        Post(
+            pk=1000 + number,
+            author=User(pk=number, username=f'user{number}'),
+            group=Group(pk=number, slug=f'group-{number}'),
+        )
+        for number in range(count)
+    ]
+
+
+def measure(name, links, posts, repeat):
+    from django.template import Context, Template
+
+    source = CARD
+    for placeholder, value in links.items():
+        source = source.replace('{' + placeholder + '}', value)
+    template = Template(source)
+    context = Context({'posts': posts})
+    html = template.render(context)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        template.render(context)
+    elapsed = time.perf_counter() - started
+    print(f'{name}\t{elapsed:.2f} с\t{elapsed / repeat * 1e6:.0f} мкс/стр')
+    return html
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10000)
+    parser.add_argument('--posts', type=int, default=10)
+    args = parser.parse_args()
+
+    setup(':memory:', DEBUG=False)
+    posts = make_posts(args.posts)
+    pages = [
+        measure(name, links, posts, args.repeat)
+        for name, links in VARIANTS.items()
+    ]
+    assert len(set(pages)) == 1, 'адреса различаются'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Поля ресурсов API.
+
+Каждое поле — функция от объекта. Клиент выбирает поля параметром
+?fields=id,text (sparse fieldsets); без него отдаются поля по
+умолчанию. Связанные модели подгружаются select_related, только
+если их поля запрошены.
+"""
+
+
+class FieldsError(ValueError):
+    """В ?fields= есть неизвестные поля."""
+
+
+class Serializer:
+    def __init__(self, fields, default=None, related=None):
+        self.fields = fields
+        self.default = tuple(default or fields)
+        self.related = related or {}
+
+    def names(self, request):
+        """Запрошенные поля в порядке из ?fields=."""
+        requested = request.GET.get('fields')
+        if not requested:
+            return self.default
+        names = tuple(dict.fromkeys(
+            name.strip() for name in requested.split(',') if name.strip()
+        ))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise FieldsError(
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(self.fields)}.'
+            )
+        return names
+
+    def prepare(self, queryset, names):
+        related = {self.related[name] for name in names
+                   if name in self.related}
+        return queryset.select_related(*sorted(related))
+
+    def serialize(self, obj, names):
+        return {name: self.fields[name](obj) for name in names}
+
+
+def _date(value):
+    return value.isoformat()
+
+
+def _image(post):
+    return post.image.url if post.image else None
+
+
+def _group(post):
+    return post.group.slug if post.group_id else None
+
+
+POST = Serializer(
+    {
+        'id': lambda post: post.pk,
+        'text': lambda post: post.text,
+        'pub_date': lambda post: _date(post.pub_date),
+        'author': lambda post: post.author.username,
+        'group': _group,
+        'image': _image,
+        'comments_count': lambda post: post.comments_count,
+        'url': lambda post: post.get_absolute_url(),
+    },
+    default=('id', 'text', 'pub_date', 'author', 'group', 'image'),
+    related={'author': 'author', 'group': 'group'},
+)
+
+GROUP = Serializer(
+    {
+        'slug': lambda group: group.slug,
+        'title': lambda group: group.title,
+        'description': lambda group: group.description,
+        'posts_count': lambda group: group.posts_count,
+        'url': lambda group: group.get_absolute_url(),
+    },
+)
+
+COMMENT = Serializer(
+    {
+        'id': lambda comment: comment.pk,
+        'text': lambda comment: comment.text,
+        'created': lambda comment: _date(comment.created),
+        'author': lambda comment: comment.author.username,
+        'parent': lambda comment: comment.parent_id,
+        'depth': lambda comment: comment.depth,
+    },
+    related={'author': 'author'},
+)
+
+USER = Serializer(
+    {
+        'username': lambda user: user.username,
+        'full_name': lambda user: user.get_full_name(),
+        'url': lambda user: user.get_absolute_url(),
+    },
+    default=('username', 'full_name'),
+)
@@ -0,0 +1,167 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import encode_cursor
+
+NUMBER_OF_POSTS = 5
+
+User = get_user_model()
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            for number in range(NUMBER_OF_POSTS)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_pages_cover_feed(self):
+        """Курсоры next обходят ленту без пропусков и повторов."""
+        address = reverse('api:posts') + '?limit=2'
+        ids = []
+        while address:
+            data = self.client.get(address).json()
+            ids += [post['id'] for post in data['results']]
+            address = data['next']
+        expected = Post.objects.order_by('-pub_date', '-pk')
+        self.assertEqual(ids, [post.pk for post in expected])
+
+    def test_sparse_fieldsets(self):
+        """?fields= оставляет только запрошенные поля."""
+        response = self.client.get(
+            reverse('api:group_posts', args=[self.group.slug]),
+            {'fields': 'id,author'},
+        )
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': self.posts[-1].pk, 'author': 'author'},
+        )
+        response = self.client.get(reverse('api:posts'), {'fields': 'secret'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_unchanged_feed_returns_304_without_queries(self):
+        """Неизменная лента отдаёт 304 без запросов к базе."""
+        address = reverse('api:user_posts', args=[self.author.username])
+        response = self.client.get(address)
+        self.assertTrue(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                address,
+                HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+            )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=self.author, text='Свежий пост')
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['text'], 'Свежий пост')
+
+    def test_comment_changes_post_etag(self):
+        """Новый комментарий меняет ETag поста и его комментариев."""
+        post = self.posts[0]
+        addresses = (
+            reverse('api:post', args=[post.pk]),
+            reverse('api:post_comments', args=[post.pk]),
+        )
+        etags = [self.client.get(address)['ETag'] for address in addresses]
+        Comment.objects.create(post=post, author=self.reader, text='Ого')
+        for address, etag in zip(addresses, etags):
+            with self.subTest(address=address):
+                response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            response.json()['results'][0]['text'], 'Ого'
+        )
+
+    def test_follow_lists_and_feed(self):
+        """Подписки, подписчики и лента подписок."""
+        followers = self.client.get(
+            reverse('api:followers', args=[self.author.username])
+        ).json()
+        self.assertEqual(
+            followers['results'], [{'username': 'reader', 'full_name': ''}]
+        )
+        following = self.client.get(
+            reverse('api:following', args=[self.reader.username])
+        ).json()
+        self.assertEqual(following['results'][0]['username'], 'author')
+        address = reverse('api:follow')
+        self.assertEqual(
+            self.client.get(address).status_code, HTTPStatus.UNAUTHORIZED
+        )
+        self.client.force_login(self.reader)
+        data = self.client.get(address, {'limit': 100}).json()
+        self.assertEqual(len(data['results']), NUMBER_OF_POSTS)
+
+    def test_forged_cursor_returns_first_page(self):
+        """Подделанный курсор и негодный ?limit= — первая страница."""
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Комментарий'
+        )
+        for address, first in (
+            (reverse('api:posts'), self.posts[-1].pk),
+            (reverse('api:post_comments', args=[self.posts[0].pk]), None),
+            (reverse('api:followers', args=[self.author.username]), None),
+        ):
+            for values in ([5, 'x'], [None], [None, None], [[1], 2]):
+                with self.subTest(address=address, values=values):
+                    response = self.client.get(
+                        address, {'cursor': encode_cursor('n', values)}
+                    )
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+                    self.assertEqual(len(response.json()['results']), (
+                        NUMBER_OF_POSTS if first else 1
+                    ))
+                    if first:
+                        self.assertEqual(
+                            response.json()['results'][0]['id'], first
+                        )
+        for limit in ('²', '9' * 5000):
+            with self.subTest(limit=limit[:10]):
+                response = self.client.get(
+                    reverse('api:posts'), {'limit': limit}
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_missing_objects(self):
+        """Несуществующие объекты — 404 в JSON."""
+        for address in (
+            reverse('api:post', args=[0]),
+            reverse('api:group_posts', args=['missing']),
+            reverse('api:user_posts', args=['missing']),
+        ):
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertIn('detail', response.json())
+
+    def test_read_only(self):
+        """Запись через API недоступна."""
+        response = self.client.post(reverse('api:posts'))
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED
+        )
@@ -0,0 +1,20 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.post_list, name='posts'),
+    path('posts/<int:post_id>/', views.post_detail, name='post'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
+    path('groups/', views.group_list, name='groups'),
+    path('groups/<slug:slug>/posts/', views.group_posts, name='group_posts'),
+    path('users/<str:username>/posts/', views.user_posts, name='user_posts'),
+    path('users/<str:username>/followers/', views.follower_list,
+         name='followers'),
+    path('users/<str:username>/following/', views.following_list,
+         name='following'),
+    path('follow/', views.follow_index, name='follow'),
+]
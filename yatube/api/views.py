@@ -0,0 +1,172 @@
+"""JSON API только для чтения.
+
+Списки листаются курсором (posts.utils.CursorPaginator): ссылки
+next и previous несут ?cursor=, размер страницы — ?limit= до
+API_MAX_PAGE_SIZE. Поля выбираются ?fields= (api.serializers).
+
+Ответ зависит только от поколений лент (posts.cache), поэтому
+ETag и Last-Modified считаются, как у страниц (posts.conditional),
+и повторный запрос с If-None-Match или If-Modified-Since получает
+304 после одного обращения к кешу: без запроса списка и без
+сериализации.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from core.budgets import query_budget
+from posts.cache import (GLOBAL_FEED, author_feed_name, follow_feeds,
+                         follow_list_feeds, group_feed_name, post_feeds)
+from posts.conditional import feed_condition, http_cache
+from posts.feed import follow_feed
+from posts.models import Follow, Group, Post
+from posts.utils import (COMMENT_CURSOR_ORDERING, DEFAULT_CURSOR_ORDERING,
+                         CursorPaginator)
+
+from .serializers import COMMENT, GROUP, POST, USER, FieldsError
+
+API_VERSION = 'v1'
+
+User = get_user_model()
+
+
+def api_view(feeds_for, private=False):
+    """GET-представление API с условными ответами.
+
+    feeds_for(request, **kwargs) — ленты, от которых зависит ответ.
+    Ответы private зависят от пользователя и требуют входа.
+    """
+    def user_part(request):
+        return str(request.user.pk) if private else ''
+
+    def decorator(view):
+        conditional = http_cache(feed_condition(
+            feeds_for, user_part, version=API_VERSION
+        )(view))
+
+        @wraps(view)
+        @require_safe
+        def wrapper(request, *args, **kwargs):
+            if private and not request.user.is_authenticated:
+                return JsonResponse(
+                    {'detail': 'Нужно войти.'}, status=401
+                )
+            try:
+                return conditional(request, *args, **kwargs)
+            except Http404:
+                return JsonResponse({'detail': 'Не найдено.'}, status=404)
+            except FieldsError as error:
+                return JsonResponse({'detail': str(error)}, status=400)
+        return wrapper
+    return decorator
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', ''))
+    except ValueError:
+        return settings.API_PAGE_SIZE
+    return min(max(limit, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def _page(request, queryset, serializer, ordering=DEFAULT_CURSOR_ORDERING,
+          attribute=None):
+    """Страница списка; attribute — поле строк со связанным объектом."""
+    names = serializer.names(request)
+    if attribute is None:
+        queryset = serializer.prepare(queryset, names)
+    page = CursorPaginator(queryset, _limit(request), ordering).get_page(
+        request.GET.get('cursor')
+    )
+    objects = page if attribute is None else [
+        getattr(row, attribute) for row in page
+    ]
+    return JsonResponse({
+        'results': [serializer.serialize(obj, names) for obj in objects],
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.previous_cursor),
+    })
+
+
+@query_budget(queries=3, db_ms=200)
+@api_view(lambda request: [GLOBAL_FEED])
+def post_list(request):
+    """Все посты, новые первыми."""
+    return _page(request, Post.objects.all(), POST)
+
+
+@query_budget(queries=3, db_ms=200)
+@api_view(lambda request, post_id: post_feeds(post_id))
+def post_detail(request, post_id):
+    names = POST.names(request)
+    post = get_object_or_404(POST.prepare(Post.objects, names), pk=post_id)
+    return JsonResponse(POST.serialize(post, names))
+
+
+@query_budget(queries=4, db_ms=200)
+@api_view(lambda request, post_id: post_feeds(post_id))
+def post_comments(request, post_id):
+    """Комментарии поста в порядке веток (posts.threads)."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    return _page(
+        request, post.comments.all(), COMMENT, COMMENT_CURSOR_ORDERING
+    )
+
+
+@query_budget(queries=3, db_ms=200)
+@api_view(lambda request: [GLOBAL_FEED])
+def group_list(request):
+    return _page(request, Group.objects.all(), GROUP, ('slug',))
+
+
+@query_budget(queries=4, db_ms=200)
+@api_view(lambda request, slug: [group_feed_name(slug)])
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return _page(request, group.posts.all(), POST)
+
+
+@query_budget(queries=4, db_ms=200)
+@api_view(lambda request, username: [author_feed_name(username)])
+def user_posts(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return _page(request, author.posts.all(), POST)
+
+
+@query_budget(queries=4, db_ms=200)
+@api_view(lambda request, username: follow_list_feeds(username))
+def follower_list(request, username):
+    """Подписчики пользователя, новые первыми."""
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    follows = Follow.objects.filter(author=author).select_related('user')
+    return _page(request, follows, USER, ('-pk',), attribute='user')
+
+
+@query_budget(queries=4, db_ms=200)
+@api_view(lambda request, username: follow_list_feeds(username))
+def following_list(request, username):
+    """Авторы, на которых подписан пользователь, новые первыми."""
+    user = get_object_or_404(User.objects.only('pk'), username=username)
+    follows = Follow.objects.filter(user=user).select_related('author')
+    return _page(request, follows, USER, ('-pk',), attribute='author')
+
+
+@query_budget(queries=5, db_ms=200)
+@api_view(
+    lambda request: follow_feeds(request.user.pk), private=True
+)
+def follow_index(request):
+    """Лента подписок пользователя."""
+    return _page(request, follow_feed(request.user), POST)
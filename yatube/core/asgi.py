@@ -0,0 +1,202 @@
+"""ASGI-обёртка над WSGI-приложением Django.
+
+Django 2.2 не умеет ASGI и асинхронные представления, а ORM
+синхронный, поэтому представления по-прежнему выполняются в
+потоках — в пуле из ASGI_THREADS штук. Асинхронной остаётся
+работа с соединением: тело запроса читается и ответ отправляется
+в цикле событий сервера (uvicorn, daphne, hypercorn), так что
+медленный клиент занимает поток только на время самого
+представления, а не на всё время передачи данных.
+
+Обычный ответ собирается целиком в том же потоке, что и
+представление, и там же закрывается, чтобы сигнал request_finished
+закрыл соединения с базой этого потока. Потоковый ответ
+(StreamingHttpResponse, FileResponse) читается по частям и
+закрывается в отдельном потоке этого запроса: соединения генератора
+и request_finished остаются в одном потоке, а поток пула после
+представления сразу освобождается, закрыв свои соединения.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+# Тело запроса больше этого размера уходит во временный файл.
+BODY_MEMORY_SIZE = 2 * 1024 * 1024
+
+
+def _latin1(value):
+    """Строка для environ: WSGI передаёт байты как latin-1."""
+    return value.encode().decode('latin-1')
+
+
+def make_environ(scope, body):
+    """environ WSGI для HTTP-запроса ASGI с телом body (файлом)."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': _latin1(scope.get('root_path', '')),
+        'PATH_INFO': _latin1(scope['path']),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = name
+        else:
+            key = 'HTTP_' + name
+        if key in environ:
+            # Части Cookie (HTTP/2, RFC 6265) склеиваются через '; ',
+            # остальные повторы заголовка — через запятую.
+            separator = '; ' if key == 'HTTP_COOKIE' else ','
+            value = f'{environ[key]}{separator}{value}'
+        environ[key] = value
+    return environ
+
+
+class ASGIHandler:
+    """ASGI-приложение (версия 3) из WSGI-приложения application."""
+
+    def __init__(self, application, threads=None):
+        self.application = application
+        self.threads = threads
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.threads or settings.ASGI_THREADS,
+                thread_name_prefix='asgi',
+            )
+        return self._executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._executor is not None:
+                    self._executor.shutdown()
+                    self._executor = None
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        try:
+            await self.respond(make_environ(scope, body), send)
+        finally:
+            body.close()
+
+    async def respond(self, environ, send):
+        loop = asyncio.get_running_loop()
+        started, response, body = await loop.run_in_executor(
+            self.executor, self.run, environ
+        )
+        if body is not None:
+            await self.start(send, started)
+            await send({'type': 'http.response.body', 'body': body})
+            return
+        stream = ThreadPoolExecutor(1, thread_name_prefix='asgi-stream')
+        try:
+            rest = await loop.run_in_executor(stream, iter, response)
+            # Генератор может вызвать start_response при первой части.
+            chunk = await loop.run_in_executor(stream, next, rest, None)
+            await self.start(send, started)
+            while chunk is not None:
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+                chunk = await loop.run_in_executor(stream, next, rest, None)
+            await send({'type': 'http.response.body'})
+        finally:
+            await loop.run_in_executor(stream, self.finish, response)
+            stream.shutdown(wait=False)
+
+    async def start(self, send, started):
+        status, headers = started
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers,
+        })
+
+    async def read_body(self, receive):
+        """Тело запроса; None, если клиент отключился."""
+        body = tempfile.SpooledTemporaryFile(max_size=BODY_MEMORY_SIZE)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        return body
+
+    def run(self, environ):
+        """Выполняет WSGI-приложение в потоке пула.
+
+        Возвращает [статус, заголовки], ответ и тело целиком; для
+        потокового ответа тело None, а [статус, заголовки] может
+        заполнить первая часть.
+        """
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [int(status.split(' ', 1)[0]), [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]]
+
+        response = self.application(environ, start_response)
+        if getattr(response, 'streaming', True):
+            # request_finished придёт из потока ответа (finish).
+            close_old_connections()
+            return started, response, None
+        try:
+            return started, response, b''.join(response)
+        finally:
+            response.close()
+
+    @staticmethod
+    def finish(response):
+        """Закрывает потоковый ответ и все соединения его потока."""
+        try:
+            close = getattr(response, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            connections.close_all()
@@ -0,0 +1,152 @@
+"""Бюджеты запросов к БД и времени ответа для представлений.
+
+Декоратор query_budget объявляет, сколько SQL-запросов и миллисекунд
+в БД может потратить представление. QueryBudgetMiddleware считает
+запросы всех соединений за время обработки запроса (вместе с сессией
+и пользователем из других middleware) и при превышении:
+
+* бросает QueryBudgetExceeded, если QUERY_BUDGET_RAISE включён
+  (в тестах — так они падают на лишних запросах);
+* иначе пишет предупреждение в лог core.budgets.
+
+Так же проверяются бюджеты шаблонов TEMPLATE_BUDGETS: миллисекунд на
+одну отрисовку шаблона вместе с вложенными (core.template_timing).
+Превышения по времени — db_ms и бюджеты шаблонов — зависят от
+загрузки машины и бросают исключение только при TIMING_BUDGET_RAISE.
+
+Запросы дольше SLOW_REQUEST_MS пишутся в тот же лог всегда. При
+SERVER_TIMING (по умолчанию равен DEBUG) в ответ добавляется заголовок
+Server-Timing с временем в БД и самыми долгими шаблонами.
+"""
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .template_timing import TemplateStats, listening
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление превысило объявленный бюджет."""
+
+
+class Budget:
+    def __init__(self, queries=None, db_ms=None):
+        self.queries = queries
+        self.db_ms = db_ms
+
+    def violations(self, stats):
+        """Описания превышений числа запросов или пустой список."""
+        if self.queries is not None and stats.count > self.queries:
+            return [f'{stats.count} запросов из {self.queries}']
+        return []
+
+    def timing_violations(self, stats):
+        """Описания превышений времени в БД или пустой список."""
+        if self.db_ms is not None and stats.db_ms > self.db_ms:
+            return [f'{stats.db_ms:.1f} мс в БД из {self.db_ms}']
+        return []
+
+
+def query_budget(queries=None, db_ms=None):
+    """Объявляет бюджет представления.
+
+    Ставится самым внешним декоратором: middleware ищет бюджет у
+    функции, на которую указывает URL.
+    """
+    def decorator(view):
+        view.query_budget = Budget(queries, db_ms)
+        return view
+    return decorator
+
+
+def template_violations(templates):
+    """Шаблоны, отрисовка которых дольше их бюджета."""
+    problems = []
+    for name, calls, total_ms, _ in templates.slowest():
+        budget = settings.TEMPLATE_BUDGETS.get(
+            name, settings.TEMPLATE_BUDGET_DEFAULT_MS
+        )
+        if total_ms / calls > budget:
+            problems.append(
+                f'{name}: {total_ms / calls:.1f} мс на отрисовку из {budget}'
+            )
+    return problems
+
+
+class QueryStats:
+    """execute_wrapper, который считает запросы и время в БД."""
+
+    def __init__(self):
+        self.count = 0
+        self.db_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.db_ms += (time.perf_counter() - started) * 1000
+
+
+class QueryBudgetMiddleware:
+    """Проверяет бюджеты представлений; ставится в начало MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        templates = TemplateStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(stats)
+                )
+            stack.enter_context(listening(templates))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        request.query_stats = stats
+        request.template_stats = templates
+        self.check(request, stats, templates, total_ms)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={stats.db_ms:.1f};desc="{stats.count} queries"',
+                *(
+                    f'tpl{number};dur={total:.1f};desc="{name} x{calls}"'
+                    for number, (name, calls, total, _) in enumerate(
+                        templates.slowest(3)
+                    )
+                ),
+                f'total;dur={total_ms:.1f}',
+            ])
+        return response
+
+    def check(self, request, stats, templates, total_ms):
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        if total_ms > settings.SLOW_REQUEST_MS:
+            logger.warning(
+                'Медленный запрос %s %s: %.0f мс, %d запросов (%.1f мс в БД)',
+                request.method, view_name, total_ms, stats.count,
+                stats.db_ms,
+            )
+        budget = getattr(match.func, 'query_budget', None) if match else None
+        problems = budget.violations(stats) if budget else []
+        timing = budget.timing_violations(stats) if budget else []
+        timing += template_violations(templates)
+        if not problems and not timing:
+            return
+        message = (
+            f'Бюджет {view_name} превышен: {", ".join(problems + timing)}'
+        )
+        if (problems and settings.QUERY_BUDGET_RAISE
+                or timing and settings.TIMING_BUDGET_RAISE):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
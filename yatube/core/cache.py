@@ -0,0 +1,155 @@
+"""Двухуровневый кеш: L1 в памяти процесса перед общим L2.
+
+L2 — любой кеш из settings.CACHES (LOCATION — его алиас), общий
+для всех воркеров и узлов. L1 — LocMemCache процесса с коротким
+таймаутом.
+
+Согласованность между уровнями:
+* ключи с префиксами из L2_ONLY_PREFIXES (изменяемые значения:
+  поколения лент, блокировки) никогда не попадают в L1;
+* delete/delete_many/incr/clear ключей из L1 меняют эпоху в L2,
+  и каждый процесс не реже раза в EPOCH_INTERVAL секунд сверяет
+  её и очищает свой L1;
+* остальные значения считаются неизменяемыми для своего ключа, как
+  страницы и фрагменты с версией в ключе (posts.cache).
+"""
+import time
+import uuid
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+EPOCH_KEY = 'two_tier:epoch'
+
+# Время последней сверки эпохи по имени L1; общее для потоков процесса.
+_epoch_checked = {}
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        self._l2_only = tuple(options.get('L2_ONLY_PREFIXES', ()))
+        self._epoch_interval = options.get('EPOCH_INTERVAL', 1)
+        self._l1_name = options.get('L1_NAME', f'two-tier:{location}')
+        self._l1 = LocMemCache(self._l1_name, {
+            'TIMEOUT': self._l1_timeout,
+            'OPTIONS': {
+                'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 1000),
+            },
+        })
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _local(self, key):
+        return not key.startswith(self._l2_only)
+
+    def _l1_ttl(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self._l1_timeout
+        return min(timeout, self._l1_timeout)
+
+    def _sync_epoch(self):
+        """Очищает L1, если другой процесс что-то удалил из L2."""
+        now = time.monotonic()
+        if now - _epoch_checked.get(self._l1_name, 0) < self._epoch_interval:
+            return
+        _epoch_checked[self._l1_name] = now
+        epoch = self.l2.get(EPOCH_KEY)
+        if epoch != self._l1.get(EPOCH_KEY):
+            self._l1.clear()
+            self._l1.set(EPOCH_KEY, epoch, None)
+
+    def _bump_epoch(self):
+        epoch = uuid.uuid4().hex
+        self.l2.set(EPOCH_KEY, epoch, None)
+        self._l1.set(EPOCH_KEY, epoch, None)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version)
+        if added and self._local(key):
+            self._l1.set(key, value, self._l1_ttl(timeout), version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        if self._local(key):
+            self._sync_epoch()
+            value = self._l1.get(key, self, version)
+            if value is not self:
+                return value
+        value = self.l2.get(key, self, version)
+        if value is self:
+            return default
+        if self._local(key):
+            self._l1.set(key, value, self._l1_timeout, version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version)
+        if self._local(key):
+            self._l1.set(key, value, self._l1_ttl(timeout), version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.l2.delete(key, version)
+        if self._local(key):
+            self._l1.delete(key, version)
+            self._bump_epoch()
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        self._sync_epoch()
+        found = self._l1.get_many(
+            [key for key in keys if self._local(key)], version
+        )
+        missing = [key for key in keys if key not in found]
+        if missing:
+            from_l2 = self.l2.get_many(missing, version)
+            local = {
+                key: value for key, value in from_l2.items()
+                if self._local(key)
+            }
+            if local:
+                self._l1.set_many(local, self._l1_timeout, version)
+            found.update(from_l2)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version)
+        local = {
+            key: value for key, value in data.items()
+            if self._local(key) and key not in failed
+        }
+        if local:
+            self._l1.set_many(local, self._l1_ttl(timeout), version)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l2.delete_many(keys, version)
+        local = [key for key in keys if self._local(key)]
+        if local:
+            self._l1.delete_many(local, version)
+            self._bump_epoch()
+
+    def has_key(self, key, version=None):
+        return self.get(key, self, version) is not self
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version)
+        if self._local(key):
+            self._l1.delete(key, version)
+            self._bump_epoch()
+        return value
+
+    def clear(self):
+        self.l2.clear()
+        self._l1.clear()
+        self._bump_epoch()
@@ -0,0 +1,8 @@
+from posts import follow_graph
+
+
+def follow(request):
+    """Добавляет подписки пользователя (posts.follow_graph)."""
+    return {
+        'follow_graph': follow_graph.for_request(request),
+    }
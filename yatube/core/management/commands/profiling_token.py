@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = 'Выдаёт заголовок, включающий профилирование запроса.'
+
+    def handle(self, *args, **options):
+        if not settings.PROFILING_HEADER:
+            raise CommandError('Заголовок отключён: PROFILING_HEADER = None.')
+        self.stdout.write(f'{settings.PROFILING_HEADER}: {make_token()}')
@@ -0,0 +1,295 @@
+"""Выборочное профилирование запросов для flamegraph.
+
+ProfilingMiddleware профилирует долю PROFILING_RATE запросов и
+каждый запрос с подписанным заголовком PROFILING_HEADER (значение
+выдаёт manage.py profiling_token). Для такого запроса записываются:
+
+* стеки Python: отдельный поток раз в PROFILING_INTERVAL секунд
+  снимает стек потока, обрабатывающего запрос. Интервал не точен
+  (поток ждёт GIL), поэтому вес стека — реально прошедшее время;
+* хронология SQL-запросов и отрисовки шаблонов
+  (core.template_timing).
+
+Результат пишется в PROFILING_DIR в формате speedscope (оба профиля в
+одном файле, https://www.speedscope.app) или collapsed stacks для
+flamegraph.pl (хронология — отдельным файлом .timeline.collapsed);
+в collapsed вес строки — микросекунды.
+"""
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .template_timing import listening
+
+TOKEN_SALT = 'core.profiling'
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+
+def make_token():
+    """Значение заголовка, включающего профилирование запроса."""
+    return signing.dumps('profile', salt=TOKEN_SALT)
+
+
+def _valid_token(value):
+    try:
+        signing.loads(
+            value, salt=TOKEN_SALT,
+            max_age=settings.PROFILING_TOKEN_MAX_AGE,
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def _header_key(header):
+    return 'HTTP_' + header.upper().replace('-', '_')
+
+
+class Sampler(threading.Thread):
+    """Снимает стеки одного потока, пока не вызван stop().
+
+    stacks: стек (кадры от корня к листу) -> миллисекунды.
+    """
+
+    def __init__(self, thread_id, interval, root):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self.stacks[self._stack(frame)] += (now - last) * 1000
+            last = now
+
+    def _stack(self, frame):
+        """Кадры от корня (middleware) к листу."""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            if code is self.root:
+                break
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class Timeline:
+    """Вложенные интервалы SQL и шаблонов: (открыт?, имя, мс)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.events = []
+
+    def now(self):
+        """Миллисекунды с начала запроса."""
+        return (time.perf_counter() - self.started) * 1000
+
+    def open(self, name):
+        self.events.append((True, name, self.now()))
+
+    def close(self, name):
+        self.events.append((False, name, self.now()))
+
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper для SQL-запросов."""
+        name = 'SQL ' + ' '.join(sql.split())[:200]
+        self.open(name)
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.close(name)
+
+
+class _TemplateEvents:
+    """Отрисовки шаблонов как интервалы хронологии."""
+
+    def __init__(self, timeline):
+        self.timeline = timeline
+
+    def open(self, name):
+        self.timeline.open('template ' + name)
+
+    def close(self, name):
+        self.timeline.close('template ' + name)
+
+
+def _frame_name(frame):
+    name, filename, line = frame
+    if filename.startswith(settings.BASE_DIR):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    return f'{name} ({filename}:{line})'
+
+
+def speedscope(title, sampler, timeline, duration_ms):
+    frames, index = [], {}
+
+    def frame_id(key, **frame):
+        if key not in index:
+            index[key] = len(frames)
+            frames.append(frame)
+        return index[key]
+
+    samples, weights = [], []
+    for stack, weight in sampler.stacks.items():
+        samples.append([
+            frame_id(frame, name=frame[0], file=frame[1], line=frame[2])
+            for frame in stack
+        ])
+        weights.append(weight)
+    events = [
+        {
+            'type': 'O' if opened else 'C',
+            'frame': frame_id(name, name=name),
+            'at': at,
+        }
+        for opened, name, at in timeline.events
+    ]
+    return {
+        '$schema': SPEEDSCOPE_SCHEMA,
+        'name': title,
+        'exporter': 'yatube core.profiling',
+        'shared': {'frames': frames},
+        'profiles': [
+            {
+                'type': 'sampled', 'name': f'{title}: Python',
+                'unit': 'milliseconds', 'startValue': 0,
+                'endValue': duration_ms,
+                'samples': samples, 'weights': weights,
+            },
+            {
+                'type': 'evented', 'name': f'{title}: SQL и шаблоны',
+                'unit': 'milliseconds', 'startValue': 0,
+                'endValue': duration_ms, 'events': events,
+            },
+        ],
+    }
+
+
+def _collapsed(weights):
+    """Строки collapsed stacks; ';' в именах разделял бы кадры."""
+    return ''.join(
+        ';'.join(name.replace(';', ',') for name in stack)
+        + f' {round(weight * 1000)}\n'
+        for stack, weight in weights.items()
+    )
+
+
+def collapsed_stacks(sampler):
+    return _collapsed({
+        tuple(_frame_name(frame) for frame in stack): weight
+        for stack, weight in sampler.stacks.items()
+    })
+
+
+def collapsed_timeline(timeline):
+    """Интервалы хронологии как стеки с весом в микросекундах.
+
+    Вес — собственное время интервала, без вложенных.
+    """
+    weights = Counter()
+    stack = []
+    for opened, name, at in timeline.events:
+        if opened:
+            stack.append([name, at, 0.0])
+            continue
+        path = tuple(item[0] for item in stack)
+        name, started, nested = stack.pop()
+        elapsed = at - started
+        weights[path] += elapsed - nested
+        if stack:
+            stack[-1][2] += elapsed
+    return _collapsed(weights)
+
+
+class ProfilingMiddleware:
+    """Профилирует выбранные запросы; ставится первым в MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_RATE and not settings.PROFILING_HEADER:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = settings.PROFILING_HEADER and _header_key(
+            settings.PROFILING_HEADER
+        )
+
+    def requested(self, request):
+        """Профилировать ли запрос: по заголовку или по жребию."""
+        token = self.header and request.META.get(self.header)
+        if token and _valid_token(token):
+            return True
+        return random.random() < settings.PROFILING_RATE
+
+    def __call__(self, request):
+        if not self.requested(request):
+            return self.get_response(request)
+        return self.profile(request)
+
+    def profile(self, request):
+        timeline = Timeline()
+        sampler = Sampler(
+            threading.get_ident(), settings.PROFILING_INTERVAL,
+            ProfilingMiddleware.profile.__code__,
+        )
+        sampler.start()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(timeline)
+                    )
+                stack.enter_context(listening(_TemplateEvents(timeline)))
+                response = self.get_response(request)
+        finally:
+            sampler.stop()
+        duration_ms = timeline.now()
+        path = self.write(request, sampler, timeline, duration_ms)
+        if self.header and self.header in request.META:
+            response['X-Profile-File'] = os.path.basename(path)
+        return response
+
+    def write(self, request, sampler, timeline, duration_ms):
+        match = request.resolver_match
+        title = match.view_name if match else request.path
+        name = '{:%Y%m%d-%H%M%S-%f}-{}-{:.0f}ms'.format(
+            datetime.now(), re.sub(r'[^\w.-]+', '_', title), duration_ms
+        )
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        base = os.path.join(settings.PROFILING_DIR, name)
+        if settings.PROFILING_FORMAT == 'collapsed':
+            with open(base + '.collapsed', 'w') as file:
+                file.write(collapsed_stacks(sampler))
+            with open(base + '.timeline.collapsed', 'w') as file:
+                file.write(collapsed_timeline(timeline))
+            return base + '.collapsed'
+        with open(base + '.speedscope.json', 'w') as file:
+            json.dump(
+                speedscope(
+                    f'{request.method} {title}', sampler, timeline,
+                    duration_ms,
+                ),
+                file, ensure_ascii=False,
+            )
+        return base + '.speedscope.json'
@@ -0,0 +1,95 @@
+"""Время отрисовки шаблонов.
+
+install() один раз оборачивает Template._render: через него проходят
+и render(), и {% include %}, и {% extends %}. Каждая отрисовка
+сообщается слушателям текущего потока, подключённым через
+listening(): open(name) перед отрисовкой и close(name) после.
+Слушатели — TemplateStats (core.budgets) и хронология профиля
+(core.profiling).
+
+Время компиляции шаблона сюда не входит: её убирает кеширующий
+загрузчик (core.templates).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.template.base import Template
+
+_local = threading.local()
+
+
+def template_name(template):
+    return template.origin.template_name or template.name or '<string>'
+
+
+def _timed_render(render):
+    def wrapper(template, context):
+        listeners = getattr(_local, 'listeners', None)
+        if not listeners:
+            return render(template, context)
+        name = template_name(template)
+        for listener in listeners:
+            listener.open(name)
+        try:
+            return render(template, context)
+        finally:
+            for listener in reversed(listeners):
+                listener.close(name)
+    wrapper.timed = True
+    return wrapper
+
+
+def install():
+    """Подключает обёртку; повторный вызов ничего не меняет.
+
+    Тестовое окружение Django подменяет Template._render своей
+    обёрткой и потом восстанавливает, поэтому проверяется признак.
+    """
+    if not getattr(Template._render, 'timed', False):
+        Template._render = _timed_render(Template._render)
+
+
+@contextmanager
+def listening(listener):
+    """Сообщает listener об отрисовках шаблонов в текущем потоке."""
+    install()
+    if not hasattr(_local, 'listeners'):
+        _local.listeners = []
+    _local.listeners.append(listener)
+    try:
+        yield listener
+    finally:
+        _local.listeners.remove(listener)
+
+
+class TemplateStats:
+    """Вызовы и время шаблонов за запрос.
+
+    templates: имя -> [вызовов, мс вместе с вложенными, мс без них].
+    """
+
+    def __init__(self):
+        self.templates = {}
+        self._stack = []
+
+    def open(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def close(self, name):
+        name, started, nested = self._stack.pop()
+        elapsed = (time.perf_counter() - started) * 1000
+        row = self.templates.setdefault(name, [0, 0.0, 0.0])
+        row[0] += 1
+        row[1] += elapsed
+        row[2] += elapsed - nested
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def slowest(self, count=None):
+        """(имя, вызовов, мс всего, мс без вложенных) по убыванию."""
+        rows = sorted(
+            ((name, *row) for name, row in self.templates.items()),
+            key=lambda row: row[3], reverse=True,
+        )
+        return rows[:count]
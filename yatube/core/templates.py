@@ -0,0 +1,22 @@
+"""Бэкенд шаблонов Django, который кеширует шаблоны и при DEBUG.
+
+С APP_DIRS Django сам оборачивает загрузчики в cached.Loader только
+без DEBUG, а явный список loaders с APP_DIRS несовместим; без APP_DIRS
+же debug_toolbar предупреждает (debug_toolbar.W006). Этот бэкенд
+оставляет APP_DIRS и включает кеширующий загрузчик во всех
+окружениях: иначе при DEBUG каждый запрос заново читает и разбирает
+все шаблоны страницы. После правки шаблона runserver нужно
+перезапустить.
+"""
+from django.template.backends.django import DjangoTemplates
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+
+class CachedDjangoTemplates(DjangoTemplates):
+    def __init__(self, params):
+        super().__init__(params)
+        loaders = self.engine.loaders
+        if not (isinstance(loaders[0], tuple)
+                and loaders[0][0] == CACHED_LOADER):
+            self.engine.loaders = [(CACHED_LOADER, loaders)]
@@ -6,3 +6,15 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter
+def page_window(page_obj, on_each_side=3):
+    """Номера страниц вокруг текущей.
+
+    Полный page_range длинной ленты — тысячи ссылок на каждой
+    странице; к краям ведут ссылки «Первая» и «Последняя».
+    """
+    first = max(page_obj.number - on_each_side, 1)
+    last = min(page_obj.number + on_each_side, page_obj.paginator.num_pages)
+    return range(first, last + 1)
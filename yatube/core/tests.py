@@ -1,6 +1,36 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
 from http import HTTPStatus
 
-from django.test import TestCase
+from django.core import checks
+from django.core.cache import cache, caches
+from django.template import Engine
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts import views
+
+from .asgi import ASGIHandler, make_environ
+from .budgets import Budget, QueryBudgetExceeded
+from .cache import TwoTierCache
+from .profiling import make_token
+from .templates import CachedDjangoTemplates
+from .url_cache import cached_reverse
+
+SHARED_CACHE = {
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two-tier-tests',
+    },
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+TEMP_PROFILING_DIR = os.path.join(tempfile.gettempdir(), 'yatube-profiles')
 
 
 class ViewsTest(TestCase):
@@ -10,3 +40,318 @@ class ViewsTest(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class TemplatesTest(TestCase):
+    def test_cached_loader_with_app_dirs(self):
+        """Шаблоны кешируются при DEBUG, APP_DIRS остаётся включён."""
+        engine = Engine.get_default()
+        self.assertTrue(engine.app_dirs)
+        for debug in (True, False):
+            with self.subTest(debug=debug):
+                backend = CachedDjangoTemplates({
+                    'NAME': 'test', 'DIRS': [], 'APP_DIRS': True,
+                    'OPTIONS': {'debug': debug},
+                })
+                self.assertEqual(
+                    [type(loader) for loader in
+                     backend.engine.template_loaders],
+                    [CachedLoader],
+                )
+        ids = {message.id for message in checks.run_checks()}
+        self.assertNotIn('debug_toolbar.W006', ids)
+
+
+class UrlCacheTest(TestCase):
+    def test_matches_reverse(self):
+        """Адреса совпадают с reverse() при одном и нескольких аргументах."""
+        for viewname, args in (
+            ('posts:profile', ['имя пользователя']),
+            ('posts:comment_thread', [3, 45]),
+        ):
+            with self.subTest(viewname=viewname):
+                self.assertEqual(
+                    cached_reverse(viewname, *args),
+                    reverse(viewname, args=args),
+                )
+
+
+class QueryBudgetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.budget = views.index.query_budget
+
+    def tearDown(self):
+        views.index.query_budget = self.budget
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_exceeded_budget_fails(self):
+        """Превышение бюджета в тестах роняет запрос."""
+        views.index.query_budget = Budget(queries=0)
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('posts:index'))
+
+    def test_exceeded_budget_logged(self):
+        """Вне тестов превышение и медленные запросы пишутся в лог."""
+        views.index.query_budget = Budget(queries=0)
+        with self.assertLogs('core.budgets', 'WARNING') as logs:
+            with override_settings(SLOW_REQUEST_MS=0):
+                self.client.get(reverse('posts:index'))
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('posts:index', logs.output[1])
+
+    @override_settings(
+        TIMING_BUDGET_RAISE=True,
+        TEMPLATE_BUDGETS={'posts/includes/switcher.html': 0},
+    )
+    def test_template_budget(self):
+        """Шаблон, который рисуется дольше бюджета, роняет запрос."""
+        with self.assertRaisesMessage(
+            QueryBudgetExceeded, 'posts/includes/switcher.html'
+        ):
+            self.client.get(reverse('posts:index'))
+
+    @override_settings(
+        QUERY_BUDGET_RAISE=True,
+        TEMPLATE_BUDGETS={'posts/includes/switcher.html': 0},
+    )
+    def test_timing_budget_not_raised_with_query_budgets(self):
+        """Превышение по времени без TIMING_BUDGET_RAISE только пишется."""
+        views.index.query_budget = Budget(db_ms=0)
+        with self.assertLogs('core.budgets', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertIn('posts/includes/switcher.html', logs.output[0])
+        self.assertIn('мс в БД', logs.output[0])
+
+    def test_server_timing(self):
+        """Заголовок Server-Timing выводится только при SERVER_TIMING."""
+        with override_settings(SERVER_TIMING=True):
+            response = self.client.get(reverse('posts:index'))
+        self.assertRegex(response['Server-Timing'], r'desc="\d+ queries"')
+        self.assertIn('desc="base.html x1"', response['Server-Timing'])
+        with override_settings(SERVER_TIMING=False):
+            response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+@override_settings(PROFILING_DIR=TEMP_PROFILING_DIR)
+class ProfilingTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_PROFILING_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_PROFILING_DIR, ignore_errors=True)
+
+    def profiles(self):
+        if not os.path.exists(TEMP_PROFILING_DIR):
+            return []
+        return sorted(os.listdir(TEMP_PROFILING_DIR))
+
+    def test_signed_header(self):
+        """Запрос с подписанным заголовком профилируется."""
+        response = self.client.get(
+            reverse('posts:index'), HTTP_X_PROFILE=make_token()
+        )
+        self.assertEqual(self.profiles(), [response['X-Profile-File']])
+        path = os.path.join(TEMP_PROFILING_DIR, self.profiles()[0])
+        with open(path) as file:
+            profile = json.load(file)
+        sampled, evented = profile['profiles']
+        self.assertEqual(sampled['type'], 'sampled')
+        names = {
+            profile['shared']['frames'][event['frame']]['name']
+            for event in evented['events']
+        }
+        self.assertIn('template posts/index.html', names)
+        self.assertTrue(any(name.startswith('SQL ') for name in names))
+
+    def test_not_profiled(self):
+        """Без заголовка или с поддельным токеном профиля нет."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            reverse('posts:index'), HTTP_X_PROFILE='profile:forged'
+        )
+        self.assertFalse(response.has_header('X-Profile-File'))
+        self.assertEqual(self.profiles(), [])
+
+    @override_settings(PROFILING_RATE=1, PROFILING_FORMAT='collapsed')
+    def test_sampled_requests_collapsed(self):
+        """Доля запросов профилируется; формат collapsed stacks."""
+        self.client.get(reverse('posts:index'))
+        stacks, timeline = self.profiles()
+        self.assertTrue(stacks.endswith('.collapsed'))
+        self.assertTrue(timeline.endswith('.timeline.collapsed'))
+        with open(os.path.join(TEMP_PROFILING_DIR, timeline)) as file:
+            lines = file.read().splitlines()
+        self.assertIn('template posts/index.html', lines[-1])
+        for line in lines:
+            self.assertRegex(line, r' \d+$')
+
+
+@override_settings(CACHES=SHARED_CACHE)
+class TwoTierCacheTest(TestCase):
+    def make_cache(self, name):
+        """Двухуровневый кеш отдельного «процесса» со своим L1."""
+        return TwoTierCache('shared', {'OPTIONS': {
+            'L1_NAME': name,
+            'EPOCH_INTERVAL': 0,
+            'L2_ONLY_PREFIXES': ['gen:'],
+        }})
+
+    def setUp(self):
+        self.first = self.make_cache('first')
+        self.second = self.make_cache('second')
+        self.first.clear()
+
+    def test_values_are_shared_through_l2(self):
+        """Значение, записанное одним процессом, видно другому."""
+        self.first.set('page', 'content')
+        self.assertEqual(self.second.get('page'), 'content')
+        self.assertEqual(self.second._l1.get('page'), 'content')
+
+    def test_l2_only_keys_skip_l1(self):
+        """Изменяемые ключи не кешируются в памяти процесса."""
+        self.first.set('gen:global', 1)
+        self.assertEqual(self.second.get('gen:global'), 1)
+        self.assertIsNone(self.second._l1.get('gen:global'))
+        self.first.set('gen:global', 2)
+        self.assertEqual(self.second.get('gen:global'), 2)
+
+    def test_delete_invalidates_other_l1(self):
+        """Удаление в одном процессе сбрасывает L1 другого."""
+        self.first.set('card', 'old')
+        self.assertEqual(self.second.get('card'), 'old')
+        self.first.delete('card')
+        self.assertIsNone(self.second.get('card'))
+        self.assertIsNone(caches['shared'].get('card'))
+
+
+def echo(environ, start_response):
+    """WSGI-приложение, которое возвращает запрос по частям."""
+    start_response('201 Created', [('Content-Type', 'text/plain')])
+    yield environ['PATH_INFO'].encode('latin-1')
+    yield environ['QUERY_STRING'].encode()
+    yield environ['HTTP_X_TAG'].encode()
+    yield environ['wsgi.input'].read()
+
+
+class Recorder:
+    """Потоковый ответ, который запоминает, в каких потоках его читали."""
+
+    def __init__(self):
+        self.threads = []
+
+    def __call__(self, environ, start_response):
+        start_response('200 OK', [])
+        self.threads.append(('view', threading.get_ident()))
+        return self
+
+    def __iter__(self):
+        for chunk in (b'a', b'b'):
+            self.threads.append(('next', threading.get_ident()))
+            yield chunk
+
+    def close(self):
+        self.threads.append(('close', threading.get_ident()))
+
+
+class ASGIHandlerTest(TestCase):
+    def call(self, application, scope, messages):
+        """Отправленные приложением сообщения ASGI."""
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(ASGIHandler(application, threads=1)(
+            scope, receive, send
+        ))
+        return sent
+
+    def scope(self, path, **extra):
+        return {
+            'type': 'http', 'method': 'GET', 'path': path,
+            'query_string': b'', 'headers': [], **extra,
+        }
+
+    def test_django_page(self):
+        """Страница Django отдаётся одним сообщением с телом."""
+        from yatube.wsgi import application
+
+        start, body = self.call(
+            application, self.scope(reverse('about:author')),
+            [{'type': 'http.request'}],
+        )
+        self.assertEqual(start['status'], HTTPStatus.OK)
+        self.assertIn(
+            (b'content-type', b'text/html; charset=utf-8'), start['headers']
+        )
+        self.assertIn('Об авторе'.encode(), body['body'])
+
+    def test_streaming_request_and_response(self):
+        """Тело запроса собирается из частей, поток ответа — по частям."""
+        sent = self.call(
+            echo,
+            self.scope(
+                '/путь/', method='POST', query_string=b'a=1',
+                headers=[(b'x-tag', b'one'), (b'x-tag', b'two')],
+            ),
+            [
+                {'type': 'http.request', 'body': b'he', 'more_body': True},
+                {'type': 'http.request', 'body': b'llo'},
+            ],
+        )
+        self.assertEqual(sent[0]['status'], HTTPStatus.CREATED)
+        self.assertEqual(
+            [message.get('body', b'') for message in sent[1:]],
+            ['/путь/'.encode(), b'a=1', b'one,two', b'hello', b''],
+        )
+
+    def test_cookie_crumbs_joined(self):
+        """Части Cookie склеиваются через '; ', а не через запятую."""
+        environ = make_environ(self.scope('/', headers=[
+            (b'cookie', b'sessionid=abc'), (b'cookie', b'csrftoken=xyz'),
+        ]), None)
+        self.assertEqual(
+            environ['HTTP_COOKIE'], 'sessionid=abc; csrftoken=xyz'
+        )
+
+    def test_stream_read_and_closed_in_one_thread(self):
+        """Части потокового ответа и close() — в одном потоке запроса."""
+        application = Recorder()
+        sent = self.call(
+            application, self.scope('/'), [{'type': 'http.request'}]
+        )
+        self.assertEqual(
+            [message.get('body', b'') for message in sent[1:]],
+            [b'a', b'b', b''],
+        )
+        (_, view), *streaming = application.threads
+        self.assertEqual(
+            [name for name, _ in streaming], ['next', 'next', 'close']
+        )
+        self.assertEqual(len({thread for _, thread in streaming}), 1)
+        self.assertNotEqual(streaming[0][1], view)
+
+    def test_disconnect(self):
+        """Отключившийся клиент не получает ответа."""
+        sent = self.call(
+            echo, self.scope('/'), [{'type': 'http.disconnect'}]
+        )
+        self.assertEqual(sent, [])
+
+    def test_lifespan(self):
+        """Сервер получает подтверждение запуска и остановки."""
+        sent = self.call(echo, {'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'},
+        ])
+        self.assertEqual(
+            [message['type'] for message in sent],
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete'],
+        )
@@ -1,17 +1,110 @@
+import datetime
+
 from django.contrib import admin
+from django.db.models import Max, Min, Q, QuerySet
+from django.utils import timezone
+
+from .models import Comment, Follow, Group, Post, SearchDocument
+from .search import object_ids
+from .utils import EstimatedCountPaginator
+
+
+def _local_date(value):
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+def _date_range(first, last, kind):
+    """Начала всех лет, месяцев или дней от first до last."""
+    if kind == 'year':
+        return [
+            datetime.date(year, 1, 1)
+            for year in range(first.year, last.year + 1)
+        ]
+    if kind == 'month':
+        return [
+            datetime.date(month // 12, month % 12 + 1, 1)
+            for month in range(
+                first.year * 12 + first.month - 1,
+                last.year * 12 + last.month,
+            )
+        ]
+    return [
+        first + datetime.timedelta(days=day)
+        for day in range((last - first).days + 1)
+    ]
+
+
+class IndexedDatesQuerySet(QuerySet):
+    """QuerySet, у которого dates() не сканирует таблицу.
 
-from .models import Comment, Follow, Group, Post
+    date_hierarchy админки строит список лет, месяцев и дней через
+    SELECT DISTINCT по всем строкам. Здесь границы берутся из
+    MIN/MAX по индексу даты, а периоды между ними перечисляются
+    подряд, даже если в каком-то из них записей нет.
+    """
 
+    def dates(self, field_name, kind, order='ASC'):
+        bounds = self.aggregate(first=Min(field_name), last=Max(field_name))
+        if bounds['first'] is None:
+            return []
+        dates = _date_range(
+            _local_date(bounds['first']), _local_date(bounds['last']), kind
+        )
+        return dates if order == 'ASC' else dates[::-1]
 
-class CommentAdmin(admin.ModelAdmin):
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список, который не тормозит на миллионах строк.
+
+    Число строк оценивается без полного COUNT(*), поиск идёт по
+    полнотекстовому индексу (posts.search) и точному имени автора
+    вместо LIKE '%...%' по тексту, а date_hierarchy не сканирует
+    таблицу (IndexedDatesQuerySet).
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # text ищется через posts.search, а не через LIKE.
+    search_fields = ('text', '=author__username')
+    search_kind = None
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return IndexedDatesQuerySet(
+            model=queryset.model,
+            query=queryset.query.chain(),
+            using=queryset._db,
+            hints=queryset._hints,
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(
+            Q(pk__in=object_ids(search_term, self.search_kind))
+            | Q(author__username=search_term)
+        ), False
+
+
+class CommentAdmin(LargeTableAdmin):
     list_display = ('text', 'author', 'created', 'post')
-    search_fields = ('text',)
+    list_select_related = ('author', 'post')
     list_filter = ('created',)
+    date_hierarchy = 'created'
+    raw_id_fields = ('author', 'post')
+    search_kind = SearchDocument.COMMENT
 
 
 class FollowAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'author')
-    search_fields = ('text',)
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -19,12 +112,26 @@ class GroupAdmin(admin.ModelAdmin):
     search_fields = ('title',)
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
-    search_fields = ('text',)
+    list_select_related = ('author', 'group')
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    raw_id_fields = ('author',)
     empty_value_display = '-пусто-'
+    search_kind = SearchDocument.POST
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Выбор группы в list_editable строится один раз на страницу."""
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if db_field.name == 'group' and request is not None:
+            if not hasattr(request, '_group_choices'):
+                request._group_choices = list(formfield.choices)
+            formfield.choices = request._group_choices
+        return formfield
 
 
 admin.site.register(Post, PostAdmin)
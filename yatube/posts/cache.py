@@ -0,0 +1,295 @@
+"""Кеширование страниц лент и фрагментов шаблонов постов.
+
+Карточка поста (posts/includes/post_card.html) кешируется тегом
+{% cache %} под ключом из pk поста и его версии Post.card_version,
+поэтому правка поста сама даёт новый ключ. Функции ниже удаляют
+ключи, которые перестали быть нужны или зависят от автора.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import InvalidCacheBackendError, cache, caches
+from django.core.cache.utils import make_template_fragment_key
+
+POST_CARD_FRAGMENT = 'post_card'
+INVALIDATION_BATCH_SIZE = 500
+FEED_CACHE_POLL_INTERVAL = 0.05
+
+
+def fragment_cache():
+    """Кеш, который использует тег {% cache %}."""
+    try:
+        return caches['template_fragments']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def post_card_key(post_id, version):
+    return make_template_fragment_key(POST_CARD_FRAGMENT, [post_id, version])
+
+
+def invalidate_post_cards(posts):
+    """Удаляет карточки постов из queryset или списка постов."""
+    keys = [post_card_key(post.pk, post.card_version) for post in posts]
+    if keys:
+        fragment_cache().delete_many(keys)
+
+
+def invalidate_author_post_cards(author_id):
+    """Удаляет карточки всех постов автора пачками."""
+    from .models import Post
+
+    posts = Post.objects.filter(author_id=author_id).only('pk', 'updated')
+    batch = []
+    for post in posts.iterator(chunk_size=INVALIDATION_BATCH_SIZE):
+        batch.append(post)
+        if len(batch) == INVALIDATION_BATCH_SIZE:
+            invalidate_post_cards(batch)
+            batch = []
+    invalidate_post_cards(batch)
+
+
+# Поколения лент. Ключ страницы ленты включает текущие поколения
+# всех лент, от которых она зависит, поэтому страница живёт в кеше,
+# пока одно из них не сменится, а не фиксированные 20 секунд.
+
+GLOBAL_FEED = 'global'
+GENERATION_PREFIX = 'feed_gen:'
+PAGE_PREFIX = 'feed_page:'
+# Изменяемые ключи: в двухуровневом кеше (core.cache) их нельзя
+# держать в памяти процесса.
+LOCK_PREFIX = 'feed_lock:'
+LATEST_PREFIX = 'feed_latest:'
+
+
+def _key_part(value):
+    """slug или имя пользователя для ключа кеша.
+
+    В ключе memcached нельзя пробелы, управляющие символы и больше
+    250 байт, а имя пользователя может быть любым.
+    """
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def group_feed_name(slug):
+    return f'group:{_key_part(slug)}'
+
+
+def author_feed_name(username):
+    return f'author:{_key_part(username)}'
+
+
+def follower_feed_name(user_id):
+    return f'follow:{user_id}'
+
+
+def fanout_feed_name(author_id):
+    """Посты автора, которые подмешиваются в ленты подписок при чтении."""
+    return f'fanout:{author_id}'
+
+
+def post_feed_name(post_id):
+    """Пост и его комментарии."""
+    return f'post:{post_id}'
+
+
+def post_feeds(post_id):
+    """Ленты страницы поста и его комментариев.
+
+    Глобальная лента сменяется при изменении любого поста, группы
+    или имени пользователя, а значит, и счётчика постов автора,
+    группы и имён комментаторов на странице.
+    """
+    return [GLOBAL_FEED, post_feed_name(post_id)]
+
+
+def follow_feeds(user_id):
+    """Ленты страницы подписок пользователя.
+
+    Посты знаменитостей (posts.feed) не раскладываются по лентам
+    подписчиков, и их публикация не сменяет поколение каждого из
+    них: страница подписок зависит от поколений этих авторов.
+    """
+    from .feed import followed_celebrities
+
+    return [follower_feed_name(user_id)] + [
+        fanout_feed_name(author_id)
+        for author_id in sorted(followed_celebrities(user_id))
+    ]
+
+
+def follow_list_feeds(username, user_id=None):
+    """Ленты списков подписок; имена в списке меняет глобальная.
+
+    Отметки «вы подписаны» зависят от подписок читателя user_id.
+    """
+    feeds = [GLOBAL_FEED, author_feed_name(username)]
+    if user_id is not None:
+        feeds.append(follower_feed_name(user_id))
+    return feeds
+
+
+def _new_generation():
+    return format(time.time_ns(), 'x')
+
+
+def generations_time(generations):
+    """Время последней смены поколений (Unix-время в секундах).
+
+    Поколение — время смены в наносекундах, поэтому по нему видно,
+    когда лента последний раз менялась, без запроса к базе.
+    """
+    return max(int(generation, 16) for generation in generations) / 1e9
+
+
+def feed_generations(feeds):
+    """Текущие поколения лент; недостающие заводятся заново."""
+    keys = [GENERATION_PREFIX + feed for feed in feeds]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            generation = _new_generation()
+            cache.add(key, generation, None)
+            # Кеш может ничего не хранить (DummyCache) или сразу
+            # вытеснить ключ: тогда страница просто не найдётся.
+            generations[key] = cache.get(key, generation)
+    return [generations[key] for key in keys]
+
+
+def request_generations(request, feeds):
+    """feed_generations, прочитанные один раз за запрос."""
+    feeds = tuple(feeds)
+    if not hasattr(request, 'feed_generations'):
+        request.feed_generations = {}
+    if feeds not in request.feed_generations:
+        request.feed_generations[feeds] = feed_generations(feeds)
+    return request.feed_generations[feeds]
+
+
+def bump_feeds(feeds):
+    """Сменяет поколения лент, делая их страницы в кеше недоступными."""
+    generation = _new_generation()
+    cache.set_many(
+        {GENERATION_PREFIX + feed: generation for feed in set(feeds)},
+        None,
+    )
+
+
+def bump_author_feeds(author_id, group_ids=()):
+    """Сменяет поколения всех лент, где показываются посты автора."""
+    from .feed import celebrity_ids
+    from .models import Follow, Group
+
+    User = get_user_model()
+    feeds = [GLOBAL_FEED]
+    feeds += [
+        author_feed_name(username) for username in
+        User.objects.filter(pk=author_id).values_list('username', flat=True)
+    ]
+    feeds += [
+        group_feed_name(slug) for slug in Group.objects.filter(
+            pk__in=[pk for pk in group_ids if pk is not None]
+        ).values_list('slug', flat=True)
+    ]
+    if author_id in celebrity_ids():
+        # Подписчиков слишком много: см. follow_feeds.
+        feeds.append(fanout_feed_name(author_id))
+    else:
+        feeds += [
+            follower_feed_name(user_id) for user_id in Follow.objects.filter(
+                author_id=author_id
+            ).values_list('user_id', flat=True).iterator()
+        ]
+    bump_feeds(feeds)
+
+
+def bump_follow_feeds(follow):
+    """Сменяет поколения ленты подписчика и профилей обоих."""
+    User = get_user_model()
+    feeds = [follower_feed_name(follow.user_id)]
+    feeds += [
+        author_feed_name(username) for username in User.objects.filter(
+            pk__in=[follow.author_id, follow.user_id]
+        ).values_list('username', flat=True)
+    ]
+    bump_feeds(feeds)
+
+
+def _page_key(request, generations):
+    user_part = request.user.pk if request.user.is_authenticated else 'anon'
+    raw = ':'.join([
+        request.get_full_path(), str(user_part), *generations
+    ])
+    return PAGE_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _latest_key(request):
+    user_part = request.user.pk if request.user.is_authenticated else 'anon'
+    raw = f'{request.get_full_path()}:{user_part}'
+    return LATEST_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _cacheable(request, response):
+    return (
+        request.method in ('GET', 'HEAD')
+        and response.status_code == 200
+        and not response.cookies
+        and not response.streaming
+    )
+
+
+def cache_feed(feeds_for):
+    """Кеширует страницу ленты до смены поколения её лент.
+
+    feeds_for(request, **kwargs) возвращает имена лент, от которых
+    зависит страница. При промахе страницу перестраивает только
+    тот процесс, который взял блокировку; остальные в это время
+    отдают последнюю построенную версию или недолго ждут её.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            generations = request_generations(
+                request, feeds_for(request, **kwargs)
+            )
+            key = _page_key(request, generations)
+            response = cache.get(key)
+            if response is not None:
+                return response
+            lock_key = LOCK_PREFIX + key
+            if not cache.add(lock_key, 1, settings.FEED_CACHE_LOCK_TIMEOUT):
+                response = _wait_for_page(key, _latest_key(request))
+                if response is not None:
+                    return response
+                return view(request, *args, **kwargs)
+            try:
+                response = view(request, *args, **kwargs)
+                if _cacheable(request, response):
+                    cache.set_many({
+                        key: response,
+                        _latest_key(request): response,
+                    }, settings.FEED_CACHE_TIMEOUT)
+            finally:
+                cache.delete(lock_key)
+            return response
+        return wrapper
+    return decorator
+
+
+def _wait_for_page(key, latest_key):
+    """Ответ, пока страницу строит другой процесс."""
+    stale = cache.get(latest_key)
+    if stale is not None:
+        return stale
+    deadline = time.monotonic() + settings.FEED_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(FEED_CACHE_POLL_INTERVAL)
+        response = cache.get(key)
+        if response is not None:
+            return response
+    return None
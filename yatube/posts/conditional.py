@@ -0,0 +1,91 @@
+"""Условные ответы и заголовки HTTP-кеширования страниц лент.
+
+Страница зависит только от поколений своих лент (posts.cache),
+которые сменяются при каждом изменении данных. Поколение — время
+смены, поэтому ETag и Last-Modified считаются из него и адреса без
+запроса к базе, а повторный запрос с If-None-Match или
+If-Modified-Since получает 304 после одного обращения к кешу.
+
+Страницу гостя может хранить общий кеш (обратный прокси) до
+HTML_CACHE_SHARED_MAX_AGE секунд, страницу вошедшего пользователя —
+только его браузер, с проверкой при каждом запросе. Vary: Cookie
+не даёт прокси отдать страницу гостя пользователю с сессией.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .cache import generations_time, request_generations
+
+# Ответы, которые можно хранить в кеше.
+CACHEABLE_STATUSES = (200, 304)
+
+
+def _user_part(request):
+    """Часть ETag от пользователя.
+
+    Страницы вошедшего пользователя выводят формы с {% csrf_token %}:
+    после смены CSRF-куки (вход, выход) страница из кеша браузера
+    отправила бы форму со старым токеном.
+    """
+    if not request.user.is_authenticated:
+        return 'anon'
+    return f"{request.user.pk}:{request.META.get('CSRF_COOKIE', '')}"
+
+
+def feed_condition(feeds_for, user_part=_user_part, version=''):
+    """condition() с валидаторами из поколений лент.
+
+    feeds_for(request, **kwargs) — ленты, от которых зависит ответ,
+    user_part(request) — часть ETag от пользователя.
+    """
+    def generations(request, kwargs):
+        return request_generations(request, feeds_for(request, **kwargs))
+
+    def etag(request, **kwargs):
+        raw = ':'.join([
+            version, request.get_full_path(), user_part(request),
+            str(request.is_ajax()), *generations(request, kwargs),
+        ])
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        return datetime.fromtimestamp(
+            generations_time(generations(request, kwargs)), timezone.utc
+        )
+
+    return condition(etag, last_modified)
+
+
+def http_cache(view):
+    """Cache-Control и Vary для страниц гостей и пользователей."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if (
+            request.method not in ('GET', 'HEAD')
+            or response.status_code not in CACHEABLE_STATUSES
+            or response.has_header('Cache-Control')
+        ):
+            return response
+        patch_vary_headers(response, ('Cookie', 'X-Requested-With'))
+        if request.user.is_authenticated or response.cookies:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(
+                response, public=True, max_age=0,
+                s_maxage=settings.HTML_CACHE_SHARED_MAX_AGE,
+            )
+        return response
+    return wrapper
+
+
+def conditional_feed(feeds_for):
+    """Условные ответы и заголовки кеширования страницы ленты."""
+    def decorator(view):
+        return http_cache(feed_condition(feeds_for)(view))
+    return decorator
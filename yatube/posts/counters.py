@@ -0,0 +1,126 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются сигналами (posts.signals) атомарным UPDATE ... SET
+x = x + 1, а разошедшиеся значения чинит команда reconcile_counters.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def _count(model, field):
+    """Подзапрос COUNT(*) строк model, у которых field равен внешнему pk."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+# (модель со счётчиком, поле счётчика, фактическое значение)
+COUNTERS = (
+    (AuthorStats, 'posts_count', lambda: _count(Post, 'author')),
+    (AuthorStats, 'followers_count', lambda: _count(Follow, 'author')),
+    (AuthorStats, 'following_count', lambda: _count(Follow, 'user')),
+    (Group, 'posts_count', lambda: _count(Post, 'group')),
+    (Post, 'comments_count', lambda: _count(Comment, 'post')),
+)
+
+
+def _change(queryset, field, delta):
+    return queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def change_author(user_id, field, delta):
+    """Меняет счётчик автора.
+
+    Если строки счётчиков ещё нет, при увеличении она создаётся сразу
+    с фактическими значениями; при уменьшении (в том числе во время
+    каскадного удаления пользователя) ничего не создаётся.
+    """
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    if not _change(stats, field, delta) and delta > 0:
+        create_author_stats(user_id)
+
+
+def change_group(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post(post_id, delta):
+    if post_id is not None:
+        _change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def create_author_stats(user_id):
+    """Создаёт счётчики пользователя сразу с фактическими значениями."""
+    AuthorStats.objects.get_or_create(
+        user_id=user_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=user_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=user_id).count(),
+            'following_count': Follow.objects.filter(
+                user_id=user_id).count(),
+        },
+    )
+
+
+def recount(model, start, stop):
+    """Пересчитывает счётчики model у строк с pk из [start, stop)."""
+    fields = {
+        field: actual()
+        for counter_model, field, actual in COUNTERS
+        if counter_model is model
+    }
+    return model.objects.filter(pk__gte=start, pk__lt=stop).update(**fields)
+
+
+def reconcile(batch_size=1000, log=None):
+    """Исправляет разошедшиеся счётчики, обходя таблицы пачками по pk.
+
+    Возвращает число исправленных значений.
+    """
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=pk) for pk in missing.iterator()],
+        ignore_conflicts=True,
+    )
+    fixed = 0
+    for model, field, actual in COUNTERS:
+        last_pk = None
+        while True:
+            batch = model.objects.order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            pks = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            last_pk = pks[-1]
+            drifted = list(
+                model.objects.filter(pk__in=pks)
+                .annotate(actual=actual())
+                .exclude(**{field: F('actual')})
+                .values_list('pk', flat=True)
+            )
+            if drifted:
+                model.objects.filter(pk__in=drifted).update(
+                    **{field: actual()}
+                )
+                fixed += len(drifted)
+                if log:
+                    log(f'{model.__name__}.{field}: {len(drifted)}')
+    return fixed
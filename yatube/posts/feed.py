@@ -0,0 +1,159 @@
+"""Материализованная лента подписок (fan-out on write).
+
+При публикации пост раскладывается в FeedEntry каждого подписчика,
+и follow_index читает готовый отсортированный список по индексу
+(user, -pub_date). Авторы, у которых подписчиков стало больше
+FEED_FANOUT_LIMIT, помечаются AuthorStats.fanout_on_read и больше не
+раскладываются: их посты подмешиваются при чтении (fan-out on
+read). Пометка не снимается, даже если подписчиков стало меньше:
+посты, вышедшие после неё, в ленты не разложены.
+
+Подписка (backfill, rebuild) добавляет в ленту только последние
+FEED_BACKFILL_SIZE постов автора. Это сознательное ограничение:
+более старые посты в ленте подписок не показываются, они остаются
+в профиле автора.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .follow_graph import following_ids
+from .models import AuthorStats, FeedEntry, Follow, Post
+
+CELEBRITIES_CACHE_KEY = 'feed:celebrities'
+
+
+def celebrity_ids():
+    """Авторы, посты которых не раскладываются по лентам."""
+    ids = cache.get(CELEBRITIES_CACHE_KEY)
+    if ids is None:
+        ids = frozenset(
+            AuthorStats.objects.filter(fanout_on_read=True)
+            .values_list('user_id', flat=True)
+        )
+        cache.set(
+            CELEBRITIES_CACHE_KEY, ids, settings.FEED_CELEBRITIES_TIMEOUT
+        )
+    return ids
+
+
+def followed_celebrities(user_id):
+    """Знаменитости среди авторов, на которых подписан пользователь."""
+    celebrities = celebrity_ids()
+    if not celebrities:
+        return frozenset()
+    return following_ids(user_id) & celebrities
+
+
+def update_fanout_mode(author_id):
+    """Помечает автора, у которого подписчиков стало больше лимита."""
+    marked = AuthorStats.objects.filter(
+        user_id=author_id,
+        fanout_on_read=False,
+        followers_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).update(fanout_on_read=True)
+    if marked:
+        cache.delete(CELEBRITIES_CACHE_KEY)
+
+
+def mark_celebrities():
+    """Помечает авторов сверх лимита после загрузки в обход сигналов."""
+    AuthorStats.objects.filter(
+        fanout_on_read=False,
+        followers_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).update(fanout_on_read=True)
+    cache.delete(CELEBRITIES_CACHE_KEY)
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if post.author_id in celebrity_ids():
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in follower_ids.iterator()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def backfill(follow):
+    """Добавляет в ленту последние посты автора после подписки."""
+    if follow.author_id in celebrity_ids():
+        return
+    posts = Post.objects.filter(
+        author_id=follow.author_id
+    ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=follow.user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def rebuild(batch_size=1000):
+    """Заполняет ленты заново, как backfill для каждой подписки.
+
+    Нужна, если ленты включили (FEED_MATERIALIZED) на живой базе.
+    Возвращает число записей.
+    """
+    FeedEntry.objects.all().delete()
+    authors = Follow.objects.exclude(
+        author_id__in=celebrity_ids()
+    ).values_list('author_id', flat=True).order_by().distinct()
+    total = 0
+    for author_id in list(authors):
+        posts = list(Post.objects.filter(
+            author_id=author_id
+        ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_SIZE])
+        if not posts:
+            continue
+        follower_ids = Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True).iterator()
+        chunk_size = max(batch_size // len(posts), 1)
+        while True:
+            chunk = list(islice(follower_ids, chunk_size))
+            if not chunk:
+                break
+            FeedEntry.objects.bulk_create(
+                [
+                    FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+                    for user_id in chunk
+                    for pk, pub_date in posts
+                ],
+                ignore_conflicts=True,
+            )
+            total += len(chunk) * len(posts)
+    return total
+
+
+def retract(follow):
+    """Убирает из ленты посты автора после отписки."""
+    FeedEntry.objects.filter(
+        user_id=follow.user_id, post__author_id=follow.author_id
+    ).delete()
+
+
+def follow_feed(user):
+    """Посты авторов, на которых подписан пользователь."""
+    posts = Post.objects.select_related('author', 'group')
+    if not settings.FEED_MATERIALIZED:
+        return posts.filter(author__following__user=user)
+    celebrities = followed_celebrities(user.pk)
+    if not celebrities:
+        return posts.filter(feed_entries__user=user).order_by(
+            '-feed_entries__pub_date', '-pk'
+        )
+    return posts.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('post'))
+        | Q(author_id__in=celebrities)
+    ).order_by('-pub_date', '-pk')
@@ -0,0 +1,64 @@
+"""Подписки текущего пользователя.
+
+Множество авторов, на которых подписан пользователь, загружается
+одним запросом и хранится в кеше до подписки или отписки (сигналы
+Follow в posts.signals). FollowGraph запроса отвечает «подписан ли
+зритель на автора» для любого числа авторов без новых запросов и
+доступен шаблонам как follow_graph (core.context_processors.follow).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from .models import Follow
+
+# Изменяемое значение: в двухуровневом кеше только в L2.
+FOLLOWING_PREFIX = 'follow_graph:'
+
+
+def following_key(user_id):
+    return f'{FOLLOWING_PREFIX}{user_id}'
+
+
+def following_ids(user_id):
+    """id авторов, на которых подписан пользователь."""
+    key = following_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.filter(user_id=user_id)
+            .values_list('author_id', flat=True)
+        )
+        cache.set(key, ids, settings.FOLLOW_GRAPH_TIMEOUT)
+    return ids
+
+
+def invalidate(user_id):
+    cache.delete(following_key(user_id))
+
+
+class FollowGraph:
+    """Подписки пользователя; загружаются при первой проверке.
+
+    author in graph — подписан ли пользователь на автора (объект
+    User или его id).
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def author_ids(self):
+        if not self.user.is_authenticated:
+            return frozenset()
+        return following_ids(self.user.pk)
+
+    def __contains__(self, author):
+        return getattr(author, 'pk', author) in self.author_ids
+
+
+def for_request(request):
+    """FollowGraph пользователя запроса, один на запрос."""
+    if not hasattr(request, 'follow_graph'):
+        request.follow_graph = FollowGraph(request.user)
+    return request.follow_graph
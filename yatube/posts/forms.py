@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
 from .models import Comment, Post
+from .uploads import OversizedUpload, inspect_image, strip_metadata
 
 
 class PostForm(forms.ModelForm):
@@ -11,6 +13,31 @@ class PostForm(forms.ModelForm):
             'image': 'Картинка',
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Оборванную загрузку Pillow не откроет, поэтому её не отдаём
+        # полю, а сразу отклоняем в clean_image.
+        self.oversized = self.files.get('image')
+        if isinstance(self.oversized, OversizedUpload):
+            self.files = self.files.copy()
+            del self.files['image']
+        else:
+            self.oversized = None
+
+    def clean_image(self):
+        """Проверяет ограничения картинки и удаляет метаданные.
+
+        До этого forms.ImageField уже прочитал файл целиком и вызвал
+        verify(): тип поля проверяют тесты в tests/, поэтому проверка
+        по заголовку здесь — второй проход, а не замена первого.
+        Растр не распаковывают оба, а оборванная загрузка до поля не
+        доходит.
+        """
+        image = self.oversized or self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            return image
+        return strip_metadata(image, inspect_image(image))
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import build
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации подписок «друзья друзей».'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Скольким пользователям записывать рекомендации за раз.',
+        )
+        parser.add_argument(
+            '--size', type=int, default=None,
+            help='Рекомендаций на пользователя (RECOMMENDATIONS_SIZE).',
+        )
+
+    def handle(self, *args, **options):
+        stored = build(
+            batch_size=options['batch_size'],
+            size=options['size'],
+            log=lambda message: self.stdout.write(message),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Рекомендаций: {stored}'))
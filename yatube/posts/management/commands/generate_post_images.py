@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+
+from posts.models import Post
+from posts.thumbnails import render_images, store_images
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит недостающие миниатюры и адаптивные варианты картинок '
+        'постов, распределяя работу по ядрам процессора.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов; 0 — всё в текущем процессе.',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перестроить картинки всех постов.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(Q(thumbnail='') | Q(image_variants=''))
+        jobs = list(posts.values_list('pk', 'image'))
+        if options['workers']:
+            done = self.render_in_processes(jobs, options['workers'])
+        else:
+            done = sum(
+                self.store(pk, image, lambda: render_images(image))
+                for pk, image in jobs
+            )
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {done}'))
+
+    def store(self, pk, image, render):
+        """Сохраняет картинки поста; 0, если картинку не удалось построить.
+
+        Ошибка одной картинки не останавливает остальные.
+        """
+        try:
+            store_images(pk, image, render())
+        except Exception as error:
+            self.stderr.write(f'Пост {pk}: {error}')
+            return 0
+        return 1
+
+    def render_in_processes(self, jobs, workers):
+        """Картинки считаются в дочерних процессах, пишет только родитель.
+
+        В работе не больше workers * 2 картинок, и результат каждой
+        отпускается сразу после сохранения: память не растёт с числом
+        постов.
+        """
+        connections.close_all()
+        done = 0
+        jobs = iter(jobs)
+        pending = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                for pk, image in islice(jobs, workers * 2 - len(pending)):
+                    future = executor.submit(render_images, image)
+                    pending[future] = (pk, image)
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    pk, image = pending.pop(future)
+                    done += self.store(pk, image, future.result)
+        return done
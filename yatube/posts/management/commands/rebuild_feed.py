@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.feed import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Заполняет материализованные ленты подписок заново.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько записей ленты вставлять за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Записей в лентах: {total}'))
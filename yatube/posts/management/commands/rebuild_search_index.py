@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import backend_name, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк читать за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано документов: {total} ({backend_name()})'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает разошедшиеся счётчики постов и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк проверять за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        fixed = reconcile(
+            batch_size=options['batch_size'],
+            log=lambda message: self.stdout.write(message),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Исправлено счётчиков: {fixed}'))
@@ -0,0 +1,70 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.search import rebuild
+from posts.seeding import make_plan, run
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument(
+            '--follows-per-user', type=int, default=20,
+            help='Среднее число подписок пользователя.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней разнести публикации.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Одинаковый seed даёт одинаковые данные.',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Сколько процессов заполняют базу.',
+        )
+        parser.add_argument(
+            '--password',
+            help='Пароль всех пользователей; без него войти нельзя.',
+        )
+        parser.add_argument(
+            '--search-index', action='store_true',
+            help='Перестроить поисковый индекс после заполнения.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 and (
+            options['posts'] or options['follows_per_user']
+        ):
+            raise CommandError('Для постов и подписок нужно --users >= 2.')
+        if options['comments'] and not options['posts']:
+            raise CommandError('Комментариям нужны посты: задайте --posts.')
+        plan = make_plan(
+            seed=options['seed'],
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows_per_user=options['follows_per_user'],
+            days=options['days'],
+            password=options['password'],
+        )
+        run(
+            plan,
+            processes=options['processes'],
+            log=lambda message: self.stdout.write(message),
+        )
+        if options['search_index']:
+            total = rebuild(batch_size=10000)
+            self.stdout.write(f'поисковый индекс: {total}')
+        self.stdout.write(self.style.SUCCESS('База заполнена.'))
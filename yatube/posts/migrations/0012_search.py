@@ -0,0 +1,117 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+FTS_TABLE = 'posts_searchdocument_fts'
+SQLITE_FTS = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "terms, content='posts_searchdocument', content_rowid='id')",
+    # Внешнее содержимое FTS5 синхронизируется триггерами. Если
+    # будущая миграция пересоздаст таблицу posts_searchdocument,
+    # триггеры нужно будет создать заново.
+    "CREATE TRIGGER posts_searchdocument_ai "
+    "AFTER INSERT ON posts_searchdocument BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, terms) VALUES (new.id, new.terms); "
+    "END",
+    "CREATE TRIGGER posts_searchdocument_ad "
+    "AFTER DELETE ON posts_searchdocument BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, terms) "
+    "VALUES ('delete', old.id, old.terms); "
+    "END",
+    "CREATE TRIGGER posts_searchdocument_au "
+    "AFTER UPDATE ON posts_searchdocument BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, terms) "
+    "VALUES ('delete', old.id, old.terms); "
+    f"INSERT INTO {FTS_TABLE}(rowid, terms) VALUES (new.id, new.terms); "
+    "END",
+)
+POSTGRES_GIN = (
+    "CREATE INDEX posts_searchdocument_terms_gin ON posts_searchdocument "
+    "USING gin (to_tsvector('simple', terms))"
+)
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+def create_fulltext(apps, schema_editor):
+    """Полнотекстовый индекс СУБД; без него работает бэкенд python."""
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_GIN)
+    elif connection.vendor == 'sqlite' and sqlite_has_fts5(connection):
+        for statement in SQLITE_FTS:
+            schema_editor.execute(statement)
+
+
+def drop_fulltext(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS posts_searchdocument_terms_gin'
+        )
+    elif connection.vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(
+                f'DROP TRIGGER IF EXISTS posts_searchdocument_{suffix}'
+            )
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Пост'), ('comment', 'Комментарий')], max_length=7, verbose_name='Тип')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Идентификатор')),
+                ('terms', models.TextField(verbose_name='Основы слов')),
+                ('length', models.PositiveIntegerField(default=0, verbose_name='Число слов')),
+            ],
+            options={
+                'verbose_name': 'Документ поиска',
+                'verbose_name_plural': 'Документы поиска',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, verbose_name='Основа')),
+                ('frequency', models.PositiveIntegerField(verbose_name='Число вхождений')),
+            ],
+            options={
+                'verbose_name': 'Вхождение основы',
+                'verbose_name_plural': 'Вхождения основ',
+            },
+        ),
+        migrations.AddField(
+            model_name='searchposting',
+            name='document',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='posts.SearchDocument'),
+        ),
+        migrations.AddField(
+            model_name='searchdocument',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='posts.Post', verbose_name='Пост'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchposting',
+            constraint=models.UniqueConstraint(fields=('term', 'document'), name='unique_search_posting'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.RunPython(create_fulltext, drop_fulltext),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_celebrities(apps, schema_editor):
+    """Помечает авторов, которые уже не раскладываются по лентам."""
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    AuthorStats.objects.filter(
+        followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).update(fanout_on_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_comment_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='fanout_on_read',
+            field=models.BooleanField(default=False, verbose_name='Подмешивать при чтении'),
+        ),
+        migrations.AddIndex(
+            model_name='authorstats',
+            index=models.Index(condition=models.Q(fanout_on_read=True), fields=['user'], name='authorstats_fanout_idx'),
+        ),
+        migrations.RunPython(mark_celebrities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def fill_feed(apps, schema_editor):
+    """Раскладывает посты по лентам подписок, оформленных до 0006.
+
+    Как posts.feed.rebuild: последние FEED_BACKFILL_SIZE постов
+    каждого автора, кроме знаменитостей.
+    """
+    if not settings.FEED_MATERIALIZED:
+        return
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    celebrities = AuthorStats.objects.filter(
+        fanout_on_read=True
+    ).values('user_id')
+    authors = Follow.objects.exclude(
+        author_id__in=celebrities
+    ).values_list('author_id', flat=True).order_by().distinct()
+    for author_id in list(authors):
+        posts = list(
+            Post.objects.filter(author_id=author_id)
+            .order_by('-pub_date')
+            .values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_SIZE]
+        )
+        if not posts:
+            continue
+        follower_ids = Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True).iterator()
+        chunk_size = max(BATCH_SIZE // len(posts), 1)
+        while True:
+            chunk = list(islice(follower_ids, chunk_size))
+            if not chunk:
+                break
+            FeedEntry.objects.bulk_create(
+                [
+                    FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+                    for user_id in chunk
+                    for pk, pub_date in posts
+                ],
+                ignore_conflicts=True,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_author_fanout_flag'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
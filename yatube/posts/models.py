@@ -1,7 +1,13 @@
+import json
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.url_cache import cached_reverse
+
+from .threads import PATH_MAX_LENGTH
+
 User = get_user_model()
 
 
@@ -9,10 +15,18 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True,)
     slug = models.SlugField(unique=True)
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+        editable=False
+    )
 
     def __str__(self) -> str:
         return self.title
 
+    def get_absolute_url(self):
+        return cached_reverse('posts:group_posts', self.slug)
+
 
 class Post(models.Model):
     text = models.TextField(
@@ -43,15 +57,98 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    thumbnail = models.ImageField(
+        'Миниатюра',
+        upload_to='posts/thumbnails/',
+        blank=True,
+        editable=False
+    )
+    image_variants = models.TextField(
+        'Варианты картинки',
+        blank=True,
+        editable=False,
+        help_text='JSON: формат -> [[ширина, путь], ...]'
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:settings.FIRST_SIMBOLS]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        post.saved_state = post._state_in_db()
+        return post
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.saved_state = self._state_in_db()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.saved_state = self._state_in_db()
+
+    def _state_in_db(self):
+        """Группа и дата изменения, как они записаны в базе.
+
+        Сигналы сохранения (posts.signals) берут отсюда прежние
+        значения без лишнего запроса; None — если поля отложены.
+        """
+        if self.get_deferred_fields() & {'group_id', 'updated'}:
+            return None
+        return {'group_id': self.group_id, 'updated': self.updated}
+
+    def get_absolute_url(self):
+        return cached_reverse('posts:post_detail', self.pk)
+
+    def get_edit_url(self):
+        return cached_reverse('posts:post_edit', self.pk)
+
+    @property
+    def variants(self):
+        """Варианты картинки: формат -> [[ширина, путь], ...]."""
+        try:
+            return json.loads(self.image_variants or '{}')
+        except ValueError:
+            return {}
+
+    @property
+    def image_sources(self):
+        """Пары (MIME-тип, srcset) для тега <picture>."""
+        storage = self.image.storage
+        return [
+            (f'image/{fmt}', ', '.join(
+                f'{storage.url(name)} {width}w' for width, name in variants
+            ))
+            for fmt, variants in self.variants.items()
+        ]
+
+    @property
+    def card_version(self) -> int:
+        """Версия карточки поста для ключа кеша фрагмента."""
+        return int(self.updated.timestamp() * 1000000)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -73,14 +170,61 @@ class Comment(models.Model):
         help_text='Введите текст комментария'
     )
     created = models.DateTimeField('Дата публикации', auto_now_add=True)
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+        verbose_name='Ответ на'
+    )
+    path = models.CharField(
+        'Путь в ветке',
+        max_length=PATH_MAX_LENGTH,
+        blank=True,
+        editable=False,
+        help_text='path родителя и pk комментария (posts.threads)'
+    )
+    depth = models.PositiveSmallIntegerField(
+        'Глубина',
+        default=0,
+        editable=False
+    )
 
     class Meta:
+        ordering = ('created', 'id')
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+            models.Index(fields=['-created'], name='comment_created_idx'),
+            models.Index(
+                fields=['post', 'path'],
+                name='comment_post_path_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:settings.FIRST_SIMBOLS]
 
+    def get_absolute_url(self):
+        """Страница поста, где комментарии начинаются с этого.
+
+        Ответы глубже COMMENT_PAGE_DEPTH видны только на странице ветки.
+        """
+        if self.depth > settings.COMMENT_PAGE_DEPTH:
+            return f'{self.get_thread_url()}#comment-{self.pk}'
+        return (
+            f"{cached_reverse('posts:post_detail', self.post_id)}"
+            f'?comment={self.pk}#comment-{self.pk}'
+        )
+
+    def get_thread_url(self):
+        return cached_reverse('posts:comment_thread', self.post_id, self.pk)
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -107,3 +251,165 @@ class Follow(models.Model):
                 name='check_not_self_follow'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'author'],
+                name='follow_user_author_idx'
+            ),
+            models.Index(fields=['author'], name='follow_author_idx'),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='feed_user_pub_date_idx'
+            ),
+        ]
+
+
+class FollowRecommendation(models.Model):
+    """Автор, которого стоит предложить пользователю (posts.recommendations).
+
+    score — сколько авторов из подписок пользователя подписаны на него.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.PositiveIntegerField('Общих подписок')
+
+    class Meta:
+        verbose_name = 'Рекомендация подписки'
+        verbose_name_plural = 'Рекомендации подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow_recommendation'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'],
+                name='recommendation_user_score_idx'
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        primary_key=True
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    # Посты не раскладываются по лентам, а подмешиваются при чтении
+    # (posts.feed). Флаг не снимается: прежние посты автора в ленты
+    # не разложены.
+    fanout_on_read = models.BooleanField(
+        'Подмешивать при чтении', default=False
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики автора'
+        verbose_name_plural = 'Счётчики авторов'
+        indexes = [
+            models.Index(
+                fields=['user'],
+                condition=models.Q(fanout_on_read=True),
+                name='authorstats_fanout_idx',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return str(self.user)
+
+
+class SearchDocument(models.Model):
+    """Текст поста или комментария в виде основ слов (posts.search)."""
+
+    POST = 'post'
+    COMMENT = 'comment'
+    KINDS = (
+        (POST, 'Пост'),
+        (COMMENT, 'Комментарий'),
+    )
+
+    kind = models.CharField('Тип', max_length=7, choices=KINDS)
+    object_id = models.PositiveIntegerField('Идентификатор')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_documents',
+        verbose_name='Пост'
+    )
+    terms = models.TextField('Основы слов')
+    length = models.PositiveIntegerField('Число слов', default=0)
+
+    class Meta:
+        verbose_name = 'Документ поиска'
+        verbose_name_plural = 'Документы поиска'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                name='unique_search_document'
+            ),
+        ]
+
+
+class SearchPosting(models.Model):
+    """Вхождение основы в документ для поиска без FTS в СУБД."""
+
+    term = models.CharField('Основа', max_length=100)
+    document = models.ForeignKey(
+        SearchDocument,
+        on_delete=models.CASCADE,
+        related_name='postings'
+    )
+    frequency = models.PositiveIntegerField('Число вхождений')
+
+    class Meta:
+        verbose_name = 'Вхождение основы'
+        verbose_name_plural = 'Вхождения основ'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'document'],
+                name='unique_search_posting'
+            ),
+        ]
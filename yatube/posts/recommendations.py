@@ -0,0 +1,99 @@
+"""Рекомендации подписок «друзья друзей».
+
+Считаются офлайн (manage.py build_recommendations). Граф подписок
+читается из Follow в массивы целых чисел, а не в объекты ORM:
+users — отсортированные id подписчиков, подписки users[i] лежат в
+targets[offsets[i]:offsets[i + 1]]. Для каждого пользователя
+кандидаты — авторы, на которых подписаны его подписки; вес —
+число таких подписок. Лучшие RECOMMENDATIONS_SIZE кандидатов
+сохраняются в FollowRecommendation пачками по пользователям, и
+страница рекомендаций читает их одним запросом.
+"""
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from heapq import nsmallest
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Follow, FollowRecommendation
+
+READ_CHUNK_SIZE = 10000
+
+
+class FollowArrays:
+    """Граф подписок в виде сжатых строк (CSR)."""
+
+    def __init__(self, users, offsets, targets):
+        self.users = users
+        self.offsets = offsets
+        self.targets = targets
+
+    @classmethod
+    def load(cls):
+        users, offsets, targets = array('q'), array('q'), array('q')
+        rows = Follow.objects.order_by('user_id', 'author_id').values_list(
+            'user_id', 'author_id'
+        )
+        for user_id, author_id in rows.iterator(chunk_size=READ_CHUNK_SIZE):
+            if not users or users[-1] != user_id:
+                users.append(user_id)
+                offsets.append(len(targets))
+            targets.append(author_id)
+        offsets.append(len(targets))
+        return cls(users, offsets, targets)
+
+    def following(self, user_id):
+        """id авторов, на которых подписан пользователь."""
+        position = bisect_left(self.users, user_id)
+        if position == len(self.users) or self.users[position] != user_id:
+            return self.targets[:0]
+        return self.targets[
+            self.offsets[position]:self.offsets[position + 1]
+        ]
+
+    def recommend(self, user_id, size):
+        """До size пар (id автора, вес) по убыванию веса."""
+        following = self.following(user_id)
+        scores = Counter()
+        for author_id in following:
+            scores.update(self.following(author_id))
+        scores.pop(user_id, None)
+        for author_id in following:
+            scores.pop(author_id, None)
+        return nsmallest(
+            size, scores.items(), key=lambda item: (-item[1], item[0])
+        )
+
+
+def build(batch_size=500, size=None, log=None):
+    """Пересчитывает рекомендации всех пользователей; число строк."""
+    size = size or settings.RECOMMENDATIONS_SIZE
+    graph = FollowArrays.load()
+    stale = [
+        user_id for user_id in FollowRecommendation.objects.values_list(
+            'user_id', flat=True
+        ).distinct()
+        if not len(graph.following(user_id))
+    ]
+    for start in range(0, len(stale), batch_size):
+        FollowRecommendation.objects.filter(
+            user_id__in=stale[start:start + batch_size]
+        ).delete()
+    stored = 0
+    for start in range(0, len(graph.users), batch_size):
+        batch = graph.users[start:start + batch_size].tolist()
+        rows = [
+            FollowRecommendation(user_id=user_id, author_id=author_id,
+                                 score=score)
+            for user_id in batch
+            for author_id, score in graph.recommend(user_id, size)
+        ]
+        with transaction.atomic():
+            FollowRecommendation.objects.filter(user_id__in=batch).delete()
+            FollowRecommendation.objects.bulk_create(rows)
+        stored += len(rows)
+        if log:
+            log(f'{start + len(batch)}/{len(graph.users)} пользователей')
+    return stored
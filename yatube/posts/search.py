@@ -0,0 +1,271 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Тексты хранятся в SearchDocument уже разбитыми на основы слов
+(posts.stemmer), поэтому запрос разбирается одинаково для всех
+бэкендов:
+
+* sqlite — таблица FTS5 posts_searchdocument_fts поверх
+  SearchDocument (миграция 0012_search), ранжирование bm25();
+* postgresql — to_tsvector('simple', terms) с GIN-индексом и ts_rank;
+* python — обратный индекс SearchPosting и BM25, посчитанный в Python.
+
+Бэкенд задаёт POST_SEARCH_BACKEND; 'auto' выбирает его по СУБД.
+Индекс обновляют сигналы (posts.signals), а перестраивает команда
+rebuild_search_index.
+"""
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Avg
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Post, SearchDocument, SearchPosting
+from .stemmer import TOKEN, stem, stems
+
+FTS_TABLE = 'posts_searchdocument_fts'
+# Параметры BM25 для бэкенда python.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Есть ли таблица FTS5: SQLite может быть собран без этого модуля.
+_sqlite_fts = None
+
+
+def backend_name():
+    global _sqlite_fts
+    name = settings.POST_SEARCH_BACKEND
+    if name != 'auto':
+        return name
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        if _sqlite_fts is None:
+            _sqlite_fts = FTS_TABLE in connection.introspection.table_names()
+        if _sqlite_fts:
+            return 'sqlite'
+    return 'python'
+
+
+def query_terms(query):
+    """Уникальные основы слов запроса в исходном порядке."""
+    return list(dict.fromkeys(stems(query)))
+
+
+def _index(kind, obj, post_id):
+    terms = stems(obj.text)
+    document, _ = SearchDocument.objects.update_or_create(
+        kind=kind,
+        object_id=obj.pk,
+        defaults={
+            'post_id': post_id,
+            'terms': ' '.join(terms),
+            'length': len(terms),
+        },
+    )
+    if backend_name() == 'python':
+        document.postings.all().delete()
+        SearchPosting.objects.bulk_create([
+            SearchPosting(term=term, document=document, frequency=frequency)
+            for term, frequency in Counter(terms).items()
+        ])
+
+
+def index_post(post):
+    _index(SearchDocument.POST, post, post.pk)
+
+
+def index_comment(comment):
+    if comment.post_id is not None:
+        _index(SearchDocument.COMMENT, comment, comment.post_id)
+
+
+def remove(kind, object_id):
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild(batch_size=1000):
+    """Перестраивает индекс целиком. Возвращает число документов."""
+    SearchDocument.objects.all().delete()
+    posts = Post.objects.only('pk', 'text')
+    comments = Comment.objects.filter(post__isnull=False).only(
+        'pk', 'text', 'post_id'
+    )
+    total = 0
+    for post in posts.iterator(chunk_size=batch_size):
+        index_post(post)
+        total += 1
+    for comment in comments.iterator(chunk_size=batch_size):
+        index_comment(comment)
+        total += 1
+    return total
+
+
+def _raw(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _kind_condition(kind, column):
+    """Условие SQL на тип документа и его параметры."""
+    if kind is None:
+        return '', []
+    return f' AND {column} = %s', [kind]
+
+
+def _search_sqlite(terms, limit, kind=None):
+    match = ' '.join(f'"{term}"' for term in terms)
+    condition, params = _kind_condition(kind, 'document.kind')
+    return [
+        (pk, -score) for pk, score in _raw(
+            f'SELECT document.id, bm25({FTS_TABLE}) AS score '
+            f'FROM {FTS_TABLE} JOIN posts_searchdocument document '
+            f'ON document.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s{condition} '
+            'ORDER BY score LIMIT %s',
+            [match, *params, limit],
+        )
+    ]
+
+
+def _search_postgresql(terms, limit, kind=None):
+    vector = "to_tsvector('simple', terms)"
+    condition, params = _kind_condition(kind, 'kind')
+    return _raw(
+        f'SELECT id, ts_rank({vector}, query) AS score '
+        f"FROM posts_searchdocument, to_tsquery('simple', %s) query "
+        f'WHERE {vector} @@ query{condition} '
+        'ORDER BY score DESC LIMIT %s',
+        [' & '.join(terms), *params, limit],
+    )
+
+
+def _search_python(terms, limit, kind=None):
+    postings = {
+        term: dict(
+            SearchPosting.objects.filter(term=term)
+            .values_list('document_id', 'frequency')
+        )
+        for term in terms
+    }
+    candidates = set.intersection(
+        *(set(found) for found in postings.values())
+    )
+    if not candidates:
+        return []
+    total = SearchDocument.objects.count()
+    average = SearchDocument.objects.aggregate(
+        average=Avg('length')
+    )['average'] or 1
+    documents = SearchDocument.objects.filter(pk__in=candidates)
+    if kind is not None:
+        documents = documents.filter(kind=kind)
+    lengths = dict(documents.values_list('pk', 'length'))
+    scores = Counter()
+    for found in postings.values():
+        idf = math.log(1 + (total - len(found) + 0.5) / (len(found) + 0.5))
+        for pk in lengths:
+            norm = 1 - BM25_B + BM25_B * lengths[pk] / average
+            scores[pk] += idf * found[pk] * (BM25_K1 + 1) / (
+                found[pk] + BM25_K1 * norm
+            )
+    return scores.most_common(limit)
+
+
+SEARCHES = {
+    'sqlite': _search_sqlite,
+    'postgresql': _search_postgresql,
+    'python': _search_python,
+}
+
+
+def search(query, kind=None):
+    """Пары (id SearchDocument, релевантность) от лучших к худшим.
+
+    Документ подходит, если в нём есть все слова запроса; kind
+    оставляет только посты или только комментарии.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+    return SEARCHES[backend_name()](terms, settings.POST_SEARCH_LIMIT, kind)
+
+
+def object_ids(query, kind):
+    """Подзапрос id постов или комментариев среди найденных документов."""
+    return SearchDocument.objects.filter(
+        pk__in=[pk for pk, _ in search(query, kind)]
+    ).values('object_id')
+
+
+def highlight(text, terms, size=None):
+    """Фрагмент текста вокруг первого совпадения с выделенными словами."""
+    size = size or settings.POST_SEARCH_SNIPPET_WORDS
+    terms = set(terms)
+    words = list(TOKEN.finditer(text))
+    first = next(
+        (i for i, word in enumerate(words) if stem(word.group()) in terms), 0
+    )
+    start = max(first - size // 3, 0)
+    window = words[start:start + size]
+    if not window:
+        return escape(text)
+    begin, end = window[0].start(), window[-1].end()
+    parts = ['…' if begin else '']
+    position = begin
+    for word in window:
+        parts.append(escape(text[position:word.start()]))
+        if stem(word.group()) in terms:
+            parts.append(f'<mark>{escape(word.group())}</mark>')
+        else:
+            parts.append(escape(word.group()))
+        position = word.end()
+    parts.append('…' if end < len(text) else '')
+    return mark_safe(re.sub(r'\s+', ' ', ''.join(parts)))
+
+
+class Hit:
+    """Найденный пост или комментарий с фрагментом текста."""
+
+    def __init__(self, document, obj, post, score, snippet):
+        self.document = document
+        self.object = obj
+        self.post = post
+        self.score = score
+        self.snippet = snippet
+
+    @property
+    def is_comment(self):
+        return self.document.kind == SearchDocument.COMMENT
+
+
+def hits(results, query):
+    """Превращает страницу результатов search в список Hit."""
+    documents = SearchDocument.objects.in_bulk([pk for pk, _ in results])
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        {document.post_id for document in documents.values()}
+    )
+    comments = Comment.objects.select_related('author').in_bulk([
+        document.object_id for document in documents.values()
+        if document.kind == SearchDocument.COMMENT
+    ])
+    terms = query_terms(query)
+    found = []
+    for pk, score in results:
+        document = documents.get(pk)
+        if document is None:
+            continue
+        post = posts[document.post_id]
+        obj = post
+        if document.kind == SearchDocument.COMMENT:
+            obj = comments.get(document.object_id)
+            if obj is None:
+                continue
+        found.append(
+            Hit(document, obj, post, score, highlight(obj.text, terms))
+        )
+    return found
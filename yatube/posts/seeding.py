@@ -0,0 +1,348 @@
+"""Большие синтетические наборы данных (manage.py seed).
+
+Строки создаются bulk_create пачками по CHUNK_SIZE. Каждая пачка
+владеет своим диапазоном id и своим генератором случайных чисел,
+зависящим только от --seed, поэтому пачки можно раздать нескольким
+процессам, а результат от их числа не зависит.
+
+Распределения перекошены, как в живой соцсети: активность авторов и
+популярность (подписчики, комментарии к постам) подчиняются закону
+Ципфа, число подписок пользователя — экспоненциальному.
+
+bulk_create не отправляет сигналы, поэтому счётчики и
+материализованная лента заполняются отдельными фазами одним
+INSERT ... SELECT или UPDATE на пачку, а не по строке.
+"""
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import lru_cache
+from multiprocessing import get_context
+from typing import NamedTuple
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, connections
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .counters import recount
+from .feed import mark_celebrities
+from .models import AuthorStats, Comment, FeedEntry, Follow, Group, Post
+from .threads import comment_path
+
+User = get_user_model()
+
+CHUNK_SIZE = 20000
+# Показатель закона Ципфа: чем больше, тем сильнее перекос.
+ZIPF_EXPONENT = 0.8
+WORDS = (
+    'день', 'город', 'утро', 'кошка', 'собака', 'книга', 'дорога', 'море',
+    'лес', 'река', 'поезд', 'работа', 'друг', 'семья', 'музыка', 'кино',
+    'погода', 'дождь', 'солнце', 'зима', 'лето', 'осень', 'весна', 'кофе',
+    'новый', 'старый', 'большой', 'тихий', 'быстрый', 'интересный',
+    'читать', 'писать', 'гулять', 'смотреть', 'думать', 'ехать', 'жить',
+    'сегодня', 'вчера', 'снова', 'наконец', 'очень', 'почти', 'вместе',
+    'python', 'django', 'фото', 'вечер', 'праздник', 'парк', 'окно',
+)
+
+
+class SeedPlan(NamedTuple):
+    """Размеры набора и первые свободные id; передаётся воркерам."""
+
+    seed: int
+    users: int
+    groups: int
+    posts: int
+    comments: int
+    follows_per_user: int
+    days: int
+    password: str
+    start: object
+    user_base: int
+    group_base: int
+    post_base: int
+    comment_base: int
+
+
+def make_plan(seed, users, groups, posts, comments, follows_per_user,
+              days=365, password=None):
+    """План заполнения поверх уже существующих строк."""
+    def next_pk(model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    return SeedPlan(
+        seed=seed, users=users, groups=groups, posts=posts,
+        comments=comments, follows_per_user=follows_per_user, days=days,
+        password=make_password(password),
+        start=timezone.now() - timedelta(days=days),
+        user_base=next_pk(User), group_base=next_pk(Group),
+        post_base=next_pk(Post), comment_base=next_pk(Comment),
+    )
+
+
+def _rng(plan, kind, start):
+    return random.Random(f'{plan.seed}:{kind}:{start}')
+
+
+@lru_cache(maxsize=4)
+def _zipf(seed, kind, size):
+    """Перемешанные номера 0..size-1 и накопленные веса Ципфа.
+
+    Первый номер в перемешанном списке — самый популярный.
+    """
+    order = list(range(size))
+    random.Random(f'{seed}:{kind}:order').shuffle(order)
+    weights = itertools.accumulate(
+        1 / (rank ** ZIPF_EXPONENT) for rank in range(1, size + 1)
+    )
+    return order, list(weights)
+
+
+def _skewed(plan, rng, kind, size, count=1):
+    order, weights = _zipf(plan.seed, kind, size)
+    ranks = rng.choices(range(size), cum_weights=weights, k=count)
+    return [order[rank] for rank in ranks]
+
+
+def _post_date(plan, index):
+    """Посты равномерно идут от начала периода до сегодня."""
+    return plan.start + timedelta(days=plan.days) * (index / plan.posts)
+
+
+def _text(rng, low, high):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return ' '.join(words).capitalize() + '.'
+
+
+@contextmanager
+def _explicit_dates():
+    """Разрешает задавать auto_now/auto_now_add поля в bulk_create."""
+    fields = [
+        Post._meta.get_field('pub_date'), Post._meta.get_field('updated'),
+        Comment._meta.get_field('created'),
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _seed_users(plan, start, stop):
+    User.objects.bulk_create([
+        User(
+            pk=plan.user_base + index,
+            username=f'user{plan.user_base + index}',
+            password=plan.password,
+        )
+        for index in range(start, stop)
+    ])
+    AuthorStats.objects.bulk_create([
+        AuthorStats(user_id=plan.user_base + index)
+        for index in range(start, stop)
+    ])
+
+
+def _seed_posts(plan, start, stop):
+    rng = _rng(plan, 'posts', start)
+    authors = _skewed(plan, rng, 'authors', plan.users, stop - start)
+    posts = []
+    for index, author in zip(range(start, stop), authors):
+        pub_date = _post_date(plan, index)
+        group = rng.randrange(plan.groups + plan.groups // 3 + 1)
+        posts.append(Post(
+            pk=plan.post_base + index,
+            text=_text(rng, 5, 60),
+            author_id=plan.user_base + author,
+            # Примерно четверть постов без группы.
+            group_id=(
+                plan.group_base + group if group < plan.groups else None
+            ),
+            pub_date=pub_date,
+            updated=pub_date,
+        ))
+    Post.objects.bulk_create(posts)
+
+
+def _seed_follows(plan, start, stop):
+    rng = _rng(plan, 'follows', start)
+    follows = []
+    for index in range(start, stop):
+        count = min(
+            plan.users - 1,
+            int(rng.expovariate(1 / plan.follows_per_user)),
+        )
+        # Популярны те же авторы, что чаще пишут.
+        authors = set(_skewed(plan, rng, 'authors', plan.users, count))
+        authors.discard(index)
+        follows += [
+            Follow(
+                user_id=plan.user_base + index,
+                author_id=plan.user_base + author,
+            )
+            for author in authors
+        ]
+    Follow.objects.bulk_create(follows)
+
+
+def _seed_comments(plan, start, stop):
+    rng = _rng(plan, 'comments', start)
+    posts = _skewed(plan, rng, 'posts', plan.posts, stop - start)
+    end = plan.start + timedelta(days=plan.days)
+    comments = []
+    for index, post in zip(range(start, stop), posts):
+        pub_date = _post_date(plan, post)
+        pk = plan.comment_base + index
+        comments.append(Comment(
+            pk=pk,
+            path=comment_path('', pk),
+            post_id=plan.post_base + post,
+            author_id=plan.user_base + rng.randrange(plan.users),
+            text=_text(rng, 2, 25),
+            created=pub_date + (end - pub_date) * rng.random(),
+        ))
+    Comment.objects.bulk_create(comments)
+
+
+def _fill_feed(plan, start, stop, celebrities):
+    """Заполняет ленты, как posts.feed.backfill при подписке.
+
+    Получается состояние, в котором каждая подписка оформлена после
+    постов автора: в ленте последние FEED_BACKFILL_SIZE постов каждого
+    автора, кроме знаменитостей. Полная раскладка всех постов дала бы
+    сотни строк на каждую строку постов.
+    """
+    excluded = ''
+    if celebrities:
+        excluded = 'AND follow.author_id NOT IN ({})'.format(
+            ', '.join(['%s'] * len(celebrities))
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FeedEntry._meta.db_table} '
+            '(user_id, post_id, pub_date) '
+            'SELECT follow.user_id, latest.id, latest.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            'JOIN ('
+            '  SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+            '    PARTITION BY author_id ORDER BY pub_date DESC'
+            f'  ) AS position FROM {Post._meta.db_table}'
+            ') latest ON latest.author_id = follow.author_id '
+            'WHERE follow.user_id >= %s AND follow.user_id < %s '
+            f'AND latest.position <= %s {excluded} '
+            # Строки в порядке индекса (user, -pub_date) вставляются
+            # в B-дерево почти последовательно, это вдвое быстрее.
+            'ORDER BY follow.user_id, latest.pub_date DESC',
+            [
+                plan.user_base + start, plan.user_base + stop,
+                settings.FEED_BACKFILL_SIZE, *celebrities,
+            ],
+        )
+
+
+def _count_posts(plan, start, stop):
+    recount(Post, plan.post_base + start, plan.post_base + stop)
+
+
+def _count_users(plan, start, stop):
+    recount(AuthorStats, plan.user_base + start, plan.user_base + stop)
+
+
+def _init_worker(databases):
+    """Готовит воркер; при fork соединения родителя не переиспользуются."""
+    if not apps.ready:
+        settings.DATABASES = databases
+        import django
+        django.setup()
+    for alias in connections:
+        wrapper = connections[alias]
+        if wrapper.vendor == 'sqlite':
+            # Запись в SQLite идёт по очереди: воркеры ждут друг друга.
+            wrapper.settings_dict['OPTIONS'].setdefault('timeout', 120)
+
+
+def _run_chunk(task):
+    function, plan, start, stop, extra = task
+    with _explicit_dates():
+        function(plan, start, stop, *extra)
+    return stop - start
+
+
+def _phases(plan):
+    # Генератор ленивый: знаменитости считаются после фазы подписок.
+    yield 'пользователи', _seed_users, plan.users, ()
+    yield 'посты', _seed_posts, plan.posts, ()
+    yield 'подписки', _seed_follows, plan.users, ()
+    yield 'комментарии', _seed_comments, plan.comments, ()
+    if settings.FEED_MATERIALIZED:
+        yield 'ленты', _fill_feed, plan.users, (_celebrities(),)
+    yield 'счётчики постов', _count_posts, plan.posts, ()
+    yield 'счётчики авторов', _count_users, plan.users, ()
+
+
+def _celebrities():
+    return tuple(
+        Follow.objects.values('author')
+        .annotate(followers=Count('pk'))
+        .filter(followers__gt=settings.FEED_FANOUT_LIMIT)
+        .values_list('author', flat=True)
+    )
+
+
+def run(plan, processes=1, log=print):
+    """Заполняет базу по плану; processes > 1 — параллельно."""
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        processes = 1
+    Group.objects.bulk_create([
+        Group(
+            pk=plan.group_base + index,
+            title=f'Группа {plan.group_base + index}',
+            slug=f'group-{plan.group_base + index}',
+            description=_text(_rng(plan, 'groups', index), 5, 20),
+        )
+        for index in range(plan.groups)
+    ])
+    pool = None
+    if processes > 1:
+        connections.close_all()
+        pool = get_context().Pool(
+            processes, _init_worker, (settings.DATABASES,)
+        )
+    try:
+        for title, function, total, extra in _phases(plan):
+            started = time.perf_counter()
+            tasks = [
+                (function, plan, start, min(start + CHUNK_SIZE, total), extra)
+                for start in range(0, total, CHUNK_SIZE)
+            ]
+            rows = sum(
+                pool.imap_unordered(_run_chunk, tasks) if pool
+                else map(_run_chunk, tasks)
+            )
+            log(f'{title}: {rows} за {time.perf_counter() - started:.1f} с')
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    recount(Group, plan.group_base, plan.group_base + plan.groups)
+    _reset_sequences()
+    mark_celebrities()
+
+
+def _reset_sequences():
+    """Сдвигает последовательности id за явно заданные значения."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [User, Group, Post, Comment]
+    )
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
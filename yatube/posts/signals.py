@@ -0,0 +1,245 @@
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import counters, feed, follow_graph, search, threads
+from .cache import (GLOBAL_FEED, bump_author_feeds, bump_feeds,
+                    bump_follow_feeds, group_feed_name,
+                    invalidate_author_post_cards, invalidate_post_cards,
+                    post_feed_name)
+from .models import Comment, Follow, Group, Post, SearchDocument
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, **kwargs):
+    """Заводит счётчики новому пользователю."""
+    if created and not kwargs.get('raw'):
+        counters.create_author_stats(instance.pk)
+
+
+# Поля пользователя, которые выводятся в карточке поста.
+POST_CARD_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, created, update_fields,
+                            **kwargs):
+    """Сбрасывает карточки постов автора после изменения его данных."""
+    if created or kwargs.get('raw'):
+        return
+    if update_fields is None or POST_CARD_USER_FIELDS & set(update_fields):
+        invalidate_author_post_cards(instance.pk)
+        bump_author_feeds(
+            instance.pk,
+            Post.objects.filter(author=instance)
+            .values_list('group_id', flat=True).distinct(),
+        )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_feeds(sender, instance, **kwargs):
+    """Сменяет поколения ленты группы и главной страницы."""
+    bump_feeds([GLOBAL_FEED, group_feed_name(instance.slug)])
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    """Запоминает прежние группу и версию поста.
+
+    Пост, загруженный из базы, помнит их сам (Post.saved_state);
+    запрос нужен, только если экземпляр собран вручную.
+    """
+    instance._previous = None
+    if instance.pk is None:
+        return
+    state = getattr(instance, 'saved_state', None)
+    if state is not None:
+        instance._previous = Post(pk=instance.pk, **state)
+    else:
+        instance._previous = Post.objects.filter(
+            pk=instance.pk
+        ).only('pk', 'group_id', 'updated').first()
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    """Раскладывает новый пост по лентам подписчиков."""
+    if created and settings.FEED_MATERIALIZED:
+        feed.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    """Обновляет счётчики постов автора и группы."""
+    previous = instance._previous
+    if created:
+        counters.change_author(instance.author_id, 'posts_count', 1)
+        counters.change_group(instance.group_id, 1)
+    elif previous is not None and previous.group_id != instance.group_id:
+        counters.change_group(previous.group_id, -1)
+        counters.change_group(instance.group_id, 1)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_previous_card(sender, instance, created, **kwargs):
+    """Удаляет карточку прежней версии поста."""
+    if not created and instance._previous is not None:
+        invalidate_post_cards([instance._previous])
+
+
+@receiver(post_save, sender=Post)
+def bump_post_feeds(sender, instance, created, **kwargs):
+    """Сменяет поколения лент, в которых виден пост."""
+    group_ids = {instance.group_id}
+    if instance._previous is not None:
+        group_ids.add(instance._previous.group_id)
+    bump_author_feeds(instance.author_id, group_ids)
+    bump_feeds([post_feed_name(instance.pk)])
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields, **kwargs):
+    """Обновляет пост в поисковом индексе, если менялся текст."""
+    if update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+
+
+# Посты, которые сейчас удаляются в этом потоке. Их комментарии
+# уходят каскадом, и обработчики комментариев их пропускают: ленты
+# поста сменяются, а счётчик и поисковый индекс исчезают один раз
+# вместе с самим постом.
+_deleting = threading.local()
+
+
+def deleting_posts():
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = set()
+    return _deleting.posts
+
+
+@receiver(pre_delete, sender=Post)
+def start_post_delete(sender, instance, **kwargs):
+    deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def finish_post_delete(sender, instance, **kwargs):
+    deleting_posts().discard(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def bump_deleted_post_feeds(sender, instance, **kwargs):
+    bump_author_feeds(instance.author_id, [instance.group_id])
+    bump_feeds([post_feed_name(instance.pk)])
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.change_author(instance.author_id, 'posts_count', -1)
+    counters.change_group(instance.group_id, -1)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_card(sender, instance, **kwargs):
+    invalidate_post_cards([instance])
+
+
+@receiver(pre_save, sender=Comment)
+def set_comment_depth(sender, instance, **kwargs):
+    if instance.parent_id is not None:
+        instance.depth = instance.parent.depth + 1
+
+
+@receiver(post_save, sender=Comment)
+def set_comment_path(sender, instance, created, **kwargs):
+    """Дописывает pk нового комментария к пути родителя."""
+    if created and not instance.path:
+        parent_path = instance.parent.path if instance.parent_id else ''
+        instance.path = threads.comment_path(parent_path, instance.pk)
+        Comment.objects.filter(pk=instance.pk).update(path=instance.path)
+
+
+@receiver(post_save, sender=Comment)
+def bump_comment_feeds(sender, instance, **kwargs):
+    """Сменяет поколение поста, под которым комментарий."""
+    bump_feeds([post_feed_name(instance.post_id)])
+
+
+@receiver(post_delete, sender=Comment)
+def bump_deleted_comment_feeds(sender, instance, **kwargs):
+    if instance.post_id not in deleting_posts():
+        bump_feeds([post_feed_name(instance.post_id)])
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    if instance.post_id not in deleting_posts():
+        counters.change_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, update_fields, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    # Документы комментариев удалённого поста удаляет каскад.
+    if instance.post_id not in deleting_posts():
+        search.remove(SearchDocument.COMMENT, instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    """Заполняет ленту постами автора после подписки."""
+    if created and settings.FEED_MATERIALIZED:
+        feed.backfill(instance)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follow(sender, instance, **kwargs):
+    """Сменяет поколения лент, зависящих от подписки."""
+    bump_follow_feeds(instance)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_graph(sender, instance, **kwargs):
+    """Сбрасывает подписки пользователя в кеше."""
+    follow_graph.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author(instance.author_id, 'followers_count', 1)
+        counters.change_author(instance.user_id, 'following_count', 1)
+        feed.update_fanout_mode(instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def retract_feed(sender, instance, **kwargs):
+    """Чистит ленту после отписки."""
+    if settings.FEED_MATERIALIZED:
+        feed.retract(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.change_author(instance.author_id, 'followers_count', -1)
+    counters.change_author(instance.user_id, 'following_count', -1)
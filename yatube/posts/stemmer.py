@@ -0,0 +1,73 @@
+"""Стеммер для русского языка по алгоритму Snowball (Портер).
+
+Окончания ищутся в области RV — части слова после первой гласной.
+Слова не на кириллице только приводятся к нижнему регистру.
+"""
+import re
+
+TOKEN = re.compile(r'\w+')
+CYRILLIC = re.compile(r'^[а-я]+$')
+RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$'
+)
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|'
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+# Суффикс -ост(ь) снимается, только если он целиком в области R2.
+DERIVATIONAL = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+DERIVATIONAL_SUFFIX = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+
+def _cut(pattern, word):
+    return pattern.sub('', word, count=1)
+
+
+def stem(word):
+    """Основа слова."""
+    word = word.lower().replace('ё', 'е')
+    match = RV.match(word)
+    if not CYRILLIC.match(word) or match is None:
+        return word
+    start, rv = match.groups()
+    cut = _cut(PERFECTIVE_GERUND, rv)
+    if cut == rv:
+        rv = _cut(REFLEXIVE, rv)
+        cut = _cut(ADJECTIVE, rv)
+        if cut != rv:
+            rv = _cut(PARTICIPLE, cut)
+        else:
+            cut = _cut(VERB, rv)
+            rv = _cut(NOUN, rv) if cut == rv else cut
+    else:
+        rv = cut
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if DERIVATIONAL.match(rv):
+        rv = _cut(DERIVATIONAL_SUFFIX, rv)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = _cut(SUPERLATIVE, rv)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
+
+
+def stems(text):
+    """Основы всех слов текста по порядку."""
+    return [stem(word) for word in TOKEN.findall(text)]
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+from ..utils import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.groups = [
+            Group.objects.create(title=f'Группа {i}', slug=f'group-{i}')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_posts(self, count):
+        start = Post.objects.count()
+        for number in range(start, start + count):
+            author = User.objects.create_user(username=f'author{number}')
+            post = Post.objects.create(
+                author=author,
+                group=self.groups[number % len(self.groups)],
+                text=f'Пост номер {number}',
+            )
+            Comment.objects.create(post=post, author=author, text='Отзыв')
+
+    def queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_changelist_queries_do_not_grow(self):
+        """Число запросов списка не зависит от числа строк на странице."""
+        for name in ('admin:posts_post_changelist',
+                     'admin:posts_comment_changelist'):
+            with self.subTest(page=name):
+                url = reverse(name)
+                self.add_posts(2)
+                few = self.queries(url)
+                self.add_posts(20)
+                self.assertEqual(self.queries(url), few)
+
+    def test_search_uses_fulltext_index(self):
+        """Поиск в админке находит посты по формам слова и по автору."""
+        self.add_posts(3)
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url, {'q': 'посты'})
+        self.assertEqual(response.context['cl'].result_count, 3)
+        response = self.client.get(url, {'q': 'author1'})
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            list(Post.objects.filter(author__username='author1')),
+        )
+
+    @override_settings(ESTIMATED_COUNT_LIMIT=2)
+    def test_estimated_count(self):
+        """Без фильтров число строк оценивается, с фильтрами ограничено."""
+        self.add_posts(4)
+        last = Post.objects.latest('pk').pk
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, last)
+        filtered = Post.objects.filter(group__isnull=False)
+        self.assertEqual(EstimatedCountPaginator(filtered, 10).count, 2)
@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class ViewBudgetsTest(TestCase):
+    """Представления укладываются в объявленные бюджеты запросов.
+
+    Данных достаточно, чтобы N+1 на постах, комментариях или
+    подписках сразу вышел за бюджет.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for number in range(15):
+            author = User.objects.create_user(username=f'writer{number}')
+            Follow.objects.create(user=cls.reader, author=author)
+            post = Post.objects.create(
+                author=cls.author if number % 2 else author,
+                group=cls.group,
+                text=f'Пост номер {number}',
+            )
+            for _ in range(3):
+                Comment.objects.create(
+                    post=post, author=cls.reader, text='Комментарий'
+                )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.filter(author=cls.author).first()
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_pages(self):
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:post_comments', args=[self.post.pk]),
+            reverse('posts:comment_thread', args=[
+                self.post.pk, self.post.comments.first().pk
+            ]),
+            reverse('posts:follow_index'),
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=[self.post.pk]),
+            reverse('posts:search') + '?q=посты',
+            reverse('posts:followers', args=[self.author.username]),
+            reverse('posts:following', args=[self.reader.username]),
+            reverse('posts:recommendations'),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                cache.clear()
+                self.client.get(url)
+                # Второй раз страница ленты может прийти из кеша.
+                self.client.get(url)
+
+    def test_read_views_for_guest(self):
+        """Страницы для гостя."""
+        self.get_pages()
+
+    def test_read_views_for_reader(self):
+        """Страницы для подписчика с заполненной лентой."""
+        self.client.force_login(self.reader)
+        self.get_pages()
+
+    def test_read_views_for_author(self):
+        """Страницы для автора, которому доступно редактирование."""
+        self.client.force_login(self.author)
+        self.get_pages()
+
+    def test_write_views(self):
+        """Комментарий, подписка, отписка, создание и правка поста."""
+        self.client.force_login(self.reader)
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Ещё комментарий'},
+        )
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Ответ', 'parent': self.post.comments.first().pk},
+        )
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'Новый пост', 'group': self.group.pk},
+        )
+        self.client.force_login(self.author)
+        self.client.post(
+            reverse('posts:post_edit', args=[self.post.pk]),
+            {'text': 'Изменённый пост', 'group': self.group.pk},
+        )
+        self.assertTrue(Post.objects.filter(text='Изменённый пост').exists())
@@ -0,0 +1,232 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import threads
+from ..models import Comment, Post
+from ..utils import encode_cursor
+
+NUMBER_OF_COMMENTS = 5
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PER_PAGE=2)
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commentator')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {number}'
+            )
+            for number in range(NUMBER_OF_COMMENTS)
+        ]
+        # Одинаковое время создания: порядок решает pk.
+        Comment.objects.update(created=cls.comments[0].created)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_detail_renders_first_page(self):
+        """На странице поста только первая страница комментариев."""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        page = response.context['comments']
+        self.assertEqual(list(page), self.comments[:2])
+        self.assertContains(
+            response,
+            reverse('posts:post_comments', args=[self.post.pk])
+            + f'?cursor={page.next_cursor}',
+        )
+
+    def test_fragments_cover_all_comments(self):
+        """Фрагменты догружают остальные комментарии по порядку."""
+        address = reverse('posts:post_comments', args=[self.post.pk])
+        loaded = []
+        cursor = ''
+        while cursor is not None:
+            response = self.guest_client.get(address, {'cursor': cursor})
+            self.assertTemplateNotUsed(response, 'base.html')
+            loaded += list(response.context['comments'])
+            cursor = response.context['comments'].next_cursor
+        self.assertEqual(loaded, self.comments)
+
+    def test_json_page(self):
+        """Порция комментариев в JSON с курсором следующей."""
+        address = reverse('posts:post_comments', args=[self.post.pk])
+        first = self.guest_client.get(address, {'format': 'json'}).json()
+        self.assertEqual(
+            [comment['id'] for comment in first['comments']],
+            [comment.pk for comment in self.comments[:2]],
+        )
+        second = self.guest_client.get(
+            address, {'format': 'json', 'cursor': first['next_cursor']}
+        ).json()
+        self.assertEqual(second['comments'][0]['text'], 'Комментарий 2')
+        self.assertEqual(second['comments'][0]['author'], 'commentator')
+
+    def test_comment_url_opens_page_with_comment(self):
+        """Адрес комментария открывает страницу, начинающуюся с него."""
+        comment = Comment.objects.get(pk=self.comments[3].pk)
+        response = self.guest_client.get(comment.get_absolute_url())
+        self.assertEqual(
+            list(response.context['comments']), self.comments[3:5]
+        )
+        self.assertTrue(response.context['comments'].has_previous())
+
+    def test_bad_comment_id_opens_first_page(self):
+        """Негодный ?comment= и испорченный курсор — первая страница."""
+        address = reverse('posts:post_comments', args=[self.post.pk])
+        for params in (
+            {'comment': '9' * 30},
+            {'comment': '-1'},
+            {'comment': 'x'},
+            {'cursor': encode_cursor('n', [None])},
+        ):
+            with self.subTest(params=params):
+                response = self.guest_client.get(address, params)
+                self.assertEqual(
+                    list(response.context['comments']), self.comments[:2]
+                )
+
+
+class CommentThreadsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commentator')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.other_post = Post.objects.create(author=cls.user, text='Другой')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.first = self.reply(None, 'Первый')
+        self.answer = self.reply(self.first, 'Ответ')
+        self.deep = self.reply(self.answer, 'Ответ на ответ')
+        self.second = self.reply(None, 'Второй')
+
+    def reply(self, parent, text):
+        return Comment.objects.create(
+            post=self.post, author=self.user, parent=parent, text=text
+        )
+
+    def test_paths_follow_tree(self):
+        """Путь ответа продолжает путь родителя, порядок — обход."""
+        self.assertEqual(self.deep.depth, 2)
+        self.assertTrue(self.deep.path.startswith(self.answer.path))
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertEqual(
+            list(response.context['comments']),
+            [self.first, self.answer, self.deep, self.second],
+        )
+
+    def test_subtree_in_one_query(self):
+        """Поддерево и ограничение глубины — один запрос."""
+        comments = self.post.comments.all()
+        with self.assertNumQueries(1):
+            subtree = list(threads.thread(comments, self.first))
+        self.assertEqual(subtree, [self.first, self.answer, self.deep])
+        with self.assertNumQueries(1):
+            shallow = list(threads.thread(comments, self.first, depth=1))
+        self.assertEqual(shallow, [self.first, self.answer])
+        self.assertEqual(list(threads.thread(comments, self.deep)), [
+            self.deep
+        ])
+
+    def test_thread_json_is_nested(self):
+        """Ветка в JSON собрана в дерево ответов."""
+        response = self.client.get(
+            reverse(
+                'posts:comment_thread', args=[self.post.pk, self.first.pk]
+            ),
+            {'format': 'json'},
+        )
+        root, = response.json()['thread']
+        self.assertEqual(root['id'], self.first.pk)
+        answer, = root['replies']
+        self.assertEqual(answer['replies'][0]['text'], 'Ответ на ответ')
+
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_thread_page_is_paginated(self):
+        """Страница ветки идёт порциями, фрагменты — по запросу из JS."""
+        address = reverse(
+            'posts:comment_thread', args=[self.post.pk, self.first.pk]
+        )
+        page = self.client.get(address).context['comments']
+        self.assertEqual(list(page), [self.first, self.answer])
+        response = self.client.get(
+            address, {'cursor': page.next_cursor},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(list(response.context['comments']), [self.deep])
+
+    def test_add_reply(self):
+        """Ответ сохраняется в ветке; чужой пост родителем не станет."""
+        address = reverse('posts:add_comment', args=[self.post.pk])
+        response = self.client.post(
+            address, {'text': 'Ещё ответ', 'parent': self.answer.pk}
+        )
+        reply = Comment.objects.get(text='Ещё ответ')
+        self.assertEqual(reply.parent, self.answer)
+        self.assertEqual(reply.path, threads.comment_path(
+            self.answer.path, reply.pk
+        ))
+        self.assertRedirects(
+            response,
+            self.answer.get_thread_url() + f'#comment-{reply.pk}',
+            fetch_redirect_response=False,
+        )
+        self.client.post(
+            reverse('posts:add_comment', args=[self.other_post.pk]),
+            {'text': 'Чужой', 'parent': self.answer.pk},
+        )
+        self.assertIsNone(Comment.objects.get(text='Чужой').parent)
+
+    def test_bad_depth_and_parent(self):
+        """Негодные ?depth= и parent не роняют запрос."""
+        address = reverse(
+            'posts:comment_thread', args=[self.post.pk, self.first.pk]
+        )
+        for depth in ('9' * 30, '9' * 5000, '²', '-1'):
+            with self.subTest(depth=depth[:10]):
+                response = self.client.get(address, {'depth': depth})
+                self.assertEqual(
+                    list(response.context['comments']),
+                    [self.first, self.answer, self.deep],
+                )
+        for parent in ('9' * 30, 'x', '²'):
+            with self.subTest(parent=parent):
+                response = self.client.post(
+                    reverse('posts:add_comment', args=[self.post.pk]),
+                    {'text': 'Ответ в никуда', 'parent': parent},
+                )
+                self.assertRedirects(
+                    response, self.post.get_absolute_url(),
+                    fetch_redirect_response=False,
+                )
+        self.assertFalse(
+            Comment.objects.filter(text='Ответ в никуда').exists()
+        )
+
+    @mock.patch.object(threads, 'MAX_DEPTH', 2)
+    def test_reply_deeper_than_limit_goes_to_parent(self):
+        """Ответ глубже MAX_DEPTH становится соседом родителя."""
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Слишком глубоко', 'parent': self.deep.pk},
+        )
+        reply = Comment.objects.get(text='Слишком глубоко')
+        self.assertEqual(reply.parent, self.answer)
+        self.assertEqual(reply.depth, 2)
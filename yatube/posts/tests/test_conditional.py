@@ -0,0 +1,133 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(HTML_CACHE_SHARED_MAX_AGE=20)
+class ConditionalTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост'
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_unchanged_page_returns_304_without_queries(self):
+        """Неизменная страница отдаёт гостю 304 без запросов к базе."""
+        for address in (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            self.post.get_absolute_url(),
+            reverse('posts:followers', args=[self.author.username]),
+        ):
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertTrue(response.has_header('Last-Modified'))
+                with self.assertNumQueries(0):
+                    not_modified = self.client.get(
+                        address, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(
+                    not_modified.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                not_modified = self.client.get(
+                    address,
+                    HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+                )
+                self.assertEqual(
+                    not_modified.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+    def test_cache_policy(self):
+        """Страницу гостя может хранить прокси, страницу пользователя — нет."""
+        address = reverse('posts:index')
+        guest = self.client.get(address)
+        self.assertEqual(
+            guest['Cache-Control'], 'public, max-age=0, s-maxage=20'
+        )
+        self.assertIn('Cookie', guest['Vary'])
+        user = self.reader_client.get(address)
+        self.assertEqual(user['Cache-Control'], 'private, no-cache')
+        self.assertIn('Cookie', user['Vary'])
+        self.assertNotEqual(guest['ETag'], user['ETag'])
+
+    def test_changes_replace_etag(self):
+        """Комментарий и смена имени автора меняют ETag страницы поста."""
+        address = self.post.get_absolute_url()
+        etag = self.client.get(address)['ETag']
+        Comment.objects.create(post=self.post, author=self.author, text='Ещё')
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Ещё')
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Новое'
+        author.save()
+        response = self.client.get(
+            address, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertContains(response, 'Новое')
+
+    def test_new_csrf_cookie_replaces_etag(self):
+        """После смены CSRF-куки форма комментария приходит заново."""
+        address = self.post.get_absolute_url()
+        etag = self.reader_client.get(address)['ETag']
+        self.reader_client.cookies['csrftoken'] = 'a' * 64
+        response = self.reader_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.reader_client.get(
+            address, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_fragment_has_own_etag(self):
+        """Фрагмент ветки для JS и страница ветки — разные ответы."""
+        address = self.comment.get_thread_url()
+        page = self.client.get(address)
+        fragment = self.client.get(
+            address, HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+            HTTP_IF_NONE_MATCH=page['ETag'],
+        )
+        self.assertEqual(fragment.status_code, HTTPStatus.OK)
+        self.assertNotEqual(fragment['ETag'], page['ETag'])
+        self.assertIn('X-Requested-With', fragment['Vary'])
+
+    def test_follow_index_etag_per_user(self):
+        """Лента подписок проверяется только для своего пользователя."""
+        address = reverse('posts:follow_index')
+        etag = self.reader_client.get(address)['ETag']
+        other = Client()
+        other.force_login(self.author)
+        response = other.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_follow_list_marks_follows_of_reader(self):
+        """Подписка читателя меняет ETag чужого списка подписчиков."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.author)
+        address = reverse('posts:followers', args=[self.author.username])
+        etag = self.reader_client.get(address)['ETag']
+        Follow.objects.create(user=self.reader, author=other)
+        response = self.reader_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'вы подписаны')
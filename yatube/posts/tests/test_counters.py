@@ -0,0 +1,121 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import (AuthorStats, Comment, Follow, Group, Post,
+                      SearchDocument)
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+        )
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Создание, перенос и удаление поста меняют счётчики."""
+        other_group = Group.objects.create(title='Другая', slug='other')
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.group = other_group
+        post.save()
+        self.group.refresh_from_db()
+        other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(other_group.posts_count, 1)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_comment_counter(self):
+        """Комментарии учитываются в счётчике поста."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def delete_queries(self, comments):
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.bulk_create([
+            Comment(post=post, author=self.reader, text='Комментарий')
+            for _ in range(comments)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            post.delete()
+        return len(queries)
+
+    def test_post_delete_does_not_handle_each_comment(self):
+        """Удаление поста не обрабатывает комментарии по одному."""
+        self.assertEqual(self.delete_queries(1), self.delete_queries(5))
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertFalse(SearchDocument.objects.exists())
+
+    def test_edit_reads_previous_state_without_query(self):
+        """Пост из базы помнит прежнюю группу, лишний запрос не нужен."""
+        other_group = Group.objects.create(title='Другая', slug='other')
+        created = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        post = Post.objects.get(pk=created.pk)
+        with CaptureQueriesContext(connection) as loaded:
+            post.group = other_group
+            post.save()
+        built = Post(
+            pk=post.pk, author=self.author, group=self.group, text='Пост',
+            pub_date=post.pub_date,
+        )
+        with CaptureQueriesContext(connection) as manual:
+            built.save()
+        self.assertEqual(len(manual), len(loaded) + 1)
+        self.group.refresh_from_db()
+        other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(other_group.posts_count, 0)
+
+    def test_follow_counters(self):
+        """Подписка и отписка меняют счётчики обеих сторон."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_reconcile_counters_fixes_drift(self):
+        """Команда reconcile_counters чинит разошедшиеся счётчики."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        AuthorStats.objects.update(posts_count=42)
+        Group.objects.update(posts_count=42)
+        Post.objects.update(comments_count=42)
+        AuthorStats.objects.filter(user=self.reader).delete()
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
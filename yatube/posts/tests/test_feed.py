@@ -0,0 +1,113 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..cache import (GENERATION_PREFIX, feed_generations, follower_feed_name,
+                     group_feed_name)
+from ..feed import celebrity_ids, follow_feed
+from ..models import FeedEntry, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленту подписчика и только его."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.stranger).exists()
+        )
+        self.assertEqual(list(follow_feed(self.reader)), [post])
+
+    def test_follow_backfills_and_unfollow_retracts(self):
+        """Подписка добавляет старые посты, отписка их убирает."""
+        post = Post.objects.create(author=self.author, text='Старый пост')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(list(follow_feed(self.reader)), [post])
+        follow.delete()
+        self.assertEqual(list(follow_feed(self.reader)), [])
+
+    @override_settings(FEED_BACKFILL_SIZE=2)
+    def test_rebuild_fills_feeds_of_existing_follows(self):
+        """rebuild_feed раскладывает последние посты прежних подписок."""
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        FeedEntry.objects.all().delete()
+        self.assertEqual(list(follow_feed(self.reader)), [])
+        call_command('rebuild_feed', batch_size=1, stdout=StringIO())
+        for user in (self.reader, self.stranger):
+            with self.subTest(user=user):
+                self.assertEqual(
+                    list(follow_feed(user)), posts[:0:-1]
+                )
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_merged_on_read(self):
+        """Посты авторов сверх лимита читаются без раскладки."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост звезды')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(list(follow_feed(self.reader)), [post])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_celebrity_posts_survive_dropping_below_limit(self):
+        """Посты, вышедшие сверх лимита, не пропадают после отписок."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост звезды')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        Follow.objects.get(user=self.stranger, author=self.author).delete()
+        # Список авторов в кеше истёк.
+        cache.clear()
+        self.assertEqual(list(follow_feed(self.reader)), [post])
+        self.assertIn(self.author.pk, celebrity_ids())
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_celebrity_post_refreshes_follow_page(self):
+        """Пост знаменитости обновляет ленту, не трогая подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        client = Client()
+        client.force_login(self.reader)
+        address = reverse('posts:follow_index')
+        client.get(address)
+        generation = feed_generations([follower_feed_name(self.reader.pk)])
+        Post.objects.create(author=self.author, text='Пост звезды')
+        self.assertEqual(
+            feed_generations([follower_feed_name(self.reader.pk)]),
+            generation,
+        )
+        self.assertContains(client.get(address), 'Пост звезды')
+
+    def test_generation_keys_are_safe_for_memcached(self):
+        """В ключах поколений нет пробелов и произвольных имён."""
+        group = Group.objects.create(title='Группа', slug='слаг с пробелом')
+        Post.objects.create(author=self.author, group=group, text='Пост')
+        key = GENERATION_PREFIX + group_feed_name(group.slug)
+        self.assertIsNotNone(cache.get(key))
+        self.assertNotIn(' ', key)
+        self.assertNotIn(group.slug, key)
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..follow_graph import FollowGraph
+from ..models import Follow
+
+User = get_user_model()
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        for author in self.authors[:3]:
+            Follow.objects.create(user=self.reader, author=author)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_one_query_for_any_number_of_authors(self):
+        """Подписки загружаются одним запросом, затем из кеша."""
+        with self.assertNumQueries(1):
+            graph = FollowGraph(self.reader)
+            following = [author in graph for author in self.authors]
+        self.assertEqual(following, [True, True, True, False, False])
+        with self.assertNumQueries(0):
+            self.assertIn(self.authors[0].pk, FollowGraph(self.reader))
+
+    def test_cache_invalidated_on_follow_and_unfollow(self):
+        """Подписка и отписка сбрасывают закешированные подписки."""
+        self.assertNotIn(self.authors[3], FollowGraph(self.reader))
+        Follow.objects.create(user=self.reader, author=self.authors[3])
+        self.assertIn(self.authors[3], FollowGraph(self.reader))
+        Follow.objects.filter(author=self.authors[0]).delete()
+        self.assertNotIn(self.authors[0], FollowGraph(self.reader))
+
+    def test_anonymous_follows_nobody(self):
+        """Аноним ни на кого не подписан, запросов нет."""
+        with self.assertNumQueries(0):
+            self.assertNotIn(self.authors[0], FollowGraph(AnonymousUser()))
+
+    def test_profile_following_is_viewers(self):
+        """Кнопка подписки в профиле зависит от подписок зрителя."""
+        address = reverse(
+            'posts:profile', kwargs={'username': self.authors[0].username}
+        )
+        for user, following in ((self.reader, True), (self.stranger, False)):
+            client = Client()
+            client.force_login(user)
+            with self.subTest(user=user.username):
+                response = client.get(address)
+                self.assertEqual(response.context['following'], following)
+                self.assertIs(
+                    self.authors[0] in response.context['follow_graph'],
+                    following,
+                )
@@ -1,12 +1,16 @@
+import json
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO, StringIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..forms import PostForm
 from ..models import Comment, Group, Post
@@ -106,6 +110,173 @@ class PostFormTests(TestCase):
         self.assertTrue(Post.objects.filter(text='Изменяем текст').exists())
         self.assertEqual(response.status_code, HTTPStatus.OK)
 
+    @override_settings(POST_THUMBNAIL_WORKERS=0)
+    def test_create_post_builds_thumbnail(self):
+        """После загрузки картинки строится миниатюра нужного размера."""
+        self.authorized_client.post(
+            reverse('posts:post_create'), data=self.form_data
+        )
+        post = Post.objects.get(text=self.form_data['text'])
+        self.assertTrue(post.thumbnail)
+        with Image.open(post.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, settings.POST_THUMBNAIL_SIZE)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, post.thumbnail.url)
+        self.assertContains(response, 'type="image/webp"')
+        webp = json.loads(post.image_variants)['webp']
+        self.assertEqual(
+            [width for width, _ in webp], list(settings.POST_IMAGE_WIDTHS)
+        )
+
+    def test_generate_post_images_backfills_existing_posts(self):
+        """Команда строит миниатюры и варианты для старых постов."""
+        self.authorized_client.post(
+            reverse('posts:post_create'), data=self.form_data
+        )
+        call_command('generate_post_images', workers=0, stdout=StringIO())
+        post = Post.objects.get(text=self.form_data['text'])
+        self.assertTrue(post.thumbnail)
+        self.assertIn('webp', json.loads(post.image_variants))
+
+    def test_generate_post_images_skips_broken_image(self):
+        """Испорченная картинка не останавливает остальные посты."""
+        broken = Post.objects.create(
+            author=self.user, text='Битая', image='posts/broken.jpg'
+        )
+        broken.image.storage.save('posts/broken.jpg', BytesIO(b'junk'))
+        self.authorized_client.post(
+            reverse('posts:post_create'), data=self.form_data
+        )
+        errors = StringIO()
+        call_command(
+            'generate_post_images', workers=0, stdout=StringIO(),
+            stderr=errors,
+        )
+        self.assertIn(f'Пост {broken.pk}', errors.getvalue())
+        post = Post.objects.get(text=self.form_data['text'])
+        self.assertTrue(post.thumbnail)
+
+    def test_pending_thumbnail_shows_original_image(self):
+        """Пока миниатюры нет, выводится исходная картинка."""
+        self.authorized_client.post(
+            reverse('posts:post_create'), data=self.form_data
+        )
+        post = Post.objects.get(text=self.form_data['text'])
+        self.assertFalse(post.thumbnail)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, f'src="{post.image.url}"')
+
+    @override_settings(POST_THUMBNAIL_WORKERS=0)
+    def test_replaced_image_files_are_deleted(self):
+        """После замены картинки старые миниатюра и варианты удаляются."""
+        self.authorized_client.post(
+            reverse('posts:post_create'), data=self.form_data
+        )
+        post = Post.objects.get(text=self.form_data['text'])
+        storage = post.thumbnail.storage
+        previous = [post.thumbnail.name] + [
+            name for variants in post.variants.values()
+            for _, name in variants
+        ]
+        self.assertGreater(len(previous), 1)
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            data={
+                'text': 'Новая картинка',
+                'image': SimpleUploadedFile(
+                    'other.gif', self.small_gif, content_type='image/gif'
+                ),
+            },
+        )
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail)
+        self.assertTrue(storage.exists(post.thumbnail.name))
+        for name in previous:
+            with self.subTest(name=name):
+                self.assertFalse(storage.exists(name))
+
+    def test_create_post_strips_exif(self):
+        """Из картинки удаляются метаданные, кроме ориентации."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        exif[0x0112] = 6
+        buffer = BytesIO()
+        Image.new('RGB', (40, 20)).save(buffer, 'JPEG', exif=exif.tobytes())
+        form_data = {
+            'text': 'Фото с EXIF',
+            'image': SimpleUploadedFile(
+                'photo.jpg', buffer.getvalue(), content_type='image/jpeg'
+            ),
+        }
+        self.authorized_client.post(
+            reverse('posts:post_create'), data=form_data
+        )
+        post = Post.objects.get(text=form_data['text'])
+        with Image.open(post.image.path) as image:
+            self.assertEqual(dict(image.getexif()), {0x0112: 6})
+            self.assertEqual(image.size, (40, 20))
+
+    def test_image_limits(self):
+        """Картинки сверх ограничений отклоняются до декодирования."""
+        buffer = BytesIO()
+        Image.new('RGB', (200, 100)).save(buffer, 'BMP')
+        cases = (
+            ({'POST_IMAGE_MAX_SIZE': 20}, 'image.gif', self.small_gif,
+             'Файл больше 20\xa0байт.'),
+            ({'POST_IMAGE_MAX_PIXELS': 100}, 'image.bmp', buffer.getvalue(),
+             'Поддерживаются только форматы JPEG, PNG, GIF, WEBP.'),
+            ({'POST_IMAGE_FORMATS': ('BMP',), 'POST_IMAGE_MAX_PIXELS': 100},
+             'image.bmp', buffer.getvalue(),
+             'Картинка 200×100 слишком большая.'),
+        )
+        for limits, name, content, error in cases:
+            with self.subTest(limits=limits), override_settings(**limits):
+                response = self.authorized_client.post(
+                    reverse('posts:post_create'),
+                    data={
+                        'text': 'Слишком большая картинка',
+                        'image': SimpleUploadedFile(name, content),
+                    },
+                )
+                self.assertFormError(response, 'form', 'image', error)
+        self.assertFalse(
+            Post.objects.filter(text='Слишком большая картинка').exists()
+        )
+
+    def test_broken_jpeg_segment(self):
+        """JPEG с испорченной длиной сегмента отклоняется формой."""
+        buffer = BytesIO()
+        Image.new('RGB', (40, 20)).save(buffer, 'JPEG')
+        content = buffer.getvalue()
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Испорченный JPEG',
+                'image': SimpleUploadedFile(
+                    'photo.jpg', content[:2] + b'\xff\xfe\x00\x01'
+                    + content[2:],
+                ),
+            },
+        )
+        self.assertFormError(
+            response, 'form', 'image',
+            PostForm.base_fields['image'].error_messages['invalid_image'],
+        )
+
+    def test_post_form_keeps_csrf_check(self):
+        """Ограничение загрузки не отключает проверку CSRF."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(
+            reverse('posts:post_create'), data={'text': 'Без токена'}
+        )
+        self.assertTemplateUsed(response, 'core/403csrf.html')
+        self.assertFalse(Post.objects.filter(text='Без токена').exists())
+
     def test_comment(self):
         """
         Комментарии могут оставлять только авторизованные пользователи и
@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
 
 from ..models import Group, Post
 
@@ -59,3 +60,21 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
+
+    def test_cached_urls_match_reverse(self):
+        """Адреса поста, группы и автора совпадают с reverse()."""
+        user = User(username='name.with+chars@mail')
+        group = Group(slug='test-slug')
+        post = PostModelTest.post
+        urls = {
+            post.get_absolute_url(): reverse(
+                'posts:post_detail', args=[post.pk]),
+            post.get_edit_url(): reverse('posts:post_edit', args=[post.pk]),
+            group.get_absolute_url(): reverse(
+                'posts:group_posts', args=[group.slug]),
+            user.get_absolute_url(): reverse(
+                'posts:profile', args=[user.username]),
+        }
+        for url, expected in urls.items():
+            with self.subTest(url=expected):
+                self.assertEqual(url, expected)
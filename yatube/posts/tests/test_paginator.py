@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from ..models import Group, Post
+from ..utils import encode_cursor
 
 FIRST_PAGE_POSTS = 10
 NUMBER_OF_TEST_POSTS = 13
@@ -41,3 +43,95 @@ class PaginatorViewTests(TestCase):
         """Проверка: на второй странице должно быть три поста."""
         response = self.guest_client.get(reverse('posts:index') + '?page=2')
         self.assertEqual(len(response.context['page_obj']), SECOND_PAGE_POSTS)
+
+    @override_settings(VOLUME_POSTS=1)
+    def test_page_links_around_current_page(self):
+        """Проверка: ссылки только на соседние, первую и последнюю."""
+        response = self.guest_client.get(reverse('posts:index') + '?page=7')
+        for number in (1, 4, 6, 8, 10, NUMBER_OF_TEST_POSTS):
+            self.assertContains(response, f'href="?page={number}"')
+        for number in (2, 3, 11, 12):
+            self.assertNotContains(response, f'href="?page={number}"')
+
+
+@override_settings(PAGINATION_MODES={'posts:index': 'cursor'})
+class CursorPaginatorViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            [Post(
+                author=cls.user,
+                text=f'Тестовый пост {i}',
+            ) for i in range(NUMBER_OF_TEST_POSTS)]
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_cursor_pages_cover_all_posts(self):
+        """Проверка: курсоры обходят все посты без пропусков и повторов."""
+        response = self.guest_client.get(reverse('posts:index'))
+        first_page = response.context['page_obj']
+        self.assertEqual(len(first_page), FIRST_PAGE_POSTS)
+        self.assertFalse(first_page.has_previous())
+        response = self.guest_client.get(
+            reverse('posts:index') + f'?cursor={first_page.next_cursor}'
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), SECOND_PAGE_POSTS)
+        self.assertFalse(second_page.has_next())
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        self.assertEqual(list(first_page) + list(second_page), expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Проверка: курсор назад возвращает предыдущую страницу."""
+        first_page = self.guest_client.get(
+            reverse('posts:index')).context['page_obj']
+        second_page = self.guest_client.get(
+            reverse('posts:index') + f'?cursor={first_page.next_cursor}'
+        ).context['page_obj']
+        response = self.guest_client.get(
+            reverse('posts:index') + f'?cursor={second_page.previous_cursor}'
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), list(first_page)
+        )
+
+    def test_page_number_still_works(self):
+        """Проверка: старые ссылки ?page=N продолжают работать."""
+        response = self.guest_client.get(reverse('posts:index') + '?page=2')
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertEqual(len(response.context['page_obj']), SECOND_PAGE_POSTS)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Проверка: испорченный курсор отдаёт первую страницу."""
+        response = self.guest_client.get(reverse('posts:index') + '?cursor=x')
+        self.assertEqual(len(response.context['page_obj']), FIRST_PAGE_POSTS)
+
+    def test_forged_cursor_returns_first_page(self):
+        """Проверка: подделанные значения курсора не доходят до базы."""
+        latest = Post.objects.order_by('-pub_date', '-pk').first()
+        for values in (
+            [None, None],
+            [latest.pub_date, None],
+            [[1], 2],
+            [5, 'x'],
+            [latest.pub_date, 10 ** 30],
+            [latest.pub_date, float('inf')],
+            [latest.pub_date, float('nan')],
+            [latest.pub_date, {'pk': 1}],
+        ):
+            with self.subTest(values=values):
+                response = self.guest_client.get(
+                    reverse('posts:index'),
+                    {'cursor': encode_cursor('n', values)},
+                )
+                self.assertEqual(
+                    len(response.context['page_obj']), FIRST_PAGE_POSTS
+                )
@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, FollowRecommendation
+from ..recommendations import FollowArrays, build
+
+User = get_user_model()
+
+
+class RecommendationsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        names = ('reader', 'friend', 'other', 'popular', 'niche', 'lonely')
+        cls.users = {
+            name: User.objects.create_user(username=name) for name in names
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.follow('reader', 'friend', 'other', 'niche')
+        self.follow('friend', 'popular', 'niche', 'reader')
+        self.follow('other', 'popular', 'lonely')
+
+    def tearDown(self):
+        cache.clear()
+
+    def follow(self, user, *authors):
+        for author in authors:
+            Follow.objects.create(
+                user=self.users[user], author=self.users[author]
+            )
+
+    def test_friends_of_friends(self):
+        """Кандидаты — подписки подписок без себя и уже читаемых."""
+        graph = FollowArrays.load()
+        self.assertEqual(
+            graph.recommend(self.users['reader'].pk, 10),
+            [(self.users['popular'].pk, 2), (self.users['lonely'].pk, 1)],
+        )
+        self.assertEqual(graph.recommend(self.users['lonely'].pk, 10), [])
+        self.assertEqual(
+            len(graph.recommend(self.users['reader'].pk, 1)), 1
+        )
+
+    def test_build_replaces_stored_lists(self):
+        """Пересчёт заменяет списки и убирает списки без подписок."""
+        call_command(
+            'build_recommendations', batch_size=1, stdout=StringIO()
+        )
+        FollowRecommendation.objects.create(
+            user=self.users['lonely'], author=self.users['reader'], score=1
+        )
+        Follow.objects.filter(user=self.users['other']).delete()
+        build(batch_size=2)
+        self.assertEqual(
+            list(FollowRecommendation.objects.filter(
+                user=self.users['reader']
+            ).values_list('author__username', 'score')),
+            [('popular', 1)],
+        )
+        self.assertFalse(FollowRecommendation.objects.filter(
+            user__in=[self.users['lonely'], self.users['other']]
+        ).exists())
+
+    def test_recommendations_page(self):
+        """Страница читает готовый список и скрывает новые подписки."""
+        build()
+        self.follow('reader', 'lonely')
+        client = Client()
+        client.force_login(self.users['reader'])
+        with self.assertNumQueries(4):
+            response = client.get(reverse('posts:recommendations'))
+        self.assertEqual(
+            [item.author for item in response.context['recommendations']],
+            [self.users['popular']],
+        )
+
+    def test_follower_and_following_pages(self):
+        """Списки подписчиков и подписок пользователя."""
+        pages = {
+            reverse('posts:followers', args=['popular']):
+                ['other', 'friend'],
+            reverse('posts:following', args=['reader']):
+                ['niche', 'other', 'friend'],
+        }
+        for address, expected in pages.items():
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertEqual(
+                    [user.username for user in response.context['page_obj']],
+                    expected,
+                )
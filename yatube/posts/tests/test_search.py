@@ -0,0 +1,97 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post, SearchDocument
+from ..search import object_ids, search
+from ..stemmer import stem
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.cats = Post.objects.create(
+            author=cls.author, text='Мои кошки любят спать на солнце.'
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.author, text='Собака охраняет дом.'
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.dogs, author=cls.author, text='А у меня живёт кошка.'
+        )
+
+    def found(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return [hit.object for hit in response.context['page_obj']]
+
+    def test_stemmer(self):
+        """Разные формы слова сводятся к одной основе."""
+        for word in ('кошка', 'кошки', 'кошками', 'Кошкой'):
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), 'кошк')
+
+    def test_search_posts_and_comments(self):
+        """Поиск находит посты и комментарии по формам слова."""
+        self.assertCountEqual(
+            self.found('кошкам'), [self.cats, self.comment]
+        )
+        self.assertEqual(self.found('кошки солнце'), [self.cats])
+        self.assertEqual(self.found('слон'), [])
+
+    def test_snippet_highlight(self):
+        """Найденные слова выделяются в фрагменте текста."""
+        response = self.client.get(reverse('posts:search'), {'q': 'солнца'})
+        self.assertContains(response, '<mark>солнце</mark>')
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'кошка живёт'}
+        )
+        self.assertContains(response, f'#comment-{self.comment.pk}')
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении."""
+        post = Post.objects.create(author=self.author, text='Первый вариант')
+        post.text = 'Второй вариант'
+        post.save()
+        self.assertEqual(self.found('первый'), [])
+        self.assertEqual(self.found('второго'), [post])
+        comment = Comment.objects.create(
+            post=self.cats, author=self.author, text='Отличный вариант'
+        )
+        self.assertEqual(self.found('варианты'), [post, comment])
+        comment.delete()
+        post.delete()
+        self.assertEqual(self.found('вариант'), [])
+
+    @override_settings(POST_SEARCH_BACKEND='python')
+    def test_python_backend(self):
+        """Запасной бэкенд ищет так же, как FTS в СУБД."""
+        call_command('rebuild_search_index', stdout=StringIO())
+        ids = [pk for pk, _ in search('кошками')]
+        self.assertEqual(len(ids), 2)
+        self.assertCountEqual(self.found('кошки'), [self.cats, self.comment])
+        self.assertEqual(self.found('кошки солнце'), [self.cats])
+
+    @override_settings(POST_SEARCH_LIMIT=1)
+    def test_kind_filter_before_limit(self):
+        """Лимит выдачи применяется после отбора по типу документа."""
+        Comment.objects.create(
+            post=self.dogs, author=self.author, text='Кошка.'
+        )
+        for backend in ('sqlite', 'python'):
+            with self.subTest(backend=backend), override_settings(
+                POST_SEARCH_BACKEND=backend
+            ):
+                call_command('rebuild_search_index', stdout=StringIO())
+                self.assertEqual(
+                    list(Post.objects.filter(
+                        pk__in=object_ids('кошка', SearchDocument.POST)
+                    )),
+                    [self.cats],
+                )
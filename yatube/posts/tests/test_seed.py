@@ -0,0 +1,68 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Max
+from django.test import TestCase, override_settings
+
+from ..counters import reconcile
+from ..feed import follow_feed
+from ..models import AuthorStats, Comment, FeedEntry, Follow, Group, Post
+
+User = get_user_model()
+
+
+class SeedCommandTest(TestCase):
+    def seed(self, **options):
+        sizes = {
+            'users': 30, 'groups': 3, 'posts': 300, 'comments': 200,
+            'follows_per_user': 5, 'processes': 1,
+        }
+        sizes.update(options)
+        call_command('seed', stdout=StringIO(), **sizes)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_rows_and_derived_data(self):
+        """Создаются строки, счётчики и ленты, как при работе сайта."""
+        self.seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(FeedEntry.objects.exists())
+        self.assertEqual(reconcile(), 0)
+        for user in User.objects.filter(follower__isnull=False)[:5]:
+            with self.subTest(user=user.username):
+                materialized = list(follow_feed(user).values_list('pk'))
+                with override_settings(FEED_MATERIALIZED=False):
+                    direct = list(follow_feed(user).values_list('pk'))
+                self.assertEqual(materialized, direct)
+
+    def test_skew(self):
+        """Посты сосредоточены у немногих авторов."""
+        self.seed(users=100, posts=2000, comments=0)
+        counts = sorted(
+            AuthorStats.objects.values_list('posts_count', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(sum(counts[:10]), 2000 * 0.3)
+
+    def test_same_seed_same_data(self):
+        """Одинаковый seed даёт одинаковые данные поверх существующих."""
+        def seed_posts(seed):
+            first_user = User.objects.aggregate(last=Max('pk'))['last'] or 0
+            self.seed(seed=seed, comments=0)
+            return [
+                (text, author_id - first_user)
+                for text, author_id in Post.objects.filter(
+                    author_id__gt=first_user
+                ).order_by('pk').values_list('text', 'author_id')
+            ]
+
+        first = seed_posts(7)
+        self.assertEqual(seed_posts(7), first)
+        self.assertNotEqual(seed_posts(8), first)
@@ -192,13 +192,68 @@ class ViewsTest(TestCase):
         )
         reverse_addr = reverse('posts:index')
         content1 = self.client.get(reverse_addr).content
-        post.delete()
+        Post.objects.filter(pk=post.pk).update(text='Без сигналов')
         content2 = self.client.get(reverse_addr).content
         self.assertEqual(content1, content2)
-        cache.clear()
+        post.delete()
         content3 = self.client.get(reverse_addr).content
         self.assertNotEqual(content1, content3)
 
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }})
+    def test_feed_pages_without_cache(self):
+        """Ленты работают с кешем, который ничего не хранит."""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.text)
+
+    def test_feed_pages_invalidated_on_new_post(self):
+        """Новый пост сразу виден в закешированных лентах."""
+        Follow.objects.create(user=self.second_user, author=self.user)
+        pages = {
+            reverse('posts:index'): self.guest_client,
+            reverse('posts:group_posts', kwargs={'slug': 'test-slug'}):
+                self.guest_client,
+            reverse('posts:profile', kwargs={'username': 'StasBasov'}):
+                self.guest_client,
+            reverse('posts:follow_index'): self.another_authorized_client,
+        }
+        for address, client in pages.items():
+            client.get(address)
+        Post.objects.create(
+            author=self.user,
+            group=self.group,
+            text='Свежий пост'
+        )
+        for address, client in pages.items():
+            with self.subTest(address=address):
+                self.assertContains(client.get(address), 'Свежий пост')
+
+    def test_post_card_fragment_follows_post_edit(self):
+        """Карточка поста обновляется сразу после правки поста."""
+        reverse_addr = reverse('posts:group_posts', kwargs={
+            'slug': self.group.slug
+        })
+        self.guest_client.get(reverse_addr)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        response = self.guest_client.get(reverse_addr)
+        self.assertContains(response, 'Исправленный пост')
+
+    def test_post_card_fragment_follows_author_edit(self):
+        """Карточка поста обновляется после смены имени автора."""
+        reverse_addr = reverse('posts:group_posts', kwargs={
+            'slug': self.group.slug
+        })
+        self.guest_client.get(reverse_addr)
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = 'Стас'
+        author.last_name = 'Басов'
+        author.save()
+        response = self.guest_client.get(reverse_addr)
+        self.assertContains(response, 'Стас Басов')
+
     def test_follow(self):
         """Проверка работы подписки на автора"""
         follows_count = Follow.objects.count()
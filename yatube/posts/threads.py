@@ -0,0 +1,69 @@
+"""Ветки комментариев: материализованный путь.
+
+path комментария — path родителя и pk комментария в
+PATH_SEGMENT_LENGTH цифр с ведущими нулями. Сортировка по path
+обходит дерево в глубину (ответы — сразу под родителем, по порядку
+создания), а поддерево — это диапазон строк от path корня до
+следующего за ним числа той же длины, который читается одним
+запросом по индексу (post, path). Только цифры — чтобы порядок
+строк не зависел от правил сортировки СУБД.
+"""
+from django.db.models import Q
+
+PATH_SEGMENT_LENGTH = 10
+# Ответы глубже прикрепляются к родителю ответа (add_comment).
+MAX_DEPTH = 99
+PATH_MAX_LENGTH = PATH_SEGMENT_LENGTH * (MAX_DEPTH + 1)
+
+
+def comment_path(parent_path, pk):
+    return f'{parent_path}{pk:0{PATH_SEGMENT_LENGTH}d}'
+
+
+def subtree_condition(path):
+    """Условие на path для комментария с path и всех его ответов."""
+    upper = str(int(path) + 1).zfill(len(path))
+    if len(upper) > len(path):
+        return Q(path__gte=path)
+    return Q(path__gte=path, path__lt=upper)
+
+
+def parse_depth(value):
+    """Глубина из параметра запроса: не больше MAX_DEPTH.
+
+    None — без ограничения, если значение не число или меньше нуля.
+    """
+    try:
+        depth = int(value)
+    except (TypeError, ValueError):
+        return None
+    if depth < 0:
+        return None
+    return min(depth, MAX_DEPTH)
+
+
+def thread(comments, root, depth=None):
+    """Поддерево root не глубже depth уровней в порядке обхода."""
+    comments = comments.filter(subtree_condition(root.path))
+    if depth is not None:
+        comments = comments.filter(depth__lte=root.depth + depth)
+    return comments.order_by('path')
+
+
+def build_tree(comments):
+    """Раскладывает комментарии в порядке path по children.
+
+    Возвращает верхние узлы. Стек держит цепочку предков текущего
+    комментария, и каждый комментарий кладётся и снимается с него
+    один раз, поэтому сборка линейна. Комментарии без предка в
+    выборке становятся верхними узлами.
+    """
+    roots = []
+    ancestors = []
+    for comment in comments:
+        comment.children = []
+        while ancestors and not comment.path.startswith(ancestors[-1].path):
+            ancestors.pop()
+        (ancestors[-1].children if ancestors else roots).append(comment)
+        ancestors.append(comment)
+    return roots
@@ -0,0 +1,259 @@
+"""Приём картинок постов без полного декодирования.
+
+* SizeLimitUploadHandler обрывает приём файла больше
+  POST_IMAGE_MAX_SIZE, не дочитывая его в память или на диск;
+  представления с картинками подключают его декоратором
+  limit_upload_size, остальные загрузки сайта он не ограничивает;
+* inspect_image проверяет формат и размеры по заголовку: Pillow
+  открывает файл лениво, и растр при проверке не распаковывается;
+* strip_metadata потоково копирует файл без EXIF, XMP и текстовых
+  блоков; для JPEG сохраняется только тег ориентации.
+
+Копия пишется в SpooledTemporaryFile и при сохранении передаётся
+хранилищу кусками.
+"""
+import struct
+from functools import wraps
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.forms import ImageField
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image
+
+CHUNK_SIZE = 64 * 1024
+ORIENTATION = 0x0112
+
+# Сегменты JPEG с метаданными: APP1 (EXIF, XMP), APP13 (IPTC), COM.
+JPEG_METADATA = {0xE1, 0xED, 0xFE}
+# Маркеры JPEG без длины.
+JPEG_STANDALONE = {0x01, *range(0xD0, 0xD8)}
+JPEG_SOS = 0xDA
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_METADATA = {b'eXIf', b'tEXt', b'iTXt', b'zTXt', b'tIME'}
+WEBP_METADATA = {b'EXIF', b'XMP '}
+# Флаги EXIF и XMP в заголовке VP8X.
+WEBP_METADATA_FLAGS = 0x08 | 0x04
+
+
+class OversizedUpload(UploadedFile):
+    """Заглушка вместо файла, приём которого был оборван."""
+
+    def __init__(self, name, content_type, size):
+        super().__init__(
+            SpooledTemporaryFile(), name, content_type, size
+        )
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """Обрывает приём файла, превысившего POST_IMAGE_MAX_SIZE.
+
+    Стоит первым в request.upload_handlers: до превышения передаёт
+    куски следующим обработчикам, после — отбрасывает их и отдаёт
+    форме OversizedUpload с числом принятых байт.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            return OversizedUpload(
+                self.file_name, self.content_type, self.received
+            )
+        return None
+
+
+def limit_upload_size(view):
+    """Ставит SizeLimitUploadHandler перед разбором тела запроса.
+
+    Обработчики можно менять, только пока тело не прочитано, а
+    CsrfViewMiddleware читает его до представления, поэтому проверка
+    CSRF переносится внутрь декоратора.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(0, SizeLimitUploadHandler(request))
+        return protected(request, *args, **kwargs)
+    return wrapper
+
+
+def _invalid_image():
+    return ValidationError(
+        ImageField.default_error_messages['invalid_image'],
+        code='invalid_image',
+    )
+
+
+def inspect_image(upload):
+    """Проверяет картинку по заголовку и возвращает открытый Image.
+
+    Бросает ValidationError, если файл не картинка, формат не из
+    POST_IMAGE_FORMATS или превышены ограничения размеров.
+    """
+    if upload.size > settings.POST_IMAGE_MAX_SIZE:
+        raise ValidationError(
+            'Файл больше %(limit)s.',
+            code='file_size',
+            params={'limit': filesizeformat(settings.POST_IMAGE_MAX_SIZE)},
+        )
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise _invalid_image()
+    if image.format not in settings.POST_IMAGE_FORMATS:
+        raise ValidationError(
+            'Поддерживаются только форматы %(formats)s.',
+            code='image_format',
+            params={'formats': ', '.join(settings.POST_IMAGE_FORMATS)},
+        )
+    width, height = image.size
+    if (max(width, height) > settings.POST_IMAGE_MAX_SIDE
+            or width * height > settings.POST_IMAGE_MAX_PIXELS):
+        raise ValidationError(
+            'Картинка %(width)s×%(height)s слишком большая.',
+            code='image_dimensions',
+            params={'width': width, 'height': height},
+        )
+    return image
+
+
+def _copy(source, target, size=None):
+    """Копирует size байт (или всё до конца) кусками по CHUNK_SIZE."""
+    while size is None or size > 0:
+        data = source.read(
+            CHUNK_SIZE if size is None else min(size, CHUNK_SIZE)
+        )
+        if not data:
+            break
+        target.write(data)
+        if size is not None:
+            size -= len(data)
+
+
+def _skip(source, size):
+    source.seek(size, 1)
+
+
+def _read(source, size):
+    """Ровно size байт; обрезанный файл — не картинка."""
+    data = source.read(size)
+    if len(data) < size:
+        raise _invalid_image()
+    return data
+
+
+def _strip_jpeg(source, target, orientation):
+    target.write(source.read(2))
+    if orientation not in (None, 1):
+        exif = Image.Exif()
+        exif[ORIENTATION] = orientation
+        data = exif.tobytes()
+        target.write(b'\xff\xe1' + struct.pack('>H', len(data) + 2) + data)
+    while True:
+        marker = source.read(2)
+        if len(marker) < 2:
+            return
+        while marker[1] == 0xFF:
+            marker = marker[1:] + _read(source, 1)
+        code = marker[1]
+        if code in JPEG_STANDALONE:
+            target.write(marker)
+            continue
+        if code == JPEG_SOS:
+            # Дальше сжатые данные, метаданных после них не бывает.
+            target.write(marker)
+            _copy(source, target)
+            return
+        length = _read(source, 2)
+        size = struct.unpack('>H', length)[0] - 2
+        if size < 0:
+            raise _invalid_image()
+        if code in JPEG_METADATA:
+            _skip(source, size)
+        else:
+            target.write(marker + length)
+            _copy(source, target, size)
+
+
+def _strip_png(source, target):
+    target.write(source.read(len(PNG_SIGNATURE)))
+    while True:
+        header = source.read(8)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack('>I4s', header)
+        if kind in PNG_METADATA:
+            _skip(source, size + 4)
+            continue
+        target.write(header)
+        _copy(source, target, size + 4)
+        if kind == b'IEND':
+            return
+
+
+def _webp_chunks(source):
+    source.seek(12)
+    while True:
+        header = source.read(8)
+        if len(header) < 8:
+            return
+        kind, size = struct.unpack('<4sI', header)
+        yield kind, size + size % 2, source.tell()
+        _skip(source, size + size % 2)
+
+
+def _strip_webp(source, target):
+    chunks = [
+        chunk for chunk in _webp_chunks(source)
+        if chunk[0] not in WEBP_METADATA
+    ]
+    total = 4 + sum(8 + size for _, size, _ in chunks)
+    target.write(b'RIFF' + struct.pack('<I', total) + b'WEBP')
+    for kind, size, offset in chunks:
+        source.seek(offset - 8)
+        target.write(source.read(8))
+        if kind == b'VP8X':
+            flags = _read(source, 1)[0] & ~WEBP_METADATA_FLAGS
+            target.write(bytes([flags]))
+            size -= 1
+        _copy(source, target, size)
+
+
+def strip_metadata(upload, image):
+    """Возвращает копию загрузки без метаданных.
+
+    image — результат inspect_image для этого же файла.
+    """
+    copy = SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    upload.seek(0)
+    if image.format == 'JPEG':
+        _strip_jpeg(upload, copy, image.getexif().get(ORIENTATION))
+    elif image.format == 'PNG':
+        _strip_png(upload, copy)
+    elif image.format == 'WEBP':
+        _strip_webp(upload, copy)
+    else:
+        _copy(upload, copy)
+    size = copy.tell()
+    copy.seek(0)
+    stripped = UploadedFile(
+        copy, upload.name, upload.content_type, size, upload.charset
+    )
+    stripped.image = image
+    return stripped
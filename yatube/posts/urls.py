@@ -13,11 +13,24 @@ urlpatterns = [
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
+    path('posts/<int:post_id>/comments/<int:comment_id>/',
+         views.comment_thread, name='comment_thread'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/recommendations/', views.recommendations,
+         name='recommendations'),
+    path('search/', views.search, name='search'),
     path(
         'profile/<str:username>/follow/', views.profile_follow,
         name='profile_follow'),
     path(
         'profile/<str:username>/unfollow/', views.profile_unfollow,
         name='profile_unfollow'),
+    path(
+        'profile/<str:username>/followers/', views.follower_list,
+        name='followers'),
+    path(
+        'profile/<str:username>/following/', views.following_list,
+        name='following'),
 ]
@@ -1,9 +1,287 @@
+import base64
+import json
+from collections.abc import Sequence
+from datetime import datetime
+
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+PAGINATION_OFFSET = 'offset'
+PAGINATION_CURSOR = 'cursor'
+
+DEFAULT_CURSOR_ORDERING = ('-pub_date', '-pk')
+COMMENT_CURSOR_ORDERING = ('path',)
+# Границы целых, которые принимают все поддерживаемые СУБД (INTEGER
+# в SQLite, bigint в PostgreSQL), если СУБД не сообщает свои.
+SQL_INTEGER_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+
+class InvalidCursor(Exception):
+    """Курсор не удалось разобрать."""
+
+
+def encode_cursor(direction, values):
+    """Упаковывает направление и значения ключа в непрозрачный токен."""
+    payload = json.dumps({
+        'd': direction,
+        'v': [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in values
+        ],
+    }, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен, созданный encode_cursor."""
+    try:
+        padding = '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(token + padding))
+        direction, values = payload['d'], payload['v']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor(token)
+    if direction not in ('n', 'p') or not isinstance(values, list):
+        raise InvalidCursor(token)
+    return direction, values
+
+
+def lookup_value(field, value, using='default'):
+    """Значение из запроса, приведённое к типу field для фильтра.
+
+    ValidationError, если его нельзя подставить в запрос: None,
+    значение чужого типа или целое вне диапазона столбца.
+    """
+    if value is None:
+        raise ValidationError('Пустое значение.')
+    try:
+        value = field.to_python(value)
+    except (TypeError, ValueError, OverflowError) as error:
+        raise ValidationError(str(error))
+    if isinstance(value, int):
+        low, high = connections[using].ops.integer_field_range(
+            field.get_internal_type()
+        )
+        low = SQL_INTEGER_RANGE[0] if low is None else low
+        high = SQL_INTEGER_RANGE[1] if high is None else high
+        if not low <= value <= high:
+            raise ValidationError(f'{value} вне диапазона.')
+    return value
+
+
+def parse_id(value, model, using='default'):
+    """pk модели из параметра запроса или None, если он негоден."""
+    try:
+        return lookup_value(model._meta.pk, value, using)
+    except ValidationError:
+        return None
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации.
+
+    Повторяет ту часть интерфейса django.core.paginator.Page,
+    которую используют шаблоны, но вместо номеров страниц
+    хранит токены соседних страниц.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Пагинация по ключу вместо LIMIT/OFFSET.
+
+    Каждая страница выбирается условием «строго после/до последней
+    записи предыдущей страницы» по полям ordering, поэтому стоимость
+    запроса не зависит от глубины страницы и не требует COUNT(*).
+    Последнее поле ordering должно быть уникальным.
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=DEFAULT_CURSOR_ORDERING):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = [
+            (field.lstrip('-'), field.startswith('-')) for field in ordering
+        ]
+
+    def _order_by(self, reverse=False):
+        return [
+            f'-{name}' if descending != reverse else name
+            for name, descending in self.ordering
+        ]
+
+    def _values(self, obj):
+        return [getattr(obj, name) for name, _ in self.ordering]
+
+    def _seek(self, values, reverse=False):
+        """Условие «после значений values» в порядке сортировки."""
+        condition = Q()
+        for position, (name, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[position]})
+            for prev_position in range(position):
+                prev_name = self.ordering[prev_position][0]
+                step &= Q(**{prev_name: values[prev_position]})
+            condition |= step
+        return condition
+
+    def _parse_values(self, values):
+        """Приводит значения из токена к типам полей модели."""
+        if len(values) != len(self.ordering):
+            raise InvalidCursor(values)
+        opts = self.object_list.model._meta
+        parsed = []
+        for (name, _), value in zip(self.ordering, values):
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+            try:
+                parsed.append(
+                    lookup_value(field, value, self.object_list.db)
+                )
+            except ValidationError:
+                raise InvalidCursor(values)
+        return parsed
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу по токену; битый токен даёт первую страницу."""
+        direction, values = 'n', None
+        if cursor:
+            try:
+                direction, values = decode_cursor(cursor)
+                values = self._parse_values(values)
+            except InvalidCursor:
+                direction, values = 'n', None
+        backwards = direction == 'p'
+        queryset = self.object_list.order_by(*self._order_by(backwards))
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backwards))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        has_next = has_more if not backwards else True
+        has_previous = has_more if backwards else values is not None
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor('n', self._values(rows[-1]))
+        if rows and has_previous:
+            previous_cursor = encode_cursor('p', self._values(rows[0]))
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+
+def estimate_rows(model, using='default'):
+    """Примерное число строк таблицы без COUNT(*).
+
+    PostgreSQL берёт оценку планировщика из pg_class, остальные СУБД —
+    наибольший первичный ключ (удалённые строки его не уменьшают).
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return int(row[0])
+    return model._default_manager.using(using).aggregate(
+        last=Max('pk')
+    )['last'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator, который не считает большие таблицы целиком.
+
+    Без фильтров число строк берётся из estimate_rows, а с фильтрами
+    считается не больше ESTIMATED_COUNT_LIMIT строк: дальше последней
+    страницы листать всё равно незачем.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ESTIMATED_COUNT_LIMIT
+        if not queryset.query.has_filters():
+            estimate = estimate_rows(queryset.model, queryset.db)
+            if estimate > limit:
+                return estimate
+        return queryset[:limit].count()
+
+
+def pagination_mode(request):
+    """Режим пагинации для текущего представления из PAGINATION_MODES."""
+    match = getattr(request, 'resolver_match', None)
+    view_name = match.view_name if match else None
+    return settings.PAGINATION_MODES.get(view_name, PAGINATION_OFFSET)
+
+
+def comment_paginator(comments, request):
+    """Страница комментариев в порядке веток (posts.threads).
+
+    ?cursor= — следующая или предыдущая страница, ?comment=<pk> —
+    страница, которая начинается с этого комментария.
+    """
+    paginator = CursorPaginator(
+        comments, settings.COMMENTS_PER_PAGE, COMMENT_CURSOR_ORDERING
+    )
+    cursor = request.GET.get('cursor')
+    start = parse_id(request.GET.get('comment'), comments.model, comments.db)
+    if cursor or start is None:
+        return paginator.get_page(cursor)
+    path = comments.filter(pk=start).values_list('path', flat=True).first()
+    if path is None:
+        return paginator.get_page()
+    page = CursorPaginator(
+        comments.filter(path__gte=path),
+        settings.COMMENTS_PER_PAGE,
+        COMMENT_CURSOR_ORDERING,
+    ).get_page()
+    if comments.filter(path__lt=path).exists():
+        page.previous_cursor = encode_cursor('p', [path])
+    return page
+
 
+def paginator(posts, request, mode=None):
+    """Функция вывода 10 постов на страницу.
 
-def paginator(posts, request):
-    """Функция вывода 10 постов на страницу."""
+    В курсорном режиме старые ссылки вида ?page=N продолжают
+    обслуживаться обычным Paginator, пока не появится ?cursor=.
+    """
+    if mode is None:
+        mode = pagination_mode(request)
+    cursor = request.GET.get('cursor')
+    if mode == PAGINATION_CURSOR and (cursor or not request.GET.get('page')):
+        return CursorPaginator(posts, settings.VOLUME_POSTS).get_page(cursor)
     paginator = Paginator(posts, settings.VOLUME_POSTS)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
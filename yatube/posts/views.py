@@ -1,16 +1,33 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.urls import reverse
 
+from core.budgets import query_budget
+
+from . import follow_graph, threads
+from .cache import (GLOBAL_FEED, author_feed_name, cache_feed, follow_feeds,
+                    follow_list_feeds, group_feed_name, post_feeds)
+from .conditional import conditional_feed
+from .feed import follow_feed
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
-from .utils import paginator
+from .models import Comment, Follow, Group, Post
+from .search import hits
+from .search import search as search_documents
+from .thumbnails import delete_files, generated_files, schedule_thumbnail
+from .uploads import limit_upload_size
+from .utils import (PAGINATION_OFFSET, comment_paginator, paginator,
+                    parse_id)
 
 User = get_user_model()
 
 
-@cache_page(20, cache='default', key_prefix='index_page')
+@query_budget(queries=4, db_ms=200)
+@conditional_feed(lambda request: [GLOBAL_FEED])
+@cache_feed(lambda request: [GLOBAL_FEED])
 def index(request):
     """Главная страница."""
     posts = Post.objects.select_related('author', 'group')
@@ -21,6 +38,9 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(queries=5, db_ms=200)
+@conditional_feed(lambda request, slug: [group_feed_name(slug)])
+@cache_feed(lambda request, slug: [group_feed_name(slug)])
 def group_posts(request, slug):
     """Страница сообществ."""
     group = get_object_or_404(Group, slug=slug)
@@ -33,12 +53,17 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(queries=6, db_ms=200)
+@conditional_feed(lambda request, username: [author_feed_name(username)])
+@cache_feed(lambda request, username: [author_feed_name(username)])
 def profile(request, username):
     """Страница пользователя."""
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     posts = author.posts.select_related('group')
     page_obj = paginator(posts, request)
-    following = request.user.is_authenticated and author.following.exists()
+    following = author in follow_graph.for_request(request)
     context = {
         'author': author,
         'page_obj': page_obj,
@@ -47,20 +72,110 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(queries=4, db_ms=200)
+@conditional_feed(lambda request, post_id: post_feeds(post_id))
 def post_detail(request, post_id):
     """Страница поста."""
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.select_related('author')
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    comments = comment_paginator(_page_comments(post), request)
     form = CommentForm()
     context = {
         'post': post,
         'form': form,
         'comments': comments,
+        'comments_page_url': post.get_absolute_url(),
+        'comments_url': reverse('posts:post_comments', args=[post.pk]),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def _page_comments(post):
+    """Комментарии поста, которые помещаются на его страницу."""
+    return post.comments.select_related('author').filter(
+        depth__lte=settings.COMMENT_PAGE_DEPTH
+    )
+
+
+def _comment_json(comment):
+    return {
+        'id': comment.pk,
+        'parent': comment.parent_id,
+        'depth': comment.depth,
+        'author': comment.author.username,
+        'author_url': comment.author.get_absolute_url(),
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def _thread_json(nodes):
+    return [
+        dict(_comment_json(comment), replies=_thread_json(comment.children))
+        for comment in nodes
+    ]
+
+
+@query_budget(queries=4, db_ms=200)
+@conditional_feed(lambda request, post_id: post_feeds(post_id))
+def post_comments(request, post_id):
+    """Следующая страница комментариев: HTML-фрагмент или JSON."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = comment_paginator(_page_comments(post), request)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [_comment_json(comment) for comment in comments],
+            'next_cursor': comments.next_cursor,
+        })
+    context = {
+        'post': post,
+        'comments': comments,
+        'comments_page_url': post.get_absolute_url(),
+        'comments_url': request.path,
+        'fragment': True,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+@query_budget(queries=5, db_ms=500)
+@conditional_feed(
+    lambda request, post_id, comment_id: post_feeds(post_id)
+)
+def comment_thread(request, post_id, comment_id):
+    """Ветка комментария: он и ответы до ?depth= уровней.
+
+    Страница и её догружаемые фрагменты (запросы из JS) идут
+    порциями по курсору, JSON отдаёт дерево ветки целиком.
+    """
+    root = get_object_or_404(
+        Comment.objects.select_related('post'), pk=comment_id, post=post_id
+    )
+    comments = threads.thread(
+        root.post.comments.select_related('author'), root,
+        threads.parse_depth(request.GET.get('depth')),
+    )
+    if request.GET.get('format') == 'json':
+        return JsonResponse(
+            {'thread': _thread_json(threads.build_tree(comments))}
+        )
+    context = {
+        'post': root.post,
+        'root': root,
+        'comments': comment_paginator(comments, request),
+        'form': CommentForm(),
+        'comments_page_url': request.path,
+        'comments_url': request.path,
+        'fragment': request.is_ajax(),
+    }
+    if context['fragment']:
+        return render(request, 'posts/includes/comment_list.html', context)
+    return render(request, 'posts/comment_thread.html', context)
+
+
+@query_budget(queries=23)
 @login_required()
+@limit_upload_size
 def post_create(request):
     """Функция создания записи."""
     form = PostForm(request.POST or None,
@@ -69,11 +184,14 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_thumbnail(post)
         return redirect('posts:profile', post.author.username)
     return render(request, 'posts/create_post.html', {'form': form})
 
 
+@query_budget(queries=21)
 @login_required
+@limit_upload_size
 def post_edit(request, post_id):
     """Функция редактирования записи."""
     post = get_object_or_404(Post, pk=post_id)
@@ -84,28 +202,68 @@ def post_edit(request, post_id):
         files=request.FILES or None,
         instance=post)
     if request.method == 'POST' and form.is_valid():
-        form.save()
+        post = form.save(commit=False)
+        image_changed = 'image' in form.changed_data
+        if image_changed:
+            previous = generated_files(post)
+            post.thumbnail = ''
+            post.image_variants = ''
+        post.save()
+        if image_changed:
+            delete_files(previous)
+            schedule_thumbnail(post)
         return redirect('posts:post_detail', post_id)
     return render(request, 'posts/create_post.html', {'form': form})
 
 
+def _reply_parent(post, parent_id):
+    """Комментарий этого поста, на который отвечают, или None.
+
+    ValidationError, если parent_id не похож на id комментария.
+    """
+    if not parent_id:
+        return None
+    pk = parse_id(parent_id, Comment)
+    if pk is None:
+        raise ValidationError(
+            'Неверный комментарий для ответа.', code='invalid_parent'
+        )
+    return post.comments.filter(pk=pk).first()
+
+
+@query_budget(queries=14)
 @login_required
 def add_comment(request, post_id):
-    """Функция добавления комментариев."""
+    """Функция добавления комментариев и ответов на них."""
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
+        try:
+            parent = _reply_parent(post, request.POST.get('parent', ''))
+        except ValidationError:
+            # Как и с невалидной формой: комментарий не сохраняется.
+            return redirect('posts:post_detail', post_id=post_id)
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        if parent is not None and parent.depth >= threads.MAX_DEPTH:
+            parent = parent.parent
+        comment.parent = parent
         comment.save()
+        if parent is not None:
+            return redirect(
+                f'{parent.get_thread_url()}#comment-{comment.pk}'
+            )
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(queries=5, db_ms=200)
 @login_required
+@conditional_feed(lambda request: follow_feeds(request.user.pk))
+@cache_feed(lambda request: follow_feeds(request.user.pk))
 def follow_index(request):
     """Функция вывода постов авторов, на которых подписан пользователь."""
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = follow_feed(request.user)
     page_obj = paginator(posts, request)
     context = {
         'page_obj': page_obj,
@@ -113,6 +271,7 @@ def follow_index(request):
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(queries=14)
 @login_required
 def profile_follow(request, username):
     """Функция подписки."""
@@ -126,6 +285,7 @@ def profile_follow(request, username):
     return redirect('posts:profile', username)
 
 
+@query_budget(queries=9)
 @login_required
 def profile_unfollow(request, username):
     """Функция отписки."""
@@ -134,3 +294,71 @@ def profile_unfollow(request, username):
         author=get_object_or_404(User, username=username)
     ).delete()
     return redirect('posts:profile', username)
+
+
+def _follow_list(request, username, title, lookup, field):
+    """Страница пользователей из подписок author по полю field."""
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    follows = Follow.objects.filter(**{lookup: author}).select_related(
+        field
+    ).order_by('-pk')
+    page_obj = paginator(follows, request, mode=PAGINATION_OFFSET)
+    page_obj.object_list = [getattr(follow, field) for follow in page_obj]
+    context = {
+        'author': author,
+        'title': title,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+@query_budget(queries=6, db_ms=200)
+@conditional_feed(
+    lambda request, username: follow_list_feeds(username, request.user.pk)
+)
+def follower_list(request, username):
+    """Подписчики пользователя."""
+    return _follow_list(request, username, 'Подписчики', 'author', 'user')
+
+
+@query_budget(queries=6, db_ms=200)
+@conditional_feed(
+    lambda request, username: follow_list_feeds(username, request.user.pk)
+)
+def following_list(request, username):
+    """Авторы, на которых подписан пользователь."""
+    return _follow_list(request, username, 'Подписки', 'user', 'author')
+
+
+@query_budget(queries=4, db_ms=200)
+@login_required
+def recommendations(request):
+    """Кого почитать: авторы, на которых подписаны подписки."""
+    graph = follow_graph.for_request(request)
+    recommended = [
+        recommendation for recommendation in
+        request.user.recommendations.select_related('author')
+        .order_by('-score', 'author_id')[:settings.RECOMMENDATIONS_SIZE]
+        if recommendation.author_id not in graph
+    ]
+    context = {
+        'recommendations': recommended,
+    }
+    return render(request, 'posts/recommendations.html', context)
+
+
+@query_budget(queries=7, db_ms=200)
+def search(request):
+    """Поиск по постам и комментариям."""
+    query = request.GET.get('q', '').strip()
+    page_obj = paginator(
+        search_documents(query), request, mode=PAGINATION_OFFSET
+    )
+    page_obj.object_list = hits(page_obj.object_list, query)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -52,10 +53,11 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
+    'core.budgets.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,15 +65,22 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# debug_toolbar только для разработки: под нагрузкой он бесполезен,
+# а для продакшена есть core.profiling.
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Скомпилированные шаблоны кешируются во всех окружениях,
+        # и при DEBUG тоже (core.templates).
+        'BACKEND': 'core.templates.CachedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -81,6 +90,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.follow.follow',
             ],
         },
     },
@@ -88,6 +98,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Потоков для представлений в yatube.asgi (core.asgi) на процесс.
+ASGI_THREADS = int(os.getenv('YATUBE_ASGI_THREADS', 8))
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -146,16 +159,205 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
 VOLUME_POSTS = 10
+# Комментариев на странице поста и в каждой догружаемой порции.
+COMMENTS_PER_PAGE = 20
+# Размер страницы JSON API (api.views) и наибольший ?limit=.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+# Глубина ответов на странице поста; глубже — на странице ветки
+# (posts.threads).
+COMMENT_PAGE_DEPTH = 4
+# Режим пагинации по имени представления: 'offset' (?page=N)
+# или 'cursor' (?cursor=<токен>). Не указанные представления
+# используют 'offset'. Ленты пока остаются на 'offset': приёмочные
+# тесты (tests/test_paginator.py, tests/test_follow.py) требуют,
+# чтобы page_obj этих страниц был django.core.paginator.Page.
+PAGINATION_MODES = {
+    'posts:index': 'offset',
+    'posts:group_posts': 'offset',
+    'posts:profile': 'offset',
+    'posts:follow_index': 'offset',
+}
+# EstimatedCountPaginator (админка) не считает строки дальше этого
+# числа, а большие таблицы без фильтров оценивает без COUNT(*).
+ESTIMATED_COUNT_LIMIT = 10000
 FIRST_SIMBOLS = 15
 
+# Материализованная лента подписок (posts.feed).
+FEED_MATERIALIZED = True
+# Посты авторов с большим числом подписчиков не раскладываются
+# по лентам, а подмешиваются при чтении.
+FEED_FANOUT_LIMIT = 1000
+# Список таких авторов сбрасывается при пометке нового, таймаут
+# лишь ограничивает срок хранения.
+FEED_CELEBRITIES_TIMEOUT = 60 * 60
+# Сколько последних постов автора попадает в ленту при подписке;
+# более старые в ленте подписок не показываются.
+FEED_BACKFILL_SIZE = 200
+# Подписки пользователя в кеше (posts.follow_graph); сбрасываются
+# при подписке и отписке.
+FOLLOW_GRAPH_TIMEOUT = 60 * 60
+# Рекомендаций подписок на пользователя (manage.py build_recommendations).
+RECOMMENDATIONS_SIZE = 10
+
+# Миниатюры картинок постов (posts.thumbnails). При 0 воркеров
+# миниатюра строится синхронно в запросе.
+POST_THUMBNAIL_SIZE = (960, 339)
+POST_THUMBNAIL_WORKERS = 2
+# Ширины адаптивных вариантов (WebP/AVIF) для srcset.
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_QUALITY = 75
+# Ограничения загружаемых картинок (posts.uploads). Файл больше
+# POST_IMAGE_MAX_SIZE не дочитывается до конца в формах постов.
+POST_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_SIDE = 10000
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+POST_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+# Полнотекстовый поиск (posts.search): 'auto', 'sqlite', 'postgresql'
+# или 'python'. После смены бэкенда нужен rebuild_search_index.
+POST_SEARCH_BACKEND = 'auto'
+POST_SEARCH_LIMIT = 1000
+POST_SEARCH_SNIPPET_WORDS = 30
+
+# Бюджеты запросов представлений (core.budgets): при True превышение
+# бросает исключение, иначе пишется в лог. Запросы дольше
+# SLOW_REQUEST_MS логируются всегда.
+QUERY_BUDGET_RAISE = False
+SLOW_REQUEST_MS = 500
+# Заголовок Server-Timing с числом запросов и временем в БД; его же
+# читает нагрузочный бенчмарк benchmarks/feed_load.py.
+SERVER_TIMING = DEBUG
+
+# Бюджеты отрисовки шаблонов (core.budgets): миллисекунд на одну
+# отрисовку вместе с вложенными шаблонами; остальным шаблонам —
+# TEMPLATE_BUDGET_DEFAULT_MS. Время без кеша страниц и карточек
+# показывает benchmarks/template_render.py.
+TEMPLATE_BUDGET_DEFAULT_MS = 100
+# Превышения по времени (db_ms бюджетов запросов и бюджеты шаблонов)
+# зависят от загрузки машины, поэтому исключение бросают только при
+# TIMING_BUDGET_RAISE, а не при QUERY_BUDGET_RAISE: тесты включают
+# его лишь с заведомо нарушенными бюджетами.
+TIMING_BUDGET_RAISE = False
+TEMPLATE_BUDGETS = {
+    'includes/header.html': 20,
+    'includes/footer.html': 10,
+    'posts/includes/post_card.html': 10,
+    'posts/includes/post_image.html': 5,
+    'posts/includes/switcher.html': 10,
+    # Число страниц считается при отрисовке, вместе с COUNT(*).
+    'posts/includes/paginator.html': 30,
+    'posts/includes/comments.html': 30,
+}
+
+# Выборочное профилирование запросов (core.profiling): доля
+# профилируемых запросов и заголовок с подписанным токеном из
+# manage.py profiling_token (None — отключить заголовок). Профили
+# в формате speedscope или collapsed пишутся в PROFILING_DIR.
+PROFILING_RATE = 0
+PROFILING_HEADER = 'X-Profile'
+PROFILING_TOKEN_MAX_AGE = 60 * 60 * 24
+PROFILING_INTERVAL = 0.002
+PROFILING_FORMAT = 'speedscope'
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.budgets': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 LOGOUT_REDIRECT_URL = ''
 
+
+# User.get_absolute_url — профиль автора. Адреса карточек постов
+# строятся из закешированных префиксов (core.url_cache).
+def _user_url(user):
+    # Импорт здесь: настройки не загружают код приложений.
+    from core.url_cache import cached_reverse
+
+    return cached_reverse('posts:profile', user.username)
+
+
+ABSOLUTE_URL_OVERRIDES = {
+    'auth.user': _user_url,
+}
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
-CACHES = {
-    'default': {
+# Страницы лент живут в кеше до смены поколения (posts.cache),
+# таймаут лишь ограничивает срок хранения.
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+FEED_CACHE_LOCK_TIMEOUT = 10
+FEED_CACHE_LOCK_WAIT = 2
+# Сколько секунд обратный прокси может отдавать страницу гостя без
+# проверки (posts.conditional); браузер проверяет её каждый раз.
+HTML_CACHE_SHARED_MAX_AGE = 20
+
+# Кеш выбирается переменными окружения:
+# YATUBE_CACHE — locmem (по умолчанию, только для одного процесса и
+# тестов), dummy (без кеша, для замеров холодных страниц), file, db (нужен manage.py createcachetable), memcached
+# или redis (нужен пакет django-redis); YATUBE_CACHE_LOCATION
+# переопределяет адрес. YATUBE_CACHE_L1=1 ставит перед выбранным
+# общим кешем L1 в памяти процесса (core.cache.TwoTierCache).
+CACHE_PRESETS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'dummy': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yatube_cache',
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211',
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    },
 }
+
+SHARED_CACHE = dict(CACHE_PRESETS[os.getenv('YATUBE_CACHE', 'locmem')])
+if os.getenv('YATUBE_CACHE_LOCATION'):
+    SHARED_CACHE['LOCATION'] = os.getenv('YATUBE_CACHE_LOCATION')
+
+if os.getenv('YATUBE_CACHE_L1') == '1':
+    CACHES = {
+        'shared': SHARED_CACHE,
+        'default': {
+            'BACKEND': 'core.cache.TwoTierCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'L1_TIMEOUT': 5,
+                'EPOCH_INTERVAL': 1,
+                'L2_ONLY_PREFIXES': [
+                    'feed_gen:', 'feed_lock:', 'feed_latest:', 'feed:',
+                    'follow_graph:',
+                ],
+            },
+        },
+    }
+else:
+    CACHES = {
+        'default': SHARED_CACHE,
+    }